@@ -0,0 +1,67 @@
+"""
+Benchmark Inserts, rows per second with and without the gpkg_ogr_contents
+feature count triggers (bulk mode).
+
+Run from the repository root:
+    python -m benchmarks.bench_insert [row count]
+"""
+from os import remove
+from os.path import exists, join
+from sys import argv
+from tempfile import gettempdir
+from time import perf_counter
+from pygeopkg.core.geopkg import GeoPackage
+from pygeopkg.core.srs import SRS
+from pygeopkg.core.field import Field
+from pygeopkg.shared.enumeration import SQLFieldTypes
+from tests.projection_strings import WGS_1984_UTM_Zone_23N
+from tests.utils import random_points_and_attrs
+
+
+FIELDS = (
+    Field('int_fld', SQLFieldTypes.integer),
+    Field('text_fld', SQLFieldTypes.text),
+    Field('test_fld_size', SQLFieldTypes.text, 100),
+    Field('test_bool', SQLFieldTypes.boolean),
+    Field('test_datetime', SQLFieldTypes.datetime))
+FIELD_NAMES = ['SHAPE'] + [f.name for f in FIELDS]
+
+
+def _time_insert(rows, bulk):
+    """
+    Time inserting rows into a new feature class
+
+    :param rows: the rows to insert
+    :param bulk: flag to insert in bulk mode
+    :return: elapsed seconds
+    """
+    path = join(gettempdir(), 'bench_insert.gpkg')
+    gpkg = GeoPackage.create(path)
+    srs = SRS('WGS_1984_UTM_Zone_23N', 'EPSG', 32623, WGS_1984_UTM_Zone_23N)
+    fc = gpkg.create_feature_class('bench', srs, fields=FIELDS)
+    start = perf_counter()
+    fc.insert_rows(FIELD_NAMES, rows, bulk=bulk)
+    elapsed = perf_counter() - start
+    assert fc.count == len(rows)
+    if exists(path):
+        remove(path)
+    return elapsed
+# End _time_insert function
+
+
+def main(count):
+    """
+    Main
+
+    :param count: the number of rows to insert
+    """
+    rows = random_points_and_attrs(count, 32623)
+    for label, bulk in (('triggers', False), ('bulk mode', True)):
+        elapsed = _time_insert(rows, bulk)
+        print('{0:>10}: {1:>12,.0f} rows/s ({2:.3f}s for {3:,} rows)'.format(
+            label, count / elapsed, elapsed, count))
+# End main function
+
+
+if __name__ == '__main__':
+    main(int(argv[1]) if len(argv) > 1 else 200000)
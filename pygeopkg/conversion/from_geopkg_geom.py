@@ -0,0 +1,369 @@
+"""
+Read Geopackage Geometry Blobs
+"""
+from struct import Struct, unpack_from
+
+
+INF = float('inf')
+
+# flag bits of the geopackage binary header
+HEADER_LITTLE_ENDIAN = 0x01
+HEADER_ENVELOPE_MASK = 0x0E
+HEADER_EMPTY = 0x10
+
+# number of doubles in the header envelope by envelope type
+ENVELOPE_LENGTHS = {0: 0, 1: 4, 2: 6, 3: 6, 4: 8}
+
+HEADER_SIZE = 8
+
+HEADER_STRUCTS = {'<': Struct('<Bi'), '>': Struct('>Bi')}
+
+# the x and y values of a header envelope
+ENVELOPE_STRUCTS = {'<': Struct('<4d'), '>': Struct('>4d')}
+
+# little endian two dimensional point, the most common geometry
+POINT_STRUCT = Struct('<BIdd')
+
+# extended wkb dimension flags, tolerated when reading
+EWKB_Z = 0x80000000
+EWKB_M = 0x40000000
+EWKB_SRID = 0x20000000
+
+WKB_POINT = 1
+WKB_LINESTRING = 2
+WKB_POLYGON = 3
+WKB_MULTI_POINT = 4
+WKB_MULTI_LINESTRING = 5
+WKB_MULTI_POLYGON = 6
+WKB_GEOMETRY_COLLECTION = 7
+
+WKB_Z = 1000
+WKB_M = 2000
+
+
+def read_gpkg_header(blob):
+    """
+    Read a Geopackage geometry binary header
+
+    :param blob: the geopackage geometry
+    :type blob: bytes
+    :return: tuple of srs id, envelope type, empty flag, envelope (possibly
+        empty tuple) and the offset of the well known binary
+    :rtype: tuple
+    """
+    flags = blob[3]
+    endian = '<' if flags & HEADER_LITTLE_ENDIAN else '>'
+    _, srs_id = HEADER_STRUCTS[endian].unpack_from(blob, 3)
+    envelope_type = (flags & HEADER_ENVELOPE_MASK) >> 1
+    length = ENVELOPE_LENGTHS[envelope_type]
+    envelope = ()
+    if length:
+        envelope = unpack_from(
+            '{0}{1}d'.format(endian, length), blob, HEADER_SIZE)
+    return (srs_id, envelope_type, bool(flags & HEADER_EMPTY), envelope,
+            HEADER_SIZE + 8 * length)
+# End read_gpkg_header function
+
+
+def wkb_type_info(code):
+    """
+    Get the base geometry type and the dimensions of a WKB type
+
+    :param code: the wkb geometry type code, ISO or extended
+    :type code: int
+    :return: the base type and flags indicating z and m values
+    :rtype: tuple
+    """
+    if code & (EWKB_Z | EWKB_M | EWKB_SRID):
+        return code & 0x0FFFFFFF, bool(code & EWKB_Z), bool(code & EWKB_M)
+    thousands, code = divmod(code, 1000)
+    return code, thousands in (1, 3), thousands in (2, 3)
+# End wkb_type_info function
+
+
+def _read_wkb_type(wkb, offset):
+    """
+    Read the byte order and type of a well known binary geometry
+
+    :param wkb: the buffer containing the well known binary
+    :type wkb: bytes
+    :param offset: the position of the geometry in the buffer
+    :type offset: int
+    :return: the struct byte order character, base type, z and m flags, and
+        the position following the type (and srid, if any)
+    :rtype: tuple
+    """
+    order, = unpack_from('<B', wkb, offset)
+    endian = '<' if order else '>'
+    code, = unpack_from(endian + 'I', wkb, offset + 1)
+    offset += 5
+    if code & EWKB_SRID:
+        offset += 4
+    base, has_z, has_m = wkb_type_info(code)
+    return endian, base, has_z, has_m, offset
+# End _read_wkb_type function
+
+
+def _update_bounds(bounds, values, dims):
+    """
+    Update bounds (min x, max x, min y, max y) with flat coordinate values
+
+    :param bounds: the bounds, updated in place
+    :type bounds: list
+    :param values: the coordinate values
+    :type values: tuple
+    :param dims: the number of values per coordinate
+    :type dims: int
+    """
+    if not values:
+        return
+    xs, ys = values[0::dims], values[1::dims]
+    bounds[0] = min(bounds[0], min(xs))
+    bounds[1] = max(bounds[1], max(xs))
+    bounds[2] = min(bounds[2], min(ys))
+    bounds[3] = max(bounds[3], max(ys))
+# End _update_bounds function
+
+
+def _wkb_bounds(wkb, offset, bounds):
+    """
+    Accumulate the x and y bounds of a well known binary geometry
+
+    :param wkb: the buffer containing the well known binary
+    :type wkb: bytes
+    :param offset: the position of the geometry in the buffer
+    :type offset: int
+    :param bounds: the bounds, updated in place
+    :type bounds: list
+    :return: the position following the geometry
+    :rtype: int
+    """
+    endian, code, has_z, has_m, offset = _read_wkb_type(wkb, offset)
+    dims = 2 + has_z + has_m
+    if code == WKB_POINT:
+        values = unpack_from('{0}{1}d'.format(endian, dims), wkb, offset)
+        # points with NaN coordinates are empty
+        if values[0] == values[0]:
+            _update_bounds(bounds, values, dims)
+        return offset + 8 * dims
+    count, = unpack_from(endian + 'I', wkb, offset)
+    offset += 4
+    if code == WKB_LINESTRING:
+        values = unpack_from(
+            '{0}{1}d'.format(endian, count * dims), wkb, offset)
+        _update_bounds(bounds, values, dims)
+        return offset + 8 * dims * count
+    if code == WKB_POLYGON:
+        for _ in range(count):
+            size, = unpack_from(endian + 'I', wkb, offset)
+            offset += 4
+            values = unpack_from(
+                '{0}{1}d'.format(endian, size * dims), wkb, offset)
+            _update_bounds(bounds, values, dims)
+            offset += 8 * dims * size
+        return offset
+    for _ in range(count):
+        offset = _wkb_bounds(wkb, offset, bounds)
+    return offset
+# End _wkb_bounds function
+
+
+def wkb_envelope(wkb, offset=0):
+    """
+    Envelope of a well known binary geometry
+
+    :param wkb: the buffer containing the well known binary
+    :type wkb: bytes
+    :param offset: the position of the geometry in the buffer
+    :type offset: int
+    :return: the envelope as min x, max x, min y, max y or None when empty
+    :rtype: tuple
+    """
+    bounds = [INF, -INF, INF, -INF]
+    _wkb_bounds(wkb, offset, bounds)
+    if bounds[0] > bounds[1]:
+        return None
+    return tuple(bounds)
+# End wkb_envelope function
+
+
+def gpkg_envelope(blob):
+    """
+    Envelope of a Geopackage geometry, taken from the header when it has
+    one, otherwise computed from the coordinates.
+
+    :param blob: the geopackage geometry
+    :type blob: bytes
+    :return: the envelope as min x, max x, min y, max y or None when the
+        geometry is null or empty
+    :rtype: tuple
+    """
+    if blob is None:
+        return None
+    _, _, empty, envelope, offset = read_gpkg_header(blob)
+    if empty:
+        return None
+    if envelope:
+        envelope = envelope[:4]
+        # NaN envelopes mark empty geometries
+        if envelope[0] != envelope[0]:
+            return None
+        return envelope
+    if len(blob) - offset == POINT_STRUCT.size:
+        order, code, x, y = POINT_STRUCT.unpack_from(blob, offset)
+        if order == 1 and code == WKB_POINT:
+            # points with NaN coordinates are empty
+            if x != x:
+                return None
+            return x, x, y, y
+    return wkb_envelope(blob, offset)
+# End gpkg_envelope function
+
+
+def gpkg_header_envelope(blob):
+    """
+    Envelope of a Geopackage geometry taken from its header only, the
+    coordinates are never read
+
+    :param blob: the geopackage geometry
+    :type blob: bytes
+    :return: the envelope as min x, max x, min y, max y, None when the
+        geometry is null or empty, an empty tuple when the header has no
+        envelope
+    :rtype: tuple
+    """
+    if blob is None:
+        return None
+    flags = blob[3]
+    if flags & HEADER_EMPTY:
+        return None
+    if not flags & HEADER_ENVELOPE_MASK:
+        return ()
+    endian = '<' if flags & HEADER_LITTLE_ENDIAN else '>'
+    envelope = ENVELOPE_STRUCTS[endian].unpack_from(blob, HEADER_SIZE)
+    # NaN envelopes mark empty geometries
+    if envelope[0] != envelope[0]:
+        return None
+    return envelope
+# End gpkg_header_envelope function
+
+
+def _read_points(wkb, offset, endian, dims):
+    """
+    Read a count prefixed sequence of points
+
+    :return: list of point tuples and the position following the points
+    :rtype: tuple
+    """
+    count, = unpack_from(endian + 'I', wkb, offset)
+    offset += 4
+    values = unpack_from('{0}{1}d'.format(endian, count * dims), wkb, offset)
+    points = list(zip(*[iter(values)] * dims))
+    return points, offset + 8 * dims * count
+# End _read_points function
+
+
+def _read_wkb(wkb, offset):
+    """
+    Read a well known binary geometry
+
+    :return: the wkb type, coordinates and the position following the
+        geometry
+    :rtype: tuple
+    """
+    endian, code, has_z, has_m, offset = _read_wkb_type(wkb, offset)
+    dims = 2 + has_z + has_m
+    wkb_type = code + WKB_Z * has_z + WKB_M * has_m
+    if code == WKB_POINT:
+        values = unpack_from('{0}{1}d'.format(endian, dims), wkb, offset)
+        return wkb_type, values, offset + 8 * dims
+    if code == WKB_LINESTRING:
+        points, offset = _read_points(wkb, offset, endian, dims)
+        return wkb_type, points, offset
+    count, = unpack_from(endian + 'I', wkb, offset)
+    offset += 4
+    parts = []
+    for _ in range(count):
+        if code == WKB_POLYGON:
+            part, offset = _read_points(wkb, offset, endian, dims)
+        else:
+            part_type, part, offset = _read_wkb(wkb, offset)
+            if code == WKB_GEOMETRY_COLLECTION:
+                part = part_type, part
+        parts.append(part)
+    return wkb_type, parts, offset
+# End _read_wkb function
+
+
+def wkb_to_geometry(wkb, offset=0):
+    """
+    Well Known Binary to Geometry, the inverse of the to_wkb functions.
+
+    Coordinates are nested as expected by the conversion functions, a
+    point is a tuple of values, a line string (and a multi point) is a list
+    of points, a polygon (and a multi line string) is a list of rings and a
+    multi polygon is a list of polygons.  The parts of a geometry collection
+    are tuples of wkb type and coordinates.
+
+    :param wkb: the buffer containing the well known binary
+    :type wkb: bytes
+    :param offset: the position of the geometry in the buffer
+    :type offset: int
+    :return: the ISO wkb type (e.g. 1003 for a polygon z) and the
+        coordinates
+    :rtype: tuple
+    """
+    wkb_type, coordinates, _ = _read_wkb(wkb, offset)
+    return wkb_type, coordinates
+# End wkb_to_geometry function
+
+
+def gpkg_to_wkb(blob):
+    """
+    Geopackage Geometry to Well Known Binary, the header is removed
+
+    :param blob: the geopackage geometry
+    :type blob: bytes
+    :return: the well known binary
+    :rtype: bytes
+    """
+    offset = read_gpkg_header(blob)[-1]
+    return bytes(blob[offset:])
+# End gpkg_to_wkb function
+
+
+def gpkg_to_geometry(blob):
+    """
+    Geopackage Geometry to Geometry, see "wkb_to_geometry"
+
+    :param blob: the geopackage geometry
+    :type blob: bytes
+    :return: the srs id, the ISO wkb type and the coordinates, or None for a
+        null geometry
+    :rtype: tuple
+    """
+    if blob is None:
+        return None
+    srs_id, _, _, _, offset = read_gpkg_header(blob)
+    wkb_type, coordinates, _ = _read_wkb(blob, offset)
+    return srs_id, wkb_type, coordinates
+# End gpkg_to_geometry function
+
+
+def gpkg_is_empty(blob):
+    """
+    Check if a Geopackage geometry is empty
+
+    :param blob: the geopackage geometry
+    :type blob: bytes
+    :return: boolean indicating an empty geometry, None for a null geometry
+    :rtype: bool
+    """
+    if blob is None:
+        return None
+    return gpkg_envelope(blob) is None
+# End gpkg_is_empty function
+
+
+if __name__ == '__main__':
+    pass
@@ -2,14 +2,16 @@
 Convert to Geopackage Geometry Blobs
 """
 from sys import version_info
-from struct import pack
+from struct import pack, unpack
 from pygeopkg.conversion.to_wkb import (
     point_to_wkb_point, point_z_to_wkb_point_z, point_m_to_wkb_point_m,
     point_zm_to_wkb_point_zm, points_to_wkb_line_string,
     points_z_to_wkb_line_string_z, points_m_to_wkb_line_string_m,
     points_zm_to_wkb_line_string_zm, point_lists_to_wkb_polygon,
     point_lists_to_wkb_multipolygon, multipoint_to_wkb_multipoint,
-    point_lists_to_multi_line_string)
+    point_lists_to_multi_line_string, split_header, ENVELOPE_INDEXES, NAN,
+    GPKG_HEADER_SIZE, ENVELOPE_FLAGS)
+from pygeopkg.shared.enumeration import EnvelopeType
 
 GP_MAGIC = 'GP'
 if version_info > (3,):
@@ -17,21 +19,89 @@ if version_info > (3,):
     # noinspection PyShadowingBuiltins
     buffer = bytes
 
+ENVELOPE_TYPES_BY_LENGTH = {
+    4: EnvelopeType.xy,
+    6: EnvelopeType.xyz,
+    8: EnvelopeType.xyzm,
+}
 
-def make_gpkg_geom_header(srs_id):
+
+def make_gpkg_geom_header(srs_id, envelope=None, envelope_type=None):
     """
     Make a Geopackage geometry binary header
 
     :param srs_id: The spatial reference id
     :type srs_id: int
+    :param envelope: The envelope, optional, in the order min x, max x,
+        min y, max y followed by min z, max z and / or min m, max m
+    :type envelope: tuple
+    :param envelope_type: The envelope type, see EnvelopeType, inferred from
+        the length of the envelope when not given (6 values mean xyz).
+        Without an envelope the values are NaN, the encoders given such a
+        header compute the envelope of each geometry.
+    :type envelope_type: int
     :return: the packed srs id
     """
     magic, version, flags = GP_MAGIC, 0, 1
-    return pack('<2s2bi', magic, version, flags, srs_id)
+    if not envelope and envelope_type:
+        envelope = (NAN,) * (2 * len(ENVELOPE_INDEXES[envelope_type]))
+    if not envelope:
+        return pack('<2s2bi', magic, version, flags, srs_id)
+    if envelope_type is None:
+        envelope_type = ENVELOPE_TYPES_BY_LENGTH[len(envelope)]
+    flags |= envelope_type << 1
+    return pack('<2s2bi{0}d'.format(len(envelope)),
+                magic, version, flags, srs_id, *envelope)
 # End make_gpkg_geom_header function
 
 
-def point_to_gpkg_point(header, x, y):
+def compute_envelope(points, envelope_type=EnvelopeType.xy):
+    """
+    Compute the envelope of points
+
+    :param points: the points, tuples of x, y and optionally z and / or m
+    :type points: list
+    :param envelope_type: The envelope type, see EnvelopeType
+    :type envelope_type: int
+    :return: the envelope in geopackage order, min x, max x, min y, max y,
+        etc.  All values are NaN when there are no points.
+    :rtype: tuple
+    """
+    indexes = ENVELOPE_INDEXES[envelope_type]
+    columns = list(zip(*points))
+    if not columns:
+        return (NAN,) * (2 * len(indexes))
+    envelope = ()
+    for index in indexes:
+        values = columns[index]
+        envelope += (min(values), max(values))
+    return envelope
+# End compute_envelope function
+
+
+def envelope_header(header, points, envelope_type=None):
+    """
+    Envelope Header, the header with the envelope of the points added, the
+    header is returned without an envelope when none is requested.
+
+    :param header: the binary header, see "make_gpkg_geom_header"
+    :param points: the points, tuples of x, y and optionally z and / or m
+    :type points: list
+    :param envelope_type: The envelope type, see EnvelopeType, defaults to
+        the envelope type of the header
+    :type envelope_type: int
+    :return: the header
+    """
+    header, envelope_type = split_header(header, envelope_type)
+    if not envelope_type:
+        return header
+    srs_id, = unpack('<i', header[4:8])
+    return make_gpkg_geom_header(
+        srs_id, compute_envelope(points, envelope_type), envelope_type)
+# End envelope_header function
+
+
+def point_to_gpkg_point(header, x, y, envelope_type=None):
     """
     Point to WKBPoint
 
@@ -40,13 +110,22 @@ def point_to_gpkg_point(header, x, y):
     :param y: y coord
     :type y: float
     :param header: the binary header, see "make_gpkg_geom_header"
+    :param envelope_type: The envelope to include in the header, see
+        EnvelopeType, computed from the coordinates, defaults to the
+        envelope type of the header
+    :type envelope_type: int
     :return: the WKB
     """
+    if (envelope_type is None and len(header) == GPKG_HEADER_SIZE and
+            not header[3] & ENVELOPE_FLAGS):
+        return buffer(header + point_to_wkb_point(x, y))
+    header = envelope_header(header, [(x, y)], envelope_type)
     return buffer(header + point_to_wkb_point(x, y))
 # End point_to_gpkg_point
 
 
-def point_z_to_gpkg_point_z(header, x, y, z):
+def point_z_to_gpkg_point_z(header, x, y, z,
+                            envelope_type=None):
     """
     Point to WKBPointZ
 
@@ -57,12 +136,21 @@ def point_z_to_gpkg_point_z(header, x, y, z):
     :param z: z coord
     :type z: float
     :param header: the binary header, see "make_gpkg_geom_header"
+    :param envelope_type: The envelope to include in the header, see
+        EnvelopeType, computed from the coordinates, defaults to the
+        envelope type of the header
+    :type envelope_type: int
     """
+    if (envelope_type is None and len(header) == GPKG_HEADER_SIZE and
+            not header[3] & ENVELOPE_FLAGS):
+        return buffer(header + point_z_to_wkb_point_z(x, y, z))
+    header = envelope_header(header, [(x, y, z)], envelope_type)
     return buffer(header + point_z_to_wkb_point_z(x, y, z))
 # End point_z_to_gpkg_point_z function
 
 
-def point_m_to_gpkg_point_m(header, x, y, m):
+def point_m_to_gpkg_point_m(header, x, y, m,
+                            envelope_type=None):
     """
     Point to WKBPointM
 
@@ -73,12 +161,21 @@ def point_m_to_gpkg_point_m(header, x, y, m):
     :param m: m coord
     :type m: float
     :param header: the binary header, see "make_gpkg_geom_header"
+    :param envelope_type: The envelope to include in the header, see
+        EnvelopeType, computed from the coordinates, defaults to the
+        envelope type of the header
+    :type envelope_type: int
     """
+    if (envelope_type is None and len(header) == GPKG_HEADER_SIZE and
+            not header[3] & ENVELOPE_FLAGS):
+        return buffer(header + point_m_to_wkb_point_m(x, y, m))
+    header = envelope_header(header, [(x, y, m)], envelope_type)
     return buffer(header + point_m_to_wkb_point_m(x, y, m))
 # End point_m_to_gpkg_point_m function
 
 
-def point_zm_to_gpkg_point_zm(header, x, y, z, m):
+def point_zm_to_gpkg_point_zm(header, x, y, z, m,
+                              envelope_type=None):
     """
     Point to WKBPointZM
 
@@ -91,80 +188,119 @@ def point_zm_to_gpkg_point_zm(header, x, y, z, m):
     :param m: m coord
     :type m: float
     :param header: the binary header, see "make_gpkg_geom_header"
+    :param envelope_type: The envelope to include in the header, see
+        EnvelopeType, computed from the coordinates, defaults to the
+        envelope type of the header
+    :type envelope_type: int
     """
+    if (envelope_type is None and len(header) == GPKG_HEADER_SIZE and
+            not header[3] & ENVELOPE_FLAGS):
+        return buffer(header + point_zm_to_wkb_point_zm(x, y, z, m))
+    header = envelope_header(header, [(x, y, z, m)], envelope_type)
     return buffer(header + point_zm_to_wkb_point_zm(x, y, z, m))
 # End point_zm_to_gpkg_point_zm function
 
 
-def points_to_gpkg_multipoint(header, points):
+def points_to_gpkg_multipoint(header, points, envelope_type=None):
     """
     List of points to a gpkg multi point blob
+    :param envelope_type: The envelope to include in the header, see
+        EnvelopeType, computed from the coordinates, defaults to the
+        envelope type of the header
+    :type envelope_type: int
     """
-    return buffer(header + multipoint_to_wkb_multipoint(points))
+    return multipoint_to_wkb_multipoint(points, header, envelope_type)
 # End points_to_gpkg_multi_point function
 
 
-def points_to_gpkg_line_string(header, points):
+def points_to_gpkg_line_string(header, points,
+                               envelope_type=None):
     """
     List of points to a gpkg blob
 
     :param header: the binary header, see "make_gpkg_geom_header"
     :param points: list of points making up the line
     :type points: list
+    :param envelope_type: The envelope to include in the header, see
+        EnvelopeType, computed from the coordinates, defaults to the
+        envelope type of the header
+    :type envelope_type: int
     :return:
     """
-    return buffer(header + points_to_wkb_line_string(points))
+    return points_to_wkb_line_string(points, header, envelope_type)
 # End points_to_gpkg_line_string
 
 
-def points_z_to_gpkg_line_string_z(header, points):
+def points_z_to_gpkg_line_string_z(header, points,
+                                   envelope_type=None):
     """
 
     :param header: the binary header, see "make_gpkg_geom_header"
     :param points: List of points making up the line
     :type points: list
+    :param envelope_type: The envelope to include in the header, see
+        EnvelopeType, computed from the coordinates, defaults to the
+        envelope type of the header
+    :type envelope_type: int
     :return:
     """
-    return buffer(header + points_z_to_wkb_line_string_z(points))
+    return points_z_to_wkb_line_string_z(points, header, envelope_type)
 # End points_to_gpkg_line_string
 
 
-def points_m_to_gpkg_line_string_m(header, points):
+def points_m_to_gpkg_line_string_m(header, points,
+                                   envelope_type=None):
     """
 
     :param header: the binary header, see "make_gpkg_geom_header"
     :param points: List of points making up the line
     :type points: list
+    :param envelope_type: The envelope to include in the header, see
+        EnvelopeType, computed from the coordinates, defaults to the
+        envelope type of the header
+    :type envelope_type: int
     :return:
     """
-    return buffer(header + points_m_to_wkb_line_string_m(points))
+    return points_m_to_wkb_line_string_m(points, header, envelope_type)
 # End points_to_gpkg_line_string
 
 
-def points_zm_to_gpkg_line_string_zm(header, points):
+def points_zm_to_gpkg_line_string_zm(header, points,
+                                     envelope_type=None):
     """
 
     :param header: the binary header, see "make_gpkg_geom_header"
     :param points: List of points making up the line
     :type points: list
+    :param envelope_type: The envelope to include in the header, see
+        EnvelopeType, computed from the coordinates, defaults to the
+        envelope type of the header
+    :type envelope_type: int
     :return:
     """
-    return buffer(header + points_zm_to_wkb_line_string_zm(points))
+    return points_zm_to_wkb_line_string_zm(points, header, envelope_type)
 # End points_zm_to_gpkg_line_string_zm function
 
 
-def point_lists_to_gpkg_multi_line_string(header, point_lists):
+def point_lists_to_gpkg_multi_line_string(header, point_lists,
+                                          envelope_type=None):
     """
 
     :param header:
     :param point_lists:
+    :param envelope_type: The envelope to include in the header, see
+        EnvelopeType, computed from the coordinates, defaults to the
+        envelope type of the header
+    :type envelope_type: int
     :return:
     """
-    return buffer(header + point_lists_to_multi_line_string(point_lists))
+    return point_lists_to_multi_line_string(
+        point_lists, header, envelope_type)
 # End point_lists_to_gpkg_multi_line_string function
 
 
-def point_lists_to_gpkg_polygon(header, ring_point_lists):
+def point_lists_to_gpkg_polygon(header, ring_point_lists,
+                                envelope_type=None):
     """
     Ring point lists should be lists of points representing poly rings.
 
@@ -175,20 +311,32 @@ def point_lists_to_gpkg_polygon(header, ring_point_lists):
     :param header: the binary header, see "make_gpkg_geom_header"
     :param ring_point_lists: List of rings in the polygon
     :type ring_point_lists: list
+    :param envelope_type: The envelope to include in the header, see
+        EnvelopeType, computed from the coordinates, defaults to the
+        envelope type of the header
+    :type envelope_type: int
     :return:
     """
-    return buffer(header + point_lists_to_wkb_polygon(ring_point_lists))
+    return point_lists_to_wkb_polygon(
+        ring_point_lists, header, envelope_type)
 # End point_lists_to_wkb_polygon function
 
 
-def point_lists_to_gpkg_multi_polygon(header, list_of_polys):
+def point_lists_to_gpkg_multi_polygon(header, list_of_polys,
+                                      envelope_type=None):
     """
     This is a list (polygons) which are lists of rings which are lists of points
     Point lists should be lists of points representing poly rings.
 
     i.e. [[[(x, y), (x, y), ..],[(x, y), (x, y)...]],[etc]]
+
+    :param envelope_type: The envelope to include in the header, see
+        EnvelopeType, computed from the coordinates, defaults to the
+        envelope type of the header
+    :type envelope_type: int
     """
-    return buffer(header + point_lists_to_wkb_multipolygon(list_of_polys))
+    return point_lists_to_wkb_multipolygon(
+        list_of_polys, header, envelope_type)
 # End point_lists_to_gpkg_multi_polygon function
 
 
@@ -1,8 +1,31 @@
 """
 Conversion Utils
 """
-from sys import version_info
-from struct import pack
+from sys import version_info, byteorder
+from struct import Struct, pack, pack_into, unpack_from
+from itertools import chain
+from pygeopkg.shared.enumeration import EnvelopeType
+from pygeopkg.shared.messages import ERR_COORDS_BUFFER
+
+try:
+    from struct import iter_unpack
+except ImportError:  # pragma: no cover
+    def iter_unpack(fmt, data):
+        """
+        Iterate Unpack, the values of a buffer holding consecutive records
+        of a format, for Python versions without struct.iter_unpack
+
+        :param fmt: the struct format of a record
+        :type fmt: str
+        :param data: the buffer
+        :return: the values of each record
+        :rtype: iterable
+        """
+        packer = Struct(fmt)
+        data = memoryview(data).tobytes()
+        return (packer.unpack_from(data, offset)
+                for offset in range(0, len(data), packer.size))
+    # End iter_unpack function
 
 BYTE_UINT = '<BI'
 
@@ -26,6 +49,346 @@ WKB_MULTI_POLY_PRE = pack(BYTE_UINT, 1, 6)
 EMPTY_B = ''
 if version_info > (3,):
     EMPTY_B = b''
+    # noinspection PyShadowingBuiltins
+    buffer = bytes
+
+# buffer formats holding float64 values in little endian byte order
+FLOAT64_FORMATS = ('<d',)
+if byteorder == 'little':
+    FLOAT64_FORMATS += ('d', '@d', '=d')
+BYTE_FORMATS = ('B', 'b', 'c')
+
+# size of a geopackage binary header without an envelope
+GPKG_HEADER_SIZE = 8
+ENVELOPE_FLAGS = 0x0E
+
+INF = float('inf')
+NAN = float('nan')
+
+# coordinate indexes used by each envelope type, m is always the last value
+ENVELOPE_INDEXES = {
+    EnvelopeType.xy: (0, 1),
+    EnvelopeType.xyz: (0, 1, 2),
+    EnvelopeType.xym: (0, 1, -1),
+    EnvelopeType.xyzm: (0, 1, 2, -1),
+}
+
+
+def as_coordinate_buffer(points, dims):
+    """
+    As Coordinate Buffer, checks if the points are given as a buffer (e.g.
+    array.array('d'), a contiguous numpy float64 array, a memoryview or an
+    mmap slice) of little endian float64 values, these are already valid
+    WKB point data and are copied as is.  Raw byte buffers are taken to
+    hold little endian float64 values.
+
+    :param points: the points, a buffer or a sequence of tuples
+    :param dims: the number of values per point
+    :type dims: int
+    :return: the buffer (as a memoryview) and the number of points, or None
+        when the points are not a buffer
+    :rtype: tuple
+    """
+    if isinstance(points, (list, tuple)):
+        return None
+    try:
+        view = memoryview(points)
+    except TypeError:
+        return None
+    size = 8 * dims
+    if (view.format not in FLOAT64_FORMATS + BYTE_FORMATS or
+            not view.c_contiguous or view.nbytes % size or
+            (view.ndim == 2 and view.format not in BYTE_FORMATS and
+             view.shape[1] != dims) or view.ndim > 2):
+        raise ValueError(ERR_COORDS_BUFFER.format(dims))
+    return view, view.nbytes // size
+# End as_coordinate_buffer function
+
+
+def iter_points(points, dims):
+    """
+    Iterate Points, the points as tuples whether given as a sequence of
+    tuples or as a buffer, see "as_coordinate_buffer"
+
+    :param points: the points, a buffer or a sequence of tuples
+    :param dims: the number of values per point
+    :type dims: int
+    :return: the points
+    :rtype: iterable
+    """
+    coordinates = as_coordinate_buffer(points, dims)
+    if coordinates is None:
+        return points
+    return iter_unpack('<{0}d'.format(dims), coordinates[0])
+# End iter_points function
+
+
+def header_envelope_type(header):
+    """
+    Header Envelope Type, the envelope type given by the flags of a
+    geopackage binary header
+
+    :param header: the binary header, see "make_gpkg_geom_header"
+    :return: the envelope type, see EnvelopeType
+    :rtype: int
+    """
+    if len(header) < GPKG_HEADER_SIZE:
+        return EnvelopeType.none
+    flags, = unpack_from('<B', header, 3)
+    return (flags & ENVELOPE_FLAGS) >> 1
+# End header_envelope_type function
+
+
+def split_header(header, envelope_type=None):
+    """
+    Split Header, the geopackage binary header without envelope values and
+    with the flags of the envelope type.  The envelope type of the header
+    is used when none is given, no envelope is added to plain WKB.
+
+    :param header: the binary header, see "make_gpkg_geom_header", or empty
+        bytes for plain WKB
+    :param envelope_type: The envelope type, see EnvelopeType
+    :type envelope_type: int
+    :return: the header and the envelope type
+    :rtype: tuple
+    """
+    if len(header) < GPKG_HEADER_SIZE:
+        return header, EnvelopeType.none
+    if envelope_type is None:
+        envelope_type = header_envelope_type(header)
+    if (len(header) == GPKG_HEADER_SIZE and
+            header_envelope_type(header) == envelope_type):
+        return header, envelope_type
+    flags, = unpack_from('<B', header, 3)
+    flags = (flags & ~ENVELOPE_FLAGS) | (envelope_type << 1)
+    return header[:3] + pack('<B', flags) + header[4:8], envelope_type
+# End split_header function
+
+
+class _Bounds(object):
+    """
+    Bounds of the coordinates of a geometry, expanded as the coordinates
+    are packed
+    """
+    def __init__(self, envelope_type):
+        """
+        Initialize the _Bounds class
+
+        :param envelope_type: The envelope type, see EnvelopeType
+        :type envelope_type: int
+        """
+        super(_Bounds, self).__init__()
+        self.indexes = ENVELOPE_INDEXES[envelope_type]
+        self.lows = [INF] * len(self.indexes)
+        self.highs = [-INF] * len(self.indexes)
+    # End init built-in
+
+    @property
+    def envelope(self):
+        """
+        Envelope, in geopackage order, min x, max x, min y, max y, etc.
+        All values are NaN when there are no coordinates.
+
+        :rtype: tuple
+        """
+        if self.lows[0] > self.highs[0]:
+            return (NAN,) * (2 * len(self.indexes))
+        return tuple(chain.from_iterable(zip(self.lows, self.highs)))
+    # End envelope property
+# End _Bounds class
+
+
+def _prepare_rings(rings, dims):
+    """
+    Prepare Rings, the coordinates and point count of each ring (or line)
+    and the number of bytes they take as WKB, the first pass of building
+    a geometry into a single buffer.
+
+    :param rings: the rings, each a sequence of tuples or a buffer
+    :type rings: list
+    :param dims: the number of values per point
+    :type dims: int
+    :return: list of coordinates (memoryview or the points as given) and
+        point count, and the size in bytes
+    :rtype: tuple
+    """
+    prepared = []
+    size = 0
+    for points in rings:
+        coordinates = as_coordinate_buffer(points, dims)
+        if coordinates is None:
+            coordinates = points, len(points)
+        prepared.append(coordinates)
+        size += 4 + 8 * dims * coordinates[1]
+    return prepared, size
+# End _prepare_rings function
+
+
+def _allocate(header, size, envelope_type=None):
+    """
+    Allocate the output buffer of a geometry with the header written.  When
+    an envelope is requested room is left for it, it is written by
+    "_write_envelope" once the coordinates are packed.
+
+    :param header: the geopackage binary header or empty bytes
+    :param size: the size of the well known binary
+    :type size: int
+    :param envelope_type: The envelope to include in the header, see
+        EnvelopeType, defaults to the envelope type of the header
+    :type envelope_type: int
+    :return: the buffer, the position following the header and the bounds
+        to expand (None when there is no envelope)
+    :rtype: tuple
+    """
+    header, envelope_type = split_header(header, envelope_type)
+    bounds = None
+    offset = len(header)
+    if envelope_type:
+        bounds = _Bounds(envelope_type)
+        offset += 16 * len(bounds.indexes)
+    out = bytearray(offset + size)
+    out[:len(header)] = header
+    return out, offset, bounds
+# End _allocate function
+
+
+def _write_envelope(out, bounds):
+    """
+    Write the envelope of the packed coordinates following the header
+
+    :param out: the output buffer
+    :type out: bytearray
+    :param bounds: the bounds, None when there is no envelope
+    :type bounds: _Bounds
+    :return: the output buffer
+    :rtype: bytearray
+    """
+    if bounds is not None:
+        envelope = bounds.envelope
+        pack_into('<{0}d'.format(len(envelope)), out, GPKG_HEADER_SIZE,
+                  *envelope)
+    return out
+# End _write_envelope function
+
+
+def _pack_points(out, offset, points, dims, bounds=None, prefix=EMPTY_B):
+    """
+    Pack points one at a time, expanding the bounds with each point in the
+    same pass
+
+    :param out: the output buffer
+    :type out: bytearray
+    :param offset: the position to write to
+    :type offset: int
+    :param points: the points, tuples of values
+    :type points: iterable
+    :param dims: the number of values per point
+    :type dims: int
+    :param bounds: the bounds to expand, if any
+    :type bounds: _Bounds
+    :param prefix: byte order and type written before each point
+    :return: the position following the points
+    :rtype: int
+    """
+    packer = Struct('<{0}d'.format(dims))
+    step = packer.size
+    pairs, lows, highs = (), None, None
+    if bounds is not None:
+        pairs = list(enumerate(bounds.indexes))
+        lows, highs = bounds.lows, bounds.highs
+    for point in points:
+        if prefix:
+            out[offset:offset + len(prefix)] = prefix
+            offset += len(prefix)
+        packer.pack_into(out, offset, *point)
+        offset += step
+        for i, index in pairs:
+            value = point[index]
+            if value < lows[i]:
+                lows[i] = value
+            if value > highs[i]:
+                highs[i] = value
+    return offset
+# End _pack_points function
+
+
+def _write_prefix(out, offset, prefix, count):
+    """
+    Write the byte order and type of a geometry followed by a count
+
+    :return: the position following the count
+    :rtype: int
+    """
+    end = offset + len(prefix)
+    out[offset:end] = prefix
+    pack_into('<I', out, end, count)
+    return end + 4
+# End _write_prefix function
+
+
+def _write_rings(out, offset, rings, dims, prefix=EMPTY_B, bounds=None):
+    """
+    Write prepared rings (or lines), each ring is its point count followed
+    by its coordinates and is optionally preceded by the byte order and
+    type of a geometry.  Buffers are copied as is, tuples are packed with a
+    single call per ring.  When there are bounds to expand the points are
+    packed one at a time instead, see "_pack_points".
+
+    :param out: the output buffer
+    :type out: bytearray
+    :param offset: the position to write to
+    :type offset: int
+    :param rings: the rings, see "_prepare_rings"
+    :type rings: list
+    :param dims: the number of values per point
+    :type dims: int
+    :param prefix: byte order and type written before each ring
+    :param bounds: the bounds to expand, if any
+    :type bounds: _Bounds
+    :return: the position following the rings
+    :rtype: int
+    """
+    for coordinates, count in rings:
+        if prefix:
+            out[offset:offset + len(prefix)] = prefix
+            offset += len(prefix)
+        pack_into('<I', out, offset, count)
+        offset += 4
+        size = 8 * dims * count
+        if bounds is not None:
+            if isinstance(coordinates, memoryview):
+                coordinates = iter_unpack('<{0}d'.format(dims), coordinates)
+            _pack_points(out, offset, coordinates, dims, bounds)
+        elif isinstance(coordinates, memoryview):
+            out[offset:offset + size] = coordinates
+        elif count:
+            pack_into('<{0}d'.format(dims * count), out, offset,
+                      *chain.from_iterable(coordinates))
+        offset += size
+    return offset
+# End _write_rings function
+
+
+def _build_line_string(header, prefix, points, dims, envelope_type=None):
+    """
+    Build a line string into a single buffer
+
+    :param header: the geopackage binary header or empty bytes
+    :param prefix: the byte order and type of the line string
+    :param points: the points, tuples or a coordinate buffer
+    :param dims: the number of values per point
+    :type dims: int
+    :param envelope_type: The envelope to include in the header, see
+        EnvelopeType
+    :type envelope_type: int
+    :return: the geometry
+    :rtype: str
+    """
+    rings, size = _prepare_rings([points], dims)
+    out, offset, bounds = _allocate(header, len(prefix) + size, envelope_type)
+    _write_rings(out, offset, rings, dims, prefix, bounds)
+    return buffer(_write_envelope(out, bounds))
+# End _build_line_string function
 
 
 def _point_to_wkb(x, y):
@@ -92,62 +455,6 @@ def _point_zm_to_wkb(x, y, z, m):
 # End point_zm_to_wkb function
 
 
-def _linear_ring_to_wkb(points):
-    """
-    Building Block Linear Ring
-
-    :param points: Points in the ring
-    :type points: list
-    :return: formatted string
-    :rtype: str
-    """
-    return pack('<I', len(points)) + EMPTY_B.join(
-        (_point_to_wkb(x, y) for x, y in points))
-# End linear_ring_to_wkb function
-
-
-def _linear_ring_z_to_wkb(points):
-    """    
-    Building Block Linear Ring Z
-
-    :param points: Points in the ring
-    :type points: list
-    :return: formatted string
-    :rtype: str
-    """
-    return pack('<I', len(points)) + EMPTY_B.join(
-        (_point_z_to_wkb(x, y, z) for x, y, z in points))
-# End linear_ring_z_to_wkb
-
-
-def _linear_ring_m_to_wkb(points):
-    """    
-    Building Block Linear Ring M
-
-    :param points: Points in the ring
-    :type points: list
-    :return: formatted string
-    :rtype: str
-    """
-    return pack('<I', len(points)) + EMPTY_B.join(
-        (_point_m_to_wkb(x, y, m) for x, y, m in points))
-# End linear_ring_m_to_wkb
-
-
-def _linear_ring_zm_to_wkb(points):
-    """
-    Building Block Linear Ring ZM
-
-    :param points: Points in the ring
-    :type points: list
-    :return: formatted string
-    :rtype: str
-    """
-    return pack('<I', len(points)) + EMPTY_B.join(
-        (_point_zm_to_wkb(x, y, z, m) for x, y, z, m in points))
-# End linear_ring_zm_to_wkb
-
-
 def point_to_wkb_point(x, y):
     """
     Point to WKBPoint
@@ -216,86 +523,143 @@ def point_zm_to_wkb_point_zm(x, y, z, m):
 # End point_zm_to_wkb_point_zm function
 
 
-def multipoint_to_wkb_multipoint(points):
+def multipoint_to_wkb_multipoint(points, header=EMPTY_B, envelope_type=None):
     """
     Multipoint to WKBMultiPoint
+
+    :param points: the points, tuples or a coordinate buffer
+    :type points: list or buffer
+    :param header: geopackage binary header written ahead of the geometry
+    :param envelope_type: The envelope to include in the header, see
+        EnvelopeType, computed while the coordinates are packed, defaults
+        to the envelope type of the header
+    :type envelope_type: int
+    :return: formatted string
+    :rtype: str
     """
-    return (WKB_MULTI_POINT_PRE + pack('<I', len(points)) +
-            EMPTY_B.join((point_to_wkb_point(x, y) for x, y in points)))
+    points = list(iter_points(points, 2))
+    size = len(WKB_POINT_PRE) + 16
+    out, offset, bounds = _allocate(
+        header, len(WKB_MULTI_POINT_PRE) + 4 + size * len(points),
+        envelope_type)
+    offset = _write_prefix(out, offset, WKB_MULTI_POINT_PRE, len(points))
+    _pack_points(out, offset, points, 2, bounds, WKB_POINT_PRE)
+    return buffer(_write_envelope(out, bounds))
 # End multipoint_to_wkb_multipoint function
 
 
-def points_to_wkb_line_string(points):
+def points_to_wkb_line_string(points, header=EMPTY_B, envelope_type=None):
     """
     Points to WKB LineString
 
-    :param points: Points in the ring
-    :type points: list
+    :param points: Points in the ring, tuples or a coordinate buffer, see
+        "as_coordinate_buffer"
+    :type points: list or buffer
+    :param header: geopackage binary header written ahead of the geometry
+    :param envelope_type: The envelope to include in the header, see
+        EnvelopeType, computed while the coordinates are packed, defaults
+        to the envelope type of the header
+    :type envelope_type: int
     :return: formatted string
     :rtype: str
     """
-    return (WKB_LINESTRING_PRE + pack('<I', len(points)) +
-            EMPTY_B.join((_point_to_wkb(x, y) for x, y in points)))
+    return _build_line_string(
+        header, WKB_LINESTRING_PRE, points, 2, envelope_type)
 # End points_to_wkb_line_string
 
 
-def points_z_to_wkb_line_string_z(points):
+def points_z_to_wkb_line_string_z(points, header=EMPTY_B,
+                                  envelope_type=None):
     """
     Points to WKB LineString Z
 
-    :param points: Points in the ring
-    :type points: list
+    :param points: Points in the ring, tuples or a coordinate buffer, see
+        "as_coordinate_buffer"
+    :type points: list or buffer
+    :param header: geopackage binary header written ahead of the geometry
+    :param envelope_type: The envelope to include in the header, see
+        EnvelopeType, computed while the coordinates are packed, defaults
+        to the envelope type of the header
+    :type envelope_type: int
     :return: formatted string
     :rtype: str
     """
-    return (WKB_LINESTRINGZ_PRE + pack('<I', len(points)) +
-            EMPTY_B.join((_point_z_to_wkb(x, y, z) for x, y, z in points)))
+    return _build_line_string(
+        header, WKB_LINESTRINGZ_PRE, points, 3, envelope_type)
 # End points_to_wkb_line_string
 
 
-def points_m_to_wkb_line_string_m(points):
+def points_m_to_wkb_line_string_m(points, header=EMPTY_B,
+                                  envelope_type=None):
     """
     Points to WKB LineString M
 
-    :param points: Points in the ring
-    :type points: list
+    :param points: Points in the ring, tuples or a coordinate buffer, see
+        "as_coordinate_buffer"
+    :type points: list or buffer
+    :param header: geopackage binary header written ahead of the geometry
+    :param envelope_type: The envelope to include in the header, see
+        EnvelopeType, computed while the coordinates are packed, defaults
+        to the envelope type of the header
+    :type envelope_type: int
     :return: formatted string
     :rtype: str
     """
-    return (WKB_LINESTRINGM_PRE + pack('<I', len(points)) +
-            EMPTY_B.join((_point_m_to_wkb(x, y, m) for x, y, m in points)))
+    return _build_line_string(
+        header, WKB_LINESTRINGM_PRE, points, 3, envelope_type)
 # End points_to_wkb_line_string
 
 
-def points_zm_to_wkb_line_string_zm(points):
+def points_zm_to_wkb_line_string_zm(points, header=EMPTY_B,
+                                    envelope_type=None):
     """
     Points to WKB LineString ZM
 
-    :param points: Points in the ring
-    :type points: list
+    :param points: Points in the ring, tuples or a coordinate buffer, see
+        "as_coordinate_buffer"
+    :type points: list or buffer
+    :param header: geopackage binary header written ahead of the geometry
+    :param envelope_type: The envelope to include in the header, see
+        EnvelopeType, computed while the coordinates are packed, defaults
+        to the envelope type of the header
+    :type envelope_type: int
     :return: formatted string
     :rtype: str
     """
-    return (WKB_LINESTRINGZM_PRE + pack('<I', len(points)) +
-            EMPTY_B.join((
-                _point_zm_to_wkb(x, y, z, m) for x, y, z, m in points)))
+    return _build_line_string(
+        header, WKB_LINESTRINGZM_PRE, points, 4, envelope_type)
 # End point_zm_to_wkb_line_string_zm function
 
 
-def point_lists_to_multi_line_string(point_lists):
+def point_lists_to_multi_line_string(point_lists, header=EMPTY_B,
+                                     envelope_type=None):
     """
     Point lists to WKB MultiLineString
 
     i.e. [[(x, y), (x, y), ..],[(x, y), (x, y)...]] is a multi line
 
+    :param point_lists: List of lines, each tuples or a coordinate buffer
+    :type point_lists: list
+    :param header: geopackage binary header written ahead of the geometry
+    :param envelope_type: The envelope to include in the header, see
+        EnvelopeType, computed while the coordinates are packed, defaults
+        to the envelope type of the header
+    :type envelope_type: int
+    :return: formatted string
+    :rtype: str
     """
-    return (WKB_MULTI_LINESTRING_PRE + pack('<I', len(point_lists)) +
-            EMPTY_B.join((
-                points_to_wkb_line_string(ring) for ring in point_lists)))
+    lines, size = _prepare_rings(point_lists, 2)
+    out, offset, bounds = _allocate(
+        header, len(WKB_MULTI_LINESTRING_PRE) + 4 + size +
+        len(WKB_LINESTRING_PRE) * len(lines), envelope_type)
+    offset = _write_prefix(out, offset, WKB_MULTI_LINESTRING_PRE, len(lines))
+    _write_rings(out, offset, lines, 2, WKB_LINESTRING_PRE, bounds)
+    return buffer(_write_envelope(out, bounds))
 # End point_lists_to_multi_line_String function
 
 
-def point_lists_to_wkb_polygon(ring_point_lists):
+def point_lists_to_wkb_polygon(ring_point_lists, header=EMPTY_B,
+                               envelope_type=None):
     """
     Ring point lists should be lists of points representing poly rings.
 
@@ -305,32 +669,53 @@ def point_lists_to_wkb_polygon(ring_point_lists):
 
     :param ring_point_lists: List of List of POints
     :type ring_point_lists: list
+    :param header: geopackage binary header written ahead of the geometry
+    :param envelope_type: The envelope to include in the header, see
+        EnvelopeType, computed while the coordinates are packed, defaults
+        to the envelope type of the header
+    :type envelope_type: int
     :return: formatted string
     :rtype: str
     """
-    return (WKB_POLY_PRE + pack('<I', len(ring_point_lists)) +
-            EMPTY_B.join((
-                _linear_ring_to_wkb(ring) for ring in ring_point_lists)))
+    rings, size = _prepare_rings(ring_point_lists, 2)
+    out, offset, bounds = _allocate(
+        header, len(WKB_POLY_PRE) + 4 + size, envelope_type)
+    offset = _write_prefix(out, offset, WKB_POLY_PRE, len(rings))
+    _write_rings(out, offset, rings, 2, bounds=bounds)
+    return buffer(_write_envelope(out, bounds))
 # End point_lists_to_wkb_polygon function
 
 
-def point_lists_to_wkb_multipolygon(polygon_ring_lists):
+def point_lists_to_wkb_multipolygon(polygon_ring_lists, header=EMPTY_B,
+                                    envelope_type=None):
     """
     This is a list (polygons) which are lists of rings which are lists of points
     Point lists should be lists of points representing poly rings.
 
     i.e. [[[(x, y), (x, y), ..],[(x, y), (x, y)...]],[etc]]
 
+    The sizes of all the parts are computed first and the geometry is
+    written into a single buffer, linear in the number of parts.
+
     :param polygon_ring_lists: List of List of List of points
     :type polygon_ring_lists: list
+    :param header: geopackage binary header written ahead of the geometry
+    :param envelope_type: The envelope to include in the header, see
+        EnvelopeType, computed while the coordinates are packed, defaults
+        to the envelope type of the header
+    :type envelope_type: int
     :return: formatted string
     :rtype: str
     """
-    num = pack('<I', len(polygon_ring_lists))
-    out = EMPTY_B
-    for point_list in polygon_ring_lists:
-        out += point_lists_to_wkb_polygon(point_list)
-    return WKB_MULTI_POLY_PRE + num + out
+    polygons = [_prepare_rings(rings, 2) for rings in polygon_ring_lists]
+    size = sum(len(WKB_POLY_PRE) + 4 + part_size for _, part_size in polygons)
+    out, offset, bounds = _allocate(
+        header, len(WKB_MULTI_POLY_PRE) + 4 + size, envelope_type)
+    offset = _write_prefix(out, offset, WKB_MULTI_POLY_PRE, len(polygons))
+    for rings, _ in polygons:
+        offset = _write_prefix(out, offset, WKB_POLY_PRE, len(rings))
+        offset = _write_rings(out, offset, rings, 2, bounds=bounds)
+    return buffer(_write_envelope(out, bounds))
 # End point_lists_to_wkb_polygon function
 
 
@@ -0,0 +1,954 @@
+"""
+Vectorized Conversion to and from Geopackage Geometry Blobs, requires numpy
+"""
+from struct import pack, unpack_from
+from pygeopkg.conversion.to_wkb import (
+    WKB_POINT_PRE, WKB_POINTZ_PRE, WKB_POINTM_PRE, WKB_POINTZM_PRE,
+    BYTE_UINT, EMPTY_B, ENVELOPE_INDEXES, split_header)
+from pygeopkg.conversion.from_geopkg_geom import (
+    read_gpkg_header, wkb_type_info, EWKB_SRID, WKB_POINT, WKB_MULTI_POINT,
+    WKB_MULTI_LINESTRING, WKB_MULTI_POLYGON)
+from pygeopkg.shared.messages import (
+    ERR_NUMPY_REQUIRED, ERR_COORDS_SHAPE, ERR_BAD_OFFSETS,
+    ERR_MIXED_DIMENSIONS, ERR_MIXED_GEOMETRY_TYPES)
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+FLOAT64 = '<f8'
+UINT32 = '<u4'
+
+WKB_LINESTRING = 2
+WKB_POLYGON = 3
+
+# nesting depth of the coordinates and the family of each geometry type,
+# single and multi part geometries of a family can be decoded together
+DEPTHS_AND_FAMILIES = {
+    WKB_POINT: (0, WKB_POINT),
+    WKB_LINESTRING: (1, WKB_LINESTRING),
+    WKB_POLYGON: (2, WKB_POLYGON),
+    WKB_MULTI_POINT: (1, WKB_POINT),
+    WKB_MULTI_LINESTRING: (2, WKB_LINESTRING),
+    WKB_MULTI_POLYGON: (3, WKB_POLYGON),
+}
+
+
+def _require_numpy():
+    """
+    Require Numpy, raises an ImportError if numpy is not available
+    """
+    if np is None:
+        raise ImportError(ERR_NUMPY_REQUIRED)
+# End _require_numpy function
+
+
+def as_coordinates(coords, dims):
+    """
+    As Coordinates, coerce coordinates into a contiguous little endian
+    float64 array of shape (N, dims)
+
+    :param coords: The coordinates, array like
+    :param dims: The number of dimensions (2, 3 or 4)
+    :type dims: int
+    :return: the coordinates array
+    :rtype: numpy.ndarray
+    """
+    _require_numpy()
+    coords = np.ascontiguousarray(coords, dtype=FLOAT64)
+    if coords.ndim != 2 or coords.shape[1] != dims:
+        raise ValueError(ERR_COORDS_SHAPE.format(dims, coords.shape))
+    return coords
+# End as_coordinates function
+
+
+class BlobSequence(object):
+    """
+    Blob Sequence, a read only sequence of blobs over a single contiguous
+    buffer.  Items are zero-copy memoryview slices of the buffer, suitable
+    for use directly as sqlite parameters.
+    """
+    def __init__(self, data, offsets):
+        """
+        Initialize the BlobSequence class
+
+        :param data: The contiguous buffer holding all the blobs
+        :param offsets: The byte offsets of the blobs in the buffer, one more
+            than the number of blobs, or the size of each blob when all blobs
+            are the same size.
+        :type offsets: numpy.ndarray or int
+        """
+        super(BlobSequence, self).__init__()
+        self._view = memoryview(data).cast('B')
+        if isinstance(offsets, int):
+            offsets = np.arange(0, self._view.nbytes + 1, offsets or 1)
+        self._offsets = offsets
+    # End init built-in
+
+    def __len__(self):
+        """
+        Length
+        """
+        return len(self._offsets) - 1
+    # End __len__ built-in
+
+    def __getitem__(self, index):
+        """
+        Get a blob by index (slices return a new BlobSequence)
+        """
+        count = len(self)
+        if isinstance(index, slice):
+            start, stop, step = index.indices(count)
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            stop = max(start, stop)
+            offsets = self._offsets[start:stop + 1]
+            begin = int(offsets[0])
+            return BlobSequence(
+                self._view[begin:int(offsets[-1])], offsets - begin)
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError(index)
+        return self._view[int(self._offsets[index]):
+                          int(self._offsets[index + 1])]
+    # End __getitem__ built-in
+
+    def __iter__(self):
+        """
+        Iterate over the blobs
+        """
+        view, offsets = self._view, self._offsets.tolist()
+        for start, end in zip(offsets[:-1], offsets[1:]):
+            yield view[start:end]
+    # End __iter__ built-in
+
+    @property
+    def offsets(self):
+        """
+        Byte offsets of the blobs in the buffer
+
+        :rtype: numpy.ndarray
+        """
+        return self._offsets
+    # End offsets property
+
+    def tobytes(self):
+        """
+        The underlying buffer as bytes
+
+        :rtype: bytes
+        """
+        return self._view.tobytes()
+    # End tobytes method
+# End BlobSequence class
+
+
+def _to_blobs(data, offsets, as_memoryview):
+    """
+    To Blobs, split a buffer into blobs
+
+    :param data: the uint8 array holding all the blobs
+    :param offsets: the byte offsets of the blobs or the size of each blob
+    :param as_memoryview: flag to return a BlobSequence of memoryviews
+    :return: the blobs
+    :rtype: list or BlobSequence
+    """
+    blobs = BlobSequence(data, offsets)
+    if as_memoryview:
+        return blobs
+    data = data.tobytes()
+    offsets = blobs.offsets.tolist()
+    return [data[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+# End _to_blobs function
+
+
+def _envelopes(coords, vertex_offsets, envelope_type):
+    """
+    Envelopes, computes the envelope of each geometry in one vectorized
+    reduction per coordinate.
+
+    :param coords: the coordinates, shape (V, dims)
+    :param vertex_offsets: offsets of each geometry into the vertices
+    :param envelope_type: The envelope type, see EnvelopeType
+    :type envelope_type: int
+    :return: array of shape (G, 2 * k), min and max interleaved in geopackage
+        order, NaN for empty geometries
+    :rtype: numpy.ndarray
+    """
+    columns = coords[:, list(ENVELOPE_INDEXES[envelope_type])]
+    counts = np.diff(vertex_offsets)
+    envelopes = np.full((len(counts), 2 * columns.shape[1]), np.nan)
+    has_vertices = counts > 0
+    if has_vertices.any():
+        starts = vertex_offsets[:-1][has_vertices]
+        envelopes[has_vertices, 0::2] = np.minimum.reduceat(columns, starts)
+        envelopes[has_vertices, 1::2] = np.maximum.reduceat(columns, starts)
+    return envelopes
+# End _envelopes function
+
+
+def _points_to_gpkg(header, coords, prefix, dims, as_memoryview,
+                    envelope_type=None):
+    """
+    Points to Geopackage Points, all blobs are built in one structured array
+    whose records are the header, the envelope (if any), the WKB prefix and
+    the coordinates.
+
+    :param header: the binary header, see "make_gpkg_geom_header"
+    :param coords: array like of shape (N, dims)
+    :param prefix: the WKB byte order and type prefix
+    :param dims: the number of dimensions
+    :param as_memoryview: flag to return a BlobSequence of memoryviews
+    :param envelope_type: The envelope to include in the header
+    :return: the blobs
+    :rtype: list or BlobSequence
+    """
+    coords = as_coordinates(coords, dims)
+    header, envelope_type = split_header(header, envelope_type)
+    indexes = list(ENVELOPE_INDEXES.get(envelope_type, ()))
+    dtype = np.dtype([
+        ('header', 'V{0}'.format(len(header))),
+        ('envelope', FLOAT64, (2 * len(indexes),)),
+        ('prefix', 'V{0}'.format(len(prefix))),
+        ('coords', FLOAT64, (dims,))])
+    records = np.empty(len(coords), dtype=dtype)
+    records['header'] = np.void(header)
+    if indexes:
+        records['envelope'][:, 0::2] = coords[:, indexes]
+        records['envelope'][:, 1::2] = coords[:, indexes]
+    records['prefix'] = np.void(prefix)
+    records['coords'] = coords
+    return _to_blobs(records.view(np.uint8), dtype.itemsize, as_memoryview)
+# End _points_to_gpkg function
+
+
+def points_to_gpkg_points(header, coords, as_memoryview=False,
+                          envelope_type=None):
+    """
+    Points to Geopackage Points, encodes many points at once
+
+    :param header: the binary header, see "make_gpkg_geom_header"
+    :param coords: array like of shape (N, 2) holding x, y
+    :param as_memoryview: flag to return a zero-copy sequence of memoryviews
+        instead of a list of bytes
+    :type as_memoryview: bool
+    :param envelope_type: The envelope to include in the header, see
+        EnvelopeType, defaults to the envelope type of the header
+    :type envelope_type: int
+    :return: the blobs
+    :rtype: list or BlobSequence
+    """
+    return _points_to_gpkg(
+        header, coords, WKB_POINT_PRE, 2, as_memoryview, envelope_type)
+# End points_to_gpkg_points function
+
+
+def points_z_to_gpkg_points_z(header, coords, as_memoryview=False,
+                              envelope_type=None):
+    """
+    Points to Geopackage Points Z, encodes many points at once
+
+    :param header: the binary header, see "make_gpkg_geom_header"
+    :param coords: array like of shape (N, 3) holding x, y, z
+    :param as_memoryview: flag to return a zero-copy sequence of memoryviews
+        instead of a list of bytes
+    :type as_memoryview: bool
+    :param envelope_type: The envelope to include in the header, see
+        EnvelopeType, defaults to the envelope type of the header
+    :type envelope_type: int
+    :return: the blobs
+    :rtype: list or BlobSequence
+    """
+    return _points_to_gpkg(
+        header, coords, WKB_POINTZ_PRE, 3, as_memoryview, envelope_type)
+# End points_z_to_gpkg_points_z function
+
+
+def points_m_to_gpkg_points_m(header, coords, as_memoryview=False,
+                              envelope_type=None):
+    """
+    Points to Geopackage Points M, encodes many points at once
+
+    :param header: the binary header, see "make_gpkg_geom_header"
+    :param coords: array like of shape (N, 3) holding x, y, m
+    :param as_memoryview: flag to return a zero-copy sequence of memoryviews
+        instead of a list of bytes
+    :type as_memoryview: bool
+    :param envelope_type: The envelope to include in the header, see
+        EnvelopeType, defaults to the envelope type of the header
+    :type envelope_type: int
+    :return: the blobs
+    :rtype: list or BlobSequence
+    """
+    return _points_to_gpkg(
+        header, coords, WKB_POINTM_PRE, 3, as_memoryview, envelope_type)
+# End points_m_to_gpkg_points_m function
+
+
+def points_zm_to_gpkg_points_zm(header, coords, as_memoryview=False,
+                                envelope_type=None):
+    """
+    Points to Geopackage Points ZM, encodes many points at once
+
+    :param header: the binary header, see "make_gpkg_geom_header"
+    :param coords: array like of shape (N, 4) holding x, y, z, m
+    :param as_memoryview: flag to return a zero-copy sequence of memoryviews
+        instead of a list of bytes
+    :type as_memoryview: bool
+    :param envelope_type: The envelope to include in the header, see
+        EnvelopeType, defaults to the envelope type of the header
+    :type envelope_type: int
+    :return: the blobs
+    :rtype: list or BlobSequence
+    """
+    return _points_to_gpkg(
+        header, coords, WKB_POINTZM_PRE, 4, as_memoryview, envelope_type)
+# End points_zm_to_gpkg_points_zm function
+
+
+def _wkb_prefix(wkb_type, z, m):
+    """
+    WKB Prefix, the byte order and geometry type
+
+    :param wkb_type: the 2D WKB geometry type code
+    :type wkb_type: int
+    :param z: flag for z values
+    :param m: flag for m values
+    :return: the packed prefix
+    """
+    return pack(BYTE_UINT, 1, wkb_type + 1000 * bool(z) + 2000 * bool(m))
+# End _wkb_prefix function
+
+
+def _as_offsets(offsets, count):
+    """
+    As Offsets, coerce and validate an offsets array into the next level
+    (parts, rings or vertices) of a ragged array.
+
+    :param offsets: the offsets, array like
+    :param count: the number of items at the next level
+    :type count: int
+    :return: the offsets array
+    :rtype: numpy.ndarray
+    """
+    offsets = np.ascontiguousarray(offsets, dtype=np.int64)
+    if (offsets.ndim != 1 or not len(offsets) or offsets[0] != 0 or
+            offsets[-1] != count or (np.diff(offsets) < 0).any()):
+        raise ValueError(ERR_BAD_OFFSETS.format(count))
+    return offsets
+# End _as_offsets function
+
+
+def _exclusive_cumsum(values):
+    """
+    Exclusive Cumulative Sum, one longer than the values and starting at 0
+
+    :param values: the values
+    :rtype: numpy.ndarray
+    """
+    out = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum(values, out=out[1:])
+    return out
+# End _exclusive_cumsum function
+
+
+def _encode_ragged(header, coords, levels, as_memoryview,
+                   envelope_type=None, point_prefix=EMPTY_B):
+    """
+    Encode Ragged, encodes a batch of geometries held as a flat coordinate
+    array plus offset arrays.  The layout of every blob is computed up front
+    so the whole batch is written into one buffer in vectorized passes, one
+    pass per level for the counts and prefixes and one for the coordinates.
+
+    :param header: the binary header, empty for plain WKB
+    :param coords: the coordinates, validated, shape (V, dims)
+    :param levels: list of (offsets, prefix) from the geometries down to the
+        level whose children are vertices, the prefix is the WKB byte order
+        and type written for each item of the level (empty for rings)
+    :param as_memoryview: flag to return a BlobSequence of memoryviews
+    :param envelope_type: The envelope to include in the header
+    :param point_prefix: the WKB byte order and type written before the
+        coordinates of each vertex, for the points of multi points
+    :return: the blobs
+    :rtype: list or BlobSequence
+    """
+    lead = None
+    counted = [True] * len(levels)
+    if point_prefix:
+        levels = levels + [
+            (np.arange(len(coords) + 1, dtype=np.int64), point_prefix)]
+        counted.append(False)
+    header, envelope_type = split_header(header, envelope_type)
+    if envelope_type:
+        vertex_offsets = levels[-1][0]
+        for offsets, _ in reversed(levels[:-1]):
+            vertex_offsets = vertex_offsets[offsets]
+        envelopes = _envelopes(coords, vertex_offsets, envelope_type)
+        lead = np.empty((len(envelopes), len(header) + envelopes.nbytes //
+                         max(len(envelopes), 1)), dtype=np.uint8)
+        lead[:, :len(header)] = np.frombuffer(header, dtype=np.uint8)
+        lead[:, len(header):] = envelopes.view(np.uint8).reshape(
+            len(envelopes), -1)
+    elif header:
+        lead = np.frombuffer(header, dtype=np.uint8)[None, :]
+    metas = [len(prefix) + 4 * has_count
+             for (_, prefix), has_count in zip(levels, counted)]
+    if lead is not None:
+        metas[0] += lead.shape[1]
+    cumulative = np.arange(len(coords) + 1, dtype=np.int64) * (
+        coords.shape[1] * 8)
+    child_sizes = [None] * len(levels)
+    for i in reversed(range(len(levels))):
+        offsets = levels[i][0]
+        child_sizes[i] = cumulative
+        cumulative = _exclusive_cumsum(
+            metas[i] + cumulative[offsets[1:]] - cumulative[offsets[:-1]])
+    blob_offsets = cumulative
+    buffer_ = np.empty(blob_offsets[-1], dtype=np.uint8)
+    is_coord = np.ones(blob_offsets[-1], dtype=bool)
+    starts = blob_offsets[:-1]
+    for i, (offsets, prefix) in enumerate(levels):
+        counts = np.diff(offsets)
+        meta = np.empty((len(counts), metas[i]), dtype=np.uint8)
+        column = 0
+        if i == 0 and lead is not None:
+            column = lead.shape[1]
+            meta[:, :column] = lead
+        meta[:, column:column + len(prefix)] = np.frombuffer(
+            prefix, dtype=np.uint8)
+        if counted[i]:
+            meta[:, column + len(prefix):] = counts.astype(UINT32).view(
+                np.uint8).reshape(-1, 4)
+        positions = starts[:, None] + np.arange(metas[i])
+        buffer_[positions] = meta
+        is_coord[positions] = False
+        parents = np.repeat(np.arange(len(counts)), counts)
+        cumulative = child_sizes[i]
+        starts = (starts[parents] + metas[i] + cumulative[:-1] -
+                  cumulative[offsets[parents]])
+    buffer_[is_coord] = coords.view(np.uint8).ravel()
+    return _to_blobs(buffer_, blob_offsets, as_memoryview)
+# End _encode_ragged function
+
+
+def multipoints_to_wkb(coords, geom_offsets, z=False, m=False,
+                       as_memoryview=False):
+    """
+    Multi Points to WKB, encodes a batch of multi points
+
+    :param coords: the coordinates of all the points, shape (V, dims)
+    :param geom_offsets: offsets into the points, one per multi point plus
+        a final offset equal to the number of points
+    :param z: flag for z values
+    :param m: flag for m values
+    :param as_memoryview: flag to return a zero-copy sequence of memoryviews
+        instead of a list of bytes
+    :return: the blobs
+    :rtype: list or BlobSequence
+    """
+    return multipoints_to_gpkg_multipoints(
+        EMPTY_B, coords, geom_offsets, z=z, m=m, as_memoryview=as_memoryview)
+# End multipoints_to_wkb function
+
+
+def multipoints_to_gpkg_multipoints(header, coords, geom_offsets, z=False,
+                                    m=False, as_memoryview=False,
+                                    envelope_type=None):
+    """
+    Multi Points to Geopackage Multi Points, encodes a batch of multi
+    points, laid out as line strings with a WKB point prefix before the
+    coordinates of each point
+
+    :param header: the binary header, see "make_gpkg_geom_header"
+    :param coords: the coordinates of all the points, shape (V, dims)
+    :param geom_offsets: offsets into the points, one per multi point plus
+        a final offset equal to the number of points
+    :param z: flag for z values
+    :param m: flag for m values
+    :param as_memoryview: flag to return a zero-copy sequence of memoryviews
+        instead of a list of bytes
+    :param envelope_type: The envelope to include in the header, see
+        EnvelopeType, defaults to the envelope type of the header
+    :return: the blobs
+    :rtype: list or BlobSequence
+    """
+    coords = as_coordinates(coords, 2 + bool(z) + bool(m))
+    levels = [(_as_offsets(geom_offsets, len(coords)),
+               _wkb_prefix(WKB_MULTI_POINT, z, m))]
+    return _encode_ragged(
+        header, coords, levels, as_memoryview, envelope_type,
+        point_prefix=_wkb_prefix(WKB_POINT, z, m))
+# End multipoints_to_gpkg_multipoints function
+
+
+def linestrings_to_wkb(coords, geom_offsets, z=False, m=False,
+                       as_memoryview=False):
+    """
+    Line Strings to WKB, encodes a batch of line strings
+
+    :param coords: the coordinates of all the vertices, shape (V, dims)
+    :param geom_offsets: offsets into the vertices, one per line string plus
+        a final offset equal to the number of vertices
+    :param z: flag for z values
+    :param m: flag for m values
+    :param as_memoryview: flag to return a zero-copy sequence of memoryviews
+        instead of a list of bytes
+    :return: the blobs
+    :rtype: list or BlobSequence
+    """
+    return linestrings_to_gpkg_line_strings(
+        EMPTY_B, coords, geom_offsets, z=z, m=m, as_memoryview=as_memoryview)
+# End linestrings_to_wkb function
+
+
+def linestrings_to_gpkg_line_strings(header, coords, geom_offsets, z=False,
+                                     m=False, as_memoryview=False,
+                                     envelope_type=None):
+    """
+    Line Strings to Geopackage Line Strings, encodes a batch of line strings
+
+    :param header: the binary header, see "make_gpkg_geom_header"
+    :param coords: the coordinates of all the vertices, shape (V, dims)
+    :param geom_offsets: offsets into the vertices, one per line string plus
+        a final offset equal to the number of vertices
+    :param z: flag for z values
+    :param m: flag for m values
+    :param as_memoryview: flag to return a zero-copy sequence of memoryviews
+        instead of a list of bytes
+    :param envelope_type: The envelope to include in the header, see
+        EnvelopeType, defaults to the envelope type of the header
+    :return: the blobs
+    :rtype: list or BlobSequence
+    """
+    coords = as_coordinates(coords, 2 + bool(z) + bool(m))
+    levels = [(_as_offsets(geom_offsets, len(coords)),
+               _wkb_prefix(WKB_LINESTRING, z, m))]
+    return _encode_ragged(
+        header, coords, levels, as_memoryview, envelope_type)
+# End linestrings_to_gpkg_line_strings function
+
+
+def polygons_to_wkb(coords, geom_offsets, ring_offsets, z=False, m=False,
+                    as_memoryview=False):
+    """
+    Polygons to WKB, encodes a batch of polygons
+
+    :param coords: the coordinates of all the vertices, shape (V, dims)
+    :param geom_offsets: offsets into the rings, one per polygon plus a final
+        offset equal to the number of rings
+    :param ring_offsets: offsets into the vertices, one per ring plus a final
+        offset equal to the number of vertices
+    :param z: flag for z values
+    :param m: flag for m values
+    :param as_memoryview: flag to return a zero-copy sequence of memoryviews
+        instead of a list of bytes
+    :return: the blobs
+    :rtype: list or BlobSequence
+    """
+    return polygons_to_gpkg_polygons(
+        EMPTY_B, coords, geom_offsets, ring_offsets, z=z, m=m,
+        as_memoryview=as_memoryview)
+# End polygons_to_wkb function
+
+
+def polygons_to_gpkg_polygons(header, coords, geom_offsets, ring_offsets,
+                              z=False, m=False, as_memoryview=False,
+                              envelope_type=None):
+    """
+    Polygons to Geopackage Polygons, encodes a batch of polygons
+
+    :param header: the binary header, see "make_gpkg_geom_header"
+    :param coords: the coordinates of all the vertices, shape (V, dims)
+    :param geom_offsets: offsets into the rings, one per polygon plus a final
+        offset equal to the number of rings
+    :param ring_offsets: offsets into the vertices, one per ring plus a final
+        offset equal to the number of vertices
+    :param z: flag for z values
+    :param m: flag for m values
+    :param as_memoryview: flag to return a zero-copy sequence of memoryviews
+        instead of a list of bytes
+    :param envelope_type: The envelope to include in the header, see
+        EnvelopeType, defaults to the envelope type of the header
+    :return: the blobs
+    :rtype: list or BlobSequence
+    """
+    coords = as_coordinates(coords, 2 + bool(z) + bool(m))
+    ring_offsets = _as_offsets(ring_offsets, len(coords))
+    levels = [(_as_offsets(geom_offsets, len(ring_offsets) - 1),
+               _wkb_prefix(WKB_POLYGON, z, m)),
+              (ring_offsets, EMPTY_B)]
+    return _encode_ragged(
+        header, coords, levels, as_memoryview, envelope_type)
+# End polygons_to_gpkg_polygons function
+
+
+def multi_linestrings_to_wkb(coords, geom_offsets, part_offsets, z=False,
+                             m=False, as_memoryview=False):
+    """
+    Multi Line Strings to WKB, encodes a batch of multi line strings
+
+    :param coords: the coordinates of all the vertices, shape (V, dims)
+    :param geom_offsets: offsets into the parts, one per multi line string
+        plus a final offset equal to the number of parts
+    :param part_offsets: offsets into the vertices, one per part plus a final
+        offset equal to the number of vertices
+    :param z: flag for z values
+    :param m: flag for m values
+    :param as_memoryview: flag to return a zero-copy sequence of memoryviews
+        instead of a list of bytes
+    :return: the blobs
+    :rtype: list or BlobSequence
+    """
+    return multi_linestrings_to_gpkg_multi_line_strings(
+        EMPTY_B, coords, geom_offsets, part_offsets, z=z, m=m,
+        as_memoryview=as_memoryview)
+# End multi_linestrings_to_wkb function
+
+
+def multi_linestrings_to_gpkg_multi_line_strings(
+        header, coords, geom_offsets, part_offsets, z=False, m=False,
+        as_memoryview=False, envelope_type=None):
+    """
+    Multi Line Strings to Geopackage Multi Line Strings, encodes a batch of
+    multi line strings
+
+    :param header: the binary header, see "make_gpkg_geom_header"
+    :param coords: the coordinates of all the vertices, shape (V, dims)
+    :param geom_offsets: offsets into the parts, one per multi line string
+        plus a final offset equal to the number of parts
+    :param part_offsets: offsets into the vertices, one per part plus a final
+        offset equal to the number of vertices
+    :param z: flag for z values
+    :param m: flag for m values
+    :param as_memoryview: flag to return a zero-copy sequence of memoryviews
+        instead of a list of bytes
+    :param envelope_type: The envelope to include in the header, see
+        EnvelopeType, defaults to the envelope type of the header
+    :return: the blobs
+    :rtype: list or BlobSequence
+    """
+    coords = as_coordinates(coords, 2 + bool(z) + bool(m))
+    part_offsets = _as_offsets(part_offsets, len(coords))
+    levels = [(_as_offsets(geom_offsets, len(part_offsets) - 1),
+               _wkb_prefix(WKB_MULTI_LINESTRING, z, m)),
+              (part_offsets, _wkb_prefix(WKB_LINESTRING, z, m))]
+    return _encode_ragged(
+        header, coords, levels, as_memoryview, envelope_type)
+# End multi_linestrings_to_gpkg_multi_line_strings function
+
+
+def multi_polygons_to_wkb(coords, geom_offsets, part_offsets, ring_offsets,
+                          z=False, m=False, as_memoryview=False):
+    """
+    Multi Polygons to WKB, encodes a batch of multi polygons
+
+    :param coords: the coordinates of all the vertices, shape (V, dims)
+    :param geom_offsets: offsets into the parts (polygons), one per multi
+        polygon plus a final offset equal to the number of parts
+    :param part_offsets: offsets into the rings, one per part plus a final
+        offset equal to the number of rings
+    :param ring_offsets: offsets into the vertices, one per ring plus a final
+        offset equal to the number of vertices
+    :param z: flag for z values
+    :param m: flag for m values
+    :param as_memoryview: flag to return a zero-copy sequence of memoryviews
+        instead of a list of bytes
+    :return: the blobs
+    :rtype: list or BlobSequence
+    """
+    return multi_polygons_to_gpkg_multi_polygons(
+        EMPTY_B, coords, geom_offsets, part_offsets, ring_offsets, z=z, m=m,
+        as_memoryview=as_memoryview)
+# End multi_polygons_to_wkb function
+
+
+def multi_polygons_to_gpkg_multi_polygons(
+        header, coords, geom_offsets, part_offsets, ring_offsets, z=False,
+        m=False, as_memoryview=False, envelope_type=None):
+    """
+    Multi Polygons to Geopackage Multi Polygons, encodes a batch of multi
+    polygons
+
+    :param header: the binary header, see "make_gpkg_geom_header"
+    :param coords: the coordinates of all the vertices, shape (V, dims)
+    :param geom_offsets: offsets into the parts (polygons), one per multi
+        polygon plus a final offset equal to the number of parts
+    :param part_offsets: offsets into the rings, one per part plus a final
+        offset equal to the number of rings
+    :param ring_offsets: offsets into the vertices, one per ring plus a final
+        offset equal to the number of vertices
+    :param z: flag for z values
+    :param m: flag for m values
+    :param as_memoryview: flag to return a zero-copy sequence of memoryviews
+        instead of a list of bytes
+    :param envelope_type: The envelope to include in the header, see
+        EnvelopeType, defaults to the envelope type of the header
+    :return: the blobs
+    :rtype: list or BlobSequence
+    """
+    coords = as_coordinates(coords, 2 + bool(z) + bool(m))
+    ring_offsets = _as_offsets(ring_offsets, len(coords))
+    part_offsets = _as_offsets(part_offsets, len(ring_offsets) - 1)
+    levels = [(_as_offsets(geom_offsets, len(part_offsets) - 1),
+               _wkb_prefix(WKB_MULTI_POLYGON, z, m)),
+              (part_offsets, _wkb_prefix(WKB_POLYGON, z, m)),
+              (ring_offsets, EMPTY_B)]
+    return _encode_ragged(
+        header, coords, levels, as_memoryview, envelope_type)
+# End multi_polygons_to_gpkg_multi_polygons function
+
+
+def _wkb_layout(wkb, offset, chunks):
+    """
+    WKB Layout, walks the structure of a well known binary geometry, the
+    coordinates are collected as little endian byte chunks without being
+    unpacked.
+
+    :param wkb: the buffer containing the well known binary
+    :type wkb: memoryview
+    :param offset: the position of the geometry in the buffer
+    :type offset: int
+    :param chunks: the coordinate chunks, appended to
+    :type chunks: list
+    :return: the base type, z and m flags, the layout and the position
+        following the geometry.  The layout is the number of vertices for
+        geometries at depth 0 and 1, and a list of child layouts otherwise.
+    :rtype: tuple
+    """
+    order, = unpack_from('<B', wkb, offset)
+    endian = '<' if order else '>'
+    code, = unpack_from(endian + 'I', wkb, offset + 1)
+    offset += 5 + 4 * bool(code & EWKB_SRID)
+    code, has_z, has_m = wkb_type_info(code)
+    if code not in DEPTHS_AND_FAMILIES:
+        raise ValueError(ERR_MIXED_GEOMETRY_TYPES)
+    dims = 2 + has_z + has_m
+    if code == WKB_POINT:
+        count = 1
+    else:
+        count, = unpack_from(endian + 'I', wkb, offset)
+        offset += 4
+    if code in (WKB_POINT, WKB_LINESTRING):
+        size = 8 * dims * count
+        chunk = wkb[offset:offset + size]
+        if endian == '>':
+            chunk = np.frombuffer(chunk, dtype='>f8').astype(FLOAT64).data
+        chunks.append(chunk)
+        return code, has_z, has_m, count, offset + size
+    layout = []
+    for _ in range(count):
+        if code == WKB_POLYGON:
+            part, offset = _wkb_layout_ring(wkb, offset, endian, dims, chunks)
+        else:
+            _, _, _, part, offset = _wkb_layout(wkb, offset, chunks)
+        layout.append(part)
+    if code == WKB_MULTI_POINT:
+        layout = len(layout)
+    return code, has_z, has_m, layout, offset
+# End _wkb_layout function
+
+
+def _wkb_layout_ring(wkb, offset, endian, dims, chunks):
+    """
+    WKB Layout of a polygon ring, see "_wkb_layout"
+
+    :return: the number of vertices and the position following the ring
+    :rtype: tuple
+    """
+    count, = unpack_from(endian + 'I', wkb, offset)
+    offset += 4
+    size = 8 * dims * count
+    chunk = wkb[offset:offset + size]
+    if endian == '>':
+        chunk = np.frombuffer(chunk, dtype='>f8').astype(FLOAT64).data
+    chunks.append(chunk)
+    return count, offset + size
+# End _wkb_layout_ring function
+
+
+def _promote(layout, depth, target):
+    """
+    Promote a layout to a deeper (multi part) layout
+
+    :param layout: the layout, see "_wkb_layout"
+    :param depth: the depth of the layout
+    :type depth: int
+    :param target: the depth to promote to
+    :type target: int
+    :return: the layout
+    """
+    if depth == target:
+        return layout
+    if depth == 0:
+        return _promote(layout, 1, target)
+    return _promote([layout], depth + 1, target)
+# End _promote function
+
+
+def gpkg_geometries_to_ragged(blobs):
+    """
+    Geopackage Geometries to Ragged Arrays, decodes a batch of geometries
+    (e.g. a column of a feature class) into a flat coordinate array plus
+    offset arrays, the inverse of the vectorized encoders.  Coordinates are
+    copied from the blobs as raw bytes, no Python object is created per
+    vertex.
+
+    All the geometries must have the same dimensions and belong to the same
+    family (points, lines or polygons), single part geometries are promoted
+    to multi part when mixed with multi part geometries.  A null geometry
+    is an empty geometry, or a point with NaN coordinates.
+
+    :param blobs: the geopackage geometries, any iterable
+    :type blobs: list or iterable
+    :return: tuple of the coordinates, shape (V, dims), followed by the
+        offsets from the geometries down to the vertices, e.g. geometry and
+        ring offsets for polygons, nothing for points
+    :rtype: tuple
+    """
+    return gpkg_geometries_to_ragged_chunk(blobs)[-1]
+# End gpkg_geometries_to_ragged function
+
+
+def gpkg_geometries_to_ragged_chunk(blobs):
+    """
+    Geopackage Geometries to a Ragged Chunk, decodes a batch of geometries
+    (e.g. the rows fetched at a time from a cursor) like
+    "gpkg_geometries_to_ragged" keeping what is needed to combine chunks
+    with "concatenate_ragged_chunks".
+
+    :param blobs: the geopackage geometries, any iterable
+    :type blobs: list or iterable
+    :return: the family (None when every geometry is null), the z and m
+        flags, a mask of the null geometries and the ragged arrays
+    :rtype: tuple
+    """
+    _require_numpy()
+    chunks = []
+    layouts = []
+    family = dims = None
+    depth = 0
+    for blob in blobs:
+        if blob is None:
+            chunks.append(None)
+            layouts.append(None)
+            continue
+        view = memoryview(blob).cast('B')
+        offset = read_gpkg_header(view)[-1]
+        code, has_z, has_m, layout, _ = _wkb_layout(view, offset, chunks)
+        geom_depth, geom_family = DEPTHS_AND_FAMILIES[code]
+        if family is None:
+            family, dims = geom_family, (has_z, has_m)
+        elif family != geom_family:
+            raise ValueError(ERR_MIXED_GEOMETRY_TYPES)
+        elif dims != (has_z, has_m):
+            raise ValueError(ERR_MIXED_DIMENSIONS)
+        depth = max(depth, geom_depth)
+        layouts.append((geom_depth, layout))
+    width = 2 + sum(dims or ())
+    empty = np.full(width if depth == 0 else 0, np.nan).tobytes()
+    coords = np.frombuffer(
+        EMPTY_B.join(empty if chunk is None else chunk for chunk in chunks),
+        dtype=FLOAT64).reshape(-1, width)
+    nulls = np.array([item is None for item in layouts], dtype=bool)
+    if depth == 0:
+        return family, dims, nulls, (coords,)
+    offsets = [[0] for _ in range(depth)]
+
+    def _walk(layout, level):
+        if level == depth - 1:
+            offsets[level].append(offsets[level][-1] + layout)
+            return
+        for child in layout:
+            _walk(child, level + 1)
+        offsets[level].append(len(offsets[level + 1]) - 1)
+
+    for item in layouts:
+        if item is None:
+            layout = 0 if depth == 1 else []
+        else:
+            layout = _promote(item[1], item[0], depth)
+        _walk(layout, 0)
+    return family, dims, nulls, (coords,) + tuple(
+        np.array(level, dtype=np.int64) for level in offsets)
+# End gpkg_geometries_to_ragged_chunk function
+
+
+def _promote_ragged(ragged, depth, nulls):
+    """
+    Promote ragged arrays to a deeper (multi part) layout, each geometry
+    becomes a single part and null geometries have no parts
+
+    :param ragged: the coordinates followed by the offsets
+    :type ragged: tuple
+    :param depth: the number of offset arrays to promote to
+    :type depth: int
+    :param nulls: the mask of the null geometries
+    :type nulls: numpy.ndarray
+    :return: the coordinates followed by the offsets
+    :rtype: tuple
+    """
+    if len(ragged) - 1 >= depth:
+        return ragged
+    kept = ~nulls
+    parts = np.concatenate(([0], np.cumsum(kept))).astype(np.int64)
+    if len(ragged) == 1:
+        return ragged[0][kept], parts
+    top = ragged[1][np.concatenate(([True], kept))]
+    return (ragged[0], parts, top) + ragged[2:]
+# End _promote_ragged function
+
+
+def concatenate_ragged_chunks(chunks):
+    """
+    Concatenate Ragged Chunks, combines the chunks decoded by
+    "gpkg_geometries_to_ragged_chunk" into the ragged arrays of all the
+    geometries, the offsets of each chunk are rebased on the chunks before
+    it.  Single part geometries are promoted when other chunks hold multi
+    part geometries, chunks of null geometries become empty geometries.
+
+    :param chunks: the decoded chunks, in order
+    :type chunks: list
+    :return: tuple of the coordinates, shape (V, dims), followed by the
+        offsets from the geometries down to the vertices
+    :rtype: tuple
+    """
+    _require_numpy()
+    family = dims = None
+    depth = 0
+    for chunk_family, chunk_dims, _, ragged in chunks:
+        if chunk_family is None:
+            continue
+        if family is None:
+            family, dims = chunk_family, chunk_dims
+        elif family != chunk_family:
+            raise ValueError(ERR_MIXED_GEOMETRY_TYPES)
+        elif dims != chunk_dims:
+            raise ValueError(ERR_MIXED_DIMENSIONS)
+        depth = max(depth, len(ragged) - 1)
+    width = 2 + sum(dims or ())
+    coords = [np.empty((0, width), dtype=FLOAT64)]
+    levels = [[np.zeros(1, dtype=np.int64)] for _ in range(depth)]
+    ends = [0] * depth
+    for chunk_family, _, nulls, ragged in chunks:
+        if chunk_family is None:
+            if depth == 0:
+                coords.append(np.full((len(nulls), width), np.nan))
+            else:
+                levels[0].append(
+                    np.full(len(nulls), ends[0], dtype=np.int64))
+            continue
+        ragged = _promote_ragged(ragged, depth, nulls)
+        coords.append(ragged[0])
+        for level, offsets in enumerate(ragged[1:]):
+            levels[level].append(offsets[1:] + ends[level])
+            ends[level] += int(offsets[-1])
+    return (np.concatenate(coords),) + tuple(
+        np.concatenate(level) for level in levels)
+# End concatenate_ragged_chunks function
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,542 @@
+"""
+Asyncio GeoPackage
+"""
+from asyncio import get_running_loop
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+
+from pygeopkg.core.geopkg import GeoPackage
+from pygeopkg.core.utils import connection_iterate
+from pygeopkg.shared.constants import (
+    DEFAULT_CHUNK_SIZE, DEFAULT_ROWS_PER_COMMIT, DEFAULT_QUEUE_SIZE)
+from pygeopkg.shared.enumeration import GPKGFLavors
+from pygeopkg.shared.messages import ERR_DIMENSION_NO_MATCH
+
+
+def _next_batch(rows, batch_size):
+    """
+    Next Batch, the next rows of a generator
+
+    :param rows: the generator of rows
+    :type rows: generator
+    :param batch_size: the maximum number of rows
+    :type batch_size: int
+    :return: the rows, empty when the generator is exhausted
+    :rtype: list
+    """
+    return list(islice(rows, batch_size))
+# End _next_batch function
+
+
+class AsyncGeoPackage(object):
+    """
+    Async GeoPackage, runs the work of a GeoPackage on a dedicated thread
+    holding the persistent connection, so coroutines await SQLite instead
+    of blocking the event loop.  Calls are executed one at a time, in the
+    order they are made.  Reads are streamed with async iterators that
+    fetch a batch of rows on the database thread at a time.
+
+    Use as an async context manager, or call "connect" and "close".
+    """
+    def __init__(self, full_path, profile=None):
+        """
+        Initialize the AsyncGeoPackage class
+
+        :param full_path: Full path to the geopackage sqlite db
+        :type full_path: str
+        :param profile: The performance profile for the persistent connection
+        :type profile: str or PragmaProfile
+        """
+        super(AsyncGeoPackage, self).__init__()
+        self.geopackage = GeoPackage(full_path, profile=profile)
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='pygeopkg')
+    # End init built-in
+
+    async def __aenter__(self):
+        """
+        Enter, opens the persistent connection
+
+        :return: this AsyncGeoPackage
+        :rtype: AsyncGeoPackage
+        """
+        return await self.connect()
+    # End __aenter__ built-in
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """
+        Exit, closes the persistent connection and stops the thread
+        """
+        await self.close()
+    # End __aexit__ built-in
+
+    @classmethod
+    async def create(cls, target_path, flavor=GPKGFLavors.esri,
+                     profile=None):
+        """
+        Create a new GeoPackage, see GeoPackage.create
+
+        :param target_path: The full path for the new geopackage
+        :type target_path: str
+        :param flavor: definition to use for the default WGS 84 SRS
+        :param profile: The performance profile
+        :type profile: str or PragmaProfile
+        :return: A new empty GeoPackage, not yet connected
+        :rtype: AsyncGeoPackage
+        """
+        gpkg = cls(target_path, profile=profile)
+        await gpkg.run(GeoPackage.create, target_path, flavor=flavor,
+                       profile=profile)
+        return gpkg
+    # End create method
+
+    @property
+    def full_path(self):
+        """
+        Full Path
+
+        :return: the path to the geopackage
+        :rtype: str
+        """
+        return self.geopackage.full_path
+    # End full_path property
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Run a function on the database thread, use it for anything not
+        wrapped by this class, e.g. run(gpkg.geopackage.verify_counts).
+        Objects returned by the GeoPackage (tables, generators) are bound
+        to the thread and must only be used through "run".
+
+        :param func: the function
+        :type func: function
+        :return: the result of the function
+        """
+        return await get_running_loop().run_in_executor(
+            self._executor, partial(func, *args, **kwargs))
+    # End run method
+
+    async def connect(self):
+        """
+        Open the persistent connection on the database thread
+
+        :return: this AsyncGeoPackage
+        :rtype: AsyncGeoPackage
+        """
+        await self.run(self.geopackage.connect)
+        return self
+    # End connect method
+
+    async def close(self):
+        """
+        Close the persistent connection and stop the database thread
+        """
+        try:
+            await self.run(self.geopackage.close)
+        finally:
+            self._executor.shutdown(wait=False)
+    # End close method
+
+    async def create_feature_class(self, *args, **kwargs):
+        """
+        Create a Feature Class, see GeoPackage.create_feature_class
+
+        :return: the feature class
+        :rtype: AsyncTable
+        """
+        fc = await self.run(
+            self.geopackage.create_feature_class, *args, **kwargs)
+        return AsyncTable(self, fc)
+    # End create_feature_class method
+
+    async def create_table(self, *args, **kwargs):
+        """
+        Create a Table, see GeoPackage.create_table
+
+        :return: the table
+        :rtype: AsyncTable
+        """
+        table = await self.run(self.geopackage.create_table, *args, **kwargs)
+        return AsyncTable(self, table)
+    # End create_table method
+
+    async def get_table(self, name):
+        """
+        Get a Feature Class or Table By Name
+
+        :param name: the name of the table/fc
+        :type name: str
+        :return: the feature class or table
+        :rtype: AsyncTable
+        """
+        table = await self.run(self.geopackage._get_table, name)
+        return AsyncTable(self, table)
+    # End get_table method
+
+    async def insert_rows(self, dataset_name, field_names, data,
+                          chunk_size=DEFAULT_CHUNK_SIZE, bulk=False):
+        """
+        Insert Rows into a Table, see GeoPackage.insert_rows.  The data is
+        consumed on the database thread, do not pass a generator that
+        depends on the event loop.
+
+        :param dataset_name: the name of the dataset to work with
+        :type dataset_name: str
+        :param field_names: the name of the fields
+        :type field_names: list or tuple
+        :param data: the data, any iterable of rows
+        :type data: list, tuple or iterable
+        :param chunk_size: the number of rows consumed from data at a time
+        :type chunk_size: int
+        :param bulk: flag to insert in bulk mode
+        :type bulk: bool
+        """
+        await self.run(self.geopackage.insert_rows, dataset_name,
+                       field_names, data, chunk_size=chunk_size, bulk=bulk)
+    # End insert_rows method
+
+    async def execute_query(self, sql, values=None):
+        """
+        Execute Query, see GeoPackage.execute_query
+
+        :param sql: the sql to execute
+        :type sql: str
+        :param values: the values to use
+        :return: The results of the query
+        :rtype: list
+        """
+        return await self.run(self.geopackage.execute_query, sql, values)
+    # End execute_query method
+
+    async def execute_many_query(self, sql, values=None):
+        """
+        Execute Many Query, see GeoPackage.execute_many_query
+
+        :param sql: the sql to execute
+        :type sql: str
+        :param values: the values to use
+        """
+        return await self.run(
+            self.geopackage.execute_many_query, sql, values)
+    # End execute_many_query method
+
+    async def iterate(self, sql, values=None, batch_size=DEFAULT_CHUNK_SIZE):
+        """
+        Iterate, an async iterator of the rows returned by a query, a batch
+        of rows is fetched from the cursor at a time
+
+        :param sql: The sql to execute
+        :type sql: str
+        :param values: The values to use with the sql
+        :param batch_size: The number of rows fetched at a time
+        :type batch_size: int
+        :return: async generator of rows
+        """
+        rows = await self.run(
+            connection_iterate, self.geopackage.database, sql, values,
+            batch_size=batch_size)
+        async for row in self._stream(rows, batch_size):
+            yield row
+    # End iterate method
+
+    async def _stream(self, rows, batch_size):
+        """
+        Stream, an async iterator over a generator living on the database
+        thread, the generator is closed on that thread when done
+
+        :param rows: the generator of rows
+        :type rows: generator
+        :param batch_size: The number of rows fetched at a time
+        :type batch_size: int
+        :return: async generator of rows
+        """
+        try:
+            while True:
+                batch = await self.run(_next_batch, rows, batch_size)
+                if not batch:
+                    break
+                for row in batch:
+                    yield row
+        finally:
+            await self.run(rows.close)
+    # End _stream method
+
+    def writer(self, dataset_name, field_names,
+               rows_per_commit=DEFAULT_ROWS_PER_COMMIT,
+               max_pending=DEFAULT_QUEUE_SIZE):
+        """
+        Async Batch Writer for a Table, see AsyncBatchWriter
+
+        :param dataset_name: the name of the dataset to work with
+        :type dataset_name: str
+        :param field_names: the name of the fields
+        :type field_names: list or tuple
+        :param rows_per_commit: the number of rows in a batch
+        :type rows_per_commit: int
+        :param max_pending: the number of batches written or waiting to be
+            written before a write waits
+        :type max_pending: int
+        :return: the writer, use as an async context manager or close
+        :rtype: AsyncBatchWriter
+        """
+        return AsyncBatchWriter(
+            self, dataset_name, field_names, rows_per_commit=rows_per_commit,
+            max_pending=max_pending)
+    # End writer method
+# End AsyncGeoPackage class
+
+
+class AsyncTable(object):
+    """
+    Async Table, a feature class or table of an AsyncGeoPackage, the work
+    is run on the database thread
+    """
+    def __init__(self, geopackage, table):
+        """
+        Initialize the AsyncTable class
+
+        :param geopackage: The geopackage
+        :type geopackage: AsyncGeoPackage
+        :param table: the feature class or table
+        :type table: GeoPkgFeatureClass or GeoPkgTable
+        """
+        super(AsyncTable, self).__init__()
+        self.geopackage = geopackage
+        self.table = table
+    # End init built-in
+
+    @property
+    def name(self):
+        """
+        Name
+
+        :return: the name of the table
+        :rtype: str
+        """
+        return self.table.name
+    # End name property
+
+    async def insert_rows(self, field_names, data,
+                          chunk_size=DEFAULT_CHUNK_SIZE, bulk=False):
+        """
+        Insert Rows, see BaseGeoPkgTable.insert_rows
+        """
+        await self.geopackage.run(
+            self.table.insert_rows, field_names, data, chunk_size=chunk_size,
+            bulk=bulk)
+    # End insert_rows method
+
+    async def insert_columns(self, columns, **kwargs):
+        """
+        Insert Columns, see BaseGeoPkgTable.insert_columns
+        """
+        await self.geopackage.run(
+            self.table.insert_columns, columns, **kwargs)
+    # End insert_columns method
+
+    async def get_count(self, exact=False):
+        """
+        Get the Count, see BaseGeoPkgTable.get_count
+
+        :return: the number of rows
+        :rtype: int
+        """
+        return await self.geopackage.run(self.table.get_count, exact=exact)
+    # End get_count method
+
+    async def search(self, fields=None, where=None, params=None,
+                     batch_size=DEFAULT_CHUNK_SIZE, named=False,
+                     decode=False):
+        """
+        Search, an async iterator of rows, see BaseGeoPkgTable.search
+
+        :return: async generator of rows
+        """
+        rows = await self.geopackage.run(
+            self.table.search, fields=fields, where=where, params=params,
+            batch_size=batch_size, named=named, decode=decode)
+        async for row in self.geopackage._stream(rows, batch_size):
+            yield row
+    # End search method
+
+    async def query_bbox(self, min_x, min_y, max_x, max_y, fields=None,
+                         batch_size=DEFAULT_CHUNK_SIZE):
+        """
+        Query by Bounding Box, an async iterator of rows, see
+        GeoPkgFeatureClass.query_bbox
+
+        :return: async generator of rows
+        """
+        rows = await self.geopackage.run(
+            self.table.query_bbox, min_x, min_y, max_x, max_y,
+            fields=fields, batch_size=batch_size)
+        async for row in self.geopackage._stream(rows, batch_size):
+            yield row
+    # End query_bbox method
+
+    def writer(self, field_names, rows_per_commit=DEFAULT_ROWS_PER_COMMIT,
+               max_pending=DEFAULT_QUEUE_SIZE):
+        """
+        Async Batch Writer for the Table, see AsyncBatchWriter
+
+        :rtype: AsyncBatchWriter
+        """
+        return self.geopackage.writer(
+            self.name, field_names, rows_per_commit=rows_per_commit,
+            max_pending=max_pending)
+    # End writer method
+# End AsyncTable class
+
+
+class AsyncBatchWriter(object):
+    """
+    Async Batch Writer, buffers rows and inserts them on the database thread
+    a batch at a time, each batch in its own transaction.  Writing returns
+    immediately while the number of batches written or waiting to be
+    written is below max_pending, otherwise it waits for the oldest batch,
+    so a slow commit slows the producers down instead of growing memory.
+    A failed batch is raised by the first write after it is done, or by
+    flush or close.
+    """
+    def __init__(self, geopackage, table_name, field_names,
+                 rows_per_commit=DEFAULT_ROWS_PER_COMMIT,
+                 max_pending=DEFAULT_QUEUE_SIZE):
+        """
+        Initialize the AsyncBatchWriter class
+
+        :param geopackage: The geopackage
+        :type geopackage: AsyncGeoPackage
+        :param table_name: The name of the table to write to
+        :type table_name: str
+        :param field_names: the names of the fields in each row
+        :type field_names: list or tuple
+        :param rows_per_commit: the number of rows in a batch
+        :type rows_per_commit: int
+        :param max_pending: the number of batches written or waiting to be
+            written before a write waits
+        :type max_pending: int
+        """
+        super(AsyncBatchWriter, self).__init__()
+        self.geopackage = geopackage
+        self.table_name = table_name
+        self.field_names = list(field_names)
+        self.rows_per_commit = rows_per_commit
+        self.max_pending = max(max_pending, 1)
+        self.row_count = 0
+        self._rows = []
+        self._pending = deque()
+    # End init built-in
+
+    async def __aenter__(self):
+        """
+        Enter
+
+        :return: this AsyncBatchWriter
+        :rtype: AsyncBatchWriter
+        """
+        return self
+    # End __aenter__ built-in
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """
+        Exit, writes outstanding rows unless an error occurred, in which
+        case the rows not yet submitted are discarded.
+        """
+        if exc_type is not None:
+            self._rows = []
+        await self.close()
+    # End __aexit__ built-in
+
+    async def write(self, row):
+        """
+        Write a row, the row is buffered until the batch is full
+
+        :param row: the row values, in the order of the field names
+        :type row: tuple or list
+        """
+        if not self._rows and len(row) != len(self.field_names):
+            raise ValueError(ERR_DIMENSION_NO_MATCH)
+        await self._wait_done()
+        self._rows.append(row)
+        if len(self._rows) >= self.rows_per_commit:
+            await self._submit()
+    # End write method
+
+    async def write_rows(self, rows):
+        """
+        Write many rows
+
+        :param rows: iterable of row values
+        :type rows: list or tuple
+        """
+        for row in rows:
+            await self.write(row)
+    # End write_rows method
+
+    async def _submit(self):
+        """
+        Submit the buffered rows to the database thread, waiting for the
+        oldest batch when too many are pending
+        """
+        await self._wait_done()
+        while len(self._pending) >= self.max_pending:
+            await self._wait_oldest()
+        if not self._rows:
+            return
+        rows, self._rows = self._rows, []
+        future = get_running_loop().run_in_executor(
+            self.geopackage._executor, partial(
+                self.geopackage.geopackage.insert_rows, self.table_name,
+                self.field_names, rows))
+        self._pending.append((future, len(rows)))
+    # End _submit method
+
+    async def _wait_oldest(self):
+        """
+        Wait for the oldest pending batch, raises if it failed
+        """
+        future, count = self._pending.popleft()
+        await future
+        self.row_count += count
+    # End _wait_oldest method
+
+    async def _wait_done(self):
+        """
+        Collect the batches already written, oldest first, raises if one
+        failed.  Does not wait for a batch still being written.
+        """
+        while self._pending and self._pending[0][0].done():
+            await self._wait_oldest()
+    # End _wait_done method
+
+    async def flush(self):
+        """
+        Submit the buffered rows and wait until every batch is committed
+        """
+        await self._submit()
+        while self._pending:
+            await self._wait_oldest()
+    # End flush method
+
+    async def close(self):
+        """
+        Write outstanding rows, waits for every batch.  Batches still
+        pending when one fails are waited for before the error is raised.
+        """
+        try:
+            await self.flush()
+        finally:
+            while self._pending:
+                future, _ = self._pending.popleft()
+                try:
+                    await future
+                except Exception:
+                    pass
+    # End close method
+# End AsyncBatchWriter class
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,136 @@
+"""
+Metadata Cache
+"""
+from sqlite3 import connect, Connection
+from threading import RLock
+
+from pygeopkg.core.utils import open_connection
+from pygeopkg.shared.sql import PRAGMA_SCHEMA_VERSION, PRAGMA_DATA_VERSION
+
+
+class MetadataCache(object):
+    """
+    Metadata Cache, holds catalog information (table schemas, geometry
+    columns, spatial reference systems and the table registry) read from a
+    geopackage.  Every lookup checks the schema version and the data version
+    of the database, two PRAGMAs, and the cache is emptied when the schema or
+    the content was changed by another connection.  Changes made through this
+    library are cleared explicitly, see "clear".
+
+    The data version can only be compared on the same connection, so the
+    versions are read on the open connection given to "get" and, for a
+    geopackage without one, on a light connection of the cache (no spatial
+    functions, no transaction) which is reused by every lookup until "close".
+    The cached values are guarded by a lock so the cache can be shared by
+    threads using their own connections, the lock is not held while the
+    database is read, except for the versions read on the connection of the
+    cache.
+    """
+    def __init__(self):
+        """
+        Initialize the MetadataCache class
+        """
+        super(MetadataCache, self).__init__()
+        self._values = {}
+        # connection the versions were read on, and the versions
+        self._version_connection = None
+        self._versions = None
+        # connection of the cache, used when no connection is open
+        self._connection = None
+        # incremented by clear, values loaded before a clear are discarded
+        self._generation = 0
+        self._lock = RLock()
+    # End init built-in
+
+    def clear(self):
+        """
+        Clear the cached values
+        """
+        with self._lock:
+            self._values.clear()
+            self._versions = None
+            self._generation += 1
+    # End clear method
+
+    def close(self):
+        """
+        Close the connection of the cache, if any, it is opened again by
+        the next lookup without an open connection
+        """
+        with self._lock:
+            conn, self._connection = self._connection, None
+            if conn is not None:
+                conn.close()
+    # End close method
+
+    @staticmethod
+    def _read_versions(conn):
+        """
+        Read the schema version and the data version of a connection
+
+        :param conn: The connection
+        :type conn: Connection
+        :return: the schema version and the data version
+        :rtype: tuple
+        """
+        schema_version, = conn.execute(PRAGMA_SCHEMA_VERSION).fetchone()
+        data_version, = conn.execute(PRAGMA_DATA_VERSION).fetchone()
+        return schema_version, data_version
+    # End _read_versions method
+
+    def _check_versions(self, database):
+        """
+        Read the versions of the database, on the open connection if given
+        otherwise on the connection of the cache
+
+        :param database: The path to the geopackage or an open connection
+        :type database: str or Connection
+        :return: the connection the versions were read on and the versions
+        :rtype: tuple
+        """
+        if isinstance(database, Connection):
+            return database, self._read_versions(database)
+        with self._lock:
+            if self._connection is None:
+                self._connection = connect(
+                    database, isolation_level=None, check_same_thread=False)
+            return self._connection, self._read_versions(self._connection)
+    # End _check_versions method
+
+    def get(self, database, key, loader):
+        """
+        Get a cached value, loading it when it is not cached or when the
+        schema or data version of the database changed since it was loaded
+
+        :param database: The path to the geopackage or an open connection
+        :type database: str or Connection
+        :param key: the key of the value
+        :type key: tuple
+        :param loader: function reading the value, called with the
+            connection
+        :return: the value
+        """
+        version_connection, versions = self._check_versions(database)
+        with self._lock:
+            if (version_connection is not self._version_connection or
+                    versions != self._versions):
+                self._values.clear()
+                self._version_connection = version_connection
+                self._versions = versions
+            if key in self._values:
+                return self._values[key]
+            generation = self._generation
+        with open_connection(database) as conn:
+            value = loader(conn)
+        with self._lock:
+            if (self._generation == generation and
+                    self._version_connection is version_connection and
+                    self._versions == versions):
+                self._values[key] = value
+        return value
+    # End get method
+# End MetadataCache class
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,313 @@
+"""
+Columnar Access to Tables, requires numpy
+"""
+from pygeopkg.conversion.vectorized import (
+    gpkg_geometries_to_ragged_chunk, concatenate_ragged_chunks,
+    points_to_gpkg_points, points_z_to_gpkg_points_z,
+    points_m_to_gpkg_points_m, points_zm_to_gpkg_points_zm,
+    multipoints_to_gpkg_multipoints, linestrings_to_gpkg_line_strings,
+    polygons_to_gpkg_polygons,
+    multi_linestrings_to_gpkg_multi_line_strings,
+    multi_polygons_to_gpkg_multi_polygons)
+from pygeopkg.core.utils import open_connection, empty_extent
+from pygeopkg.shared.constants import COMMA_SPACE, DEFAULT_CHUNK_SIZE
+from pygeopkg.shared.enumeration import (
+    SQLFieldTypes, GEOMETRY_FIELD_TYPES, GeometryType)
+from pygeopkg.shared.messages import (
+    ERR_NUMPY_REQUIRED, ERR_COLUMN_LENGTHS, ERR_UNSUPPORTED_GEOMETRY)
+from pygeopkg.shared.sql import SELECT_FIELDS, WHERE_CLAUSE
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+NAN = float('nan')
+UTC_SUFFIX = 'Z'
+DATE_UNIT = 'D'
+DATETIME_UNIT = 'ms'
+
+# point encoders by z and m flags
+POINT_ENCODERS = {
+    (False, False): points_to_gpkg_points,
+    (True, False): points_z_to_gpkg_points_z,
+    (False, True): points_m_to_gpkg_points_m,
+    (True, True): points_zm_to_gpkg_points_zm,
+}
+
+RAGGED_ENCODERS = {
+    GeometryType.multi_point: multipoints_to_gpkg_multipoints,
+    GeometryType.linestring: linestrings_to_gpkg_line_strings,
+    GeometryType.polygon: polygons_to_gpkg_polygons,
+    GeometryType.multi_linestring:
+        multi_linestrings_to_gpkg_multi_line_strings,
+    GeometryType.multi_polygon: multi_polygons_to_gpkg_multi_polygons,
+}
+
+# numpy data types for each field type, per the geopackage data types
+NUMPY_DTYPES = {
+    SQLFieldTypes.boolean: 'bool',
+    SQLFieldTypes.tinyint: 'int8',
+    SQLFieldTypes.smallint: 'int16',
+    SQLFieldTypes.mediumint: 'int32',
+    SQLFieldTypes.integer: 'int64',
+    SQLFieldTypes.float: 'float32',
+    SQLFieldTypes.double: 'float64',
+    SQLFieldTypes.real: 'float64',
+    SQLFieldTypes.date: 'datetime64[D]',
+    SQLFieldTypes.datetime: 'datetime64[us]',
+}
+
+
+def numpy_dtype(field):
+    """
+    Numpy Data Type for a Field, text, blob and unknown types are objects
+
+    :param field: the field
+    :type field: Field
+    :return: the data type
+    :rtype: numpy.dtype
+    """
+    return np.dtype(NUMPY_DTYPES.get(field.data_type.upper(), 'object'))
+# End numpy_dtype function
+
+
+def _column_array(values, dtype):
+    """
+    Column Array, converts the values of a column into an array.  Integer
+    and boolean columns with nulls become float columns with NaN, values
+    that do not fit the data type are kept as objects.
+
+    :param values: the column values
+    :type values: tuple
+    :param dtype: the data type
+    :type dtype: numpy.dtype
+    :return: the array
+    :rtype: numpy.ndarray
+    """
+    if dtype.kind in 'biu' and None in values:
+        values = [NAN if value is None else value for value in values]
+        dtype = np.dtype('float64')
+    elif dtype.kind == 'M':
+        values = [value[:-1] if isinstance(value, str) and
+                  value.endswith(UTC_SUFFIX) else value for value in values]
+    try:
+        return np.array(values, dtype=dtype)
+    except (TypeError, ValueError, OverflowError):
+        return np.array(values, dtype=object)
+# End _column_array function
+
+
+def read_columns(db_path, table_name, fields, where=None, params=None,
+                 chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Read Columns, reads the fields of a table into one array per field.
+    Rows are fetched and converted a chunk at a time, geometry fields are
+    decoded a chunk at a time into coordinates and offsets, see
+    pygeopkg.conversion.vectorized.gpkg_geometries_to_ragged.
+
+    :param db_path: The path to the geopackage or an open connection
+    :type db_path: str or Connection
+    :param table_name: The name of the table
+    :type table_name: str
+    :param fields: the fields to read
+    :type fields: list of Field
+    :param where: the filter, a SQL expression with placeholders
+    :type where: str
+    :param params: the values for the placeholders in the filter
+    :type params: tuple or dict
+    :param chunk_size: the number of rows fetched and converted at a time
+    :type chunk_size: int
+    :return: the columns by field name, geometry fields are tuples of the
+        coordinates and the offsets
+    :rtype: dict
+    """
+    if np is None:
+        raise ImportError(ERR_NUMPY_REQUIRED)
+    sql = SELECT_FIELDS.format(
+        field_names=COMMA_SPACE.join(f.name for f in fields),
+        table_name=table_name)
+    if where:
+        sql += WHERE_CLAUSE.format(where=where)
+    dtypes = [None if f.data_type in GEOMETRY_FIELD_TYPES else numpy_dtype(f)
+              for f in fields]
+    chunks = [[] for _ in fields]
+    with open_connection(db_path) as conn:
+        if params:
+            cursor = conn.execute(sql, params)
+        else:
+            cursor = conn.execute(sql)
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for chunk, dtype, values in zip(chunks, dtypes, zip(*rows)):
+                    if dtype is None:
+                        chunk.append(gpkg_geometries_to_ragged_chunk(values))
+                    else:
+                        chunk.append(_column_array(values, dtype))
+        finally:
+            cursor.close()
+    columns = {}
+    for field, dtype, chunk in zip(fields, dtypes, chunks):
+        if dtype is None:
+            columns[field.name] = concatenate_ragged_chunks(chunk)
+        elif chunk:
+            columns[field.name] = np.concatenate(chunk)
+        else:
+            columns[field.name] = np.empty(0, dtype=dtype)
+    return columns
+# End read_columns function
+
+
+def encode_geometries(geometry_type, header, ragged, z=False, m=False,
+                      envelope_type=None):
+    """
+    Encode Geometries, encodes ragged arrays (coordinates followed by
+    offsets, as returned by "read_columns") with the vectorized encoder for
+    the geometry type.
+
+    :param geometry_type: the geometry type, see GeometryType
+    :type geometry_type: str
+    :param header: the binary header, see "make_gpkg_geom_header"
+    :param ragged: the coordinates followed by the offsets
+    :type ragged: tuple
+    :param z: flag for z values
+    :param m: flag for m values
+    :param envelope_type: The envelope to include in the header, defaults
+        to the envelope type of the header
+    :type envelope_type: int
+    :return: the blobs, zero-copy memoryviews over a single buffer
+    :rtype: BlobSequence
+    """
+    coords, offsets = ragged[0], tuple(ragged[1:])
+    geometry_type = geometry_type.upper()
+    if geometry_type == GeometryType.point:
+        func = POINT_ENCODERS[bool(z), bool(m)]
+        return func(header, coords, as_memoryview=True,
+                    envelope_type=envelope_type)
+    if geometry_type not in RAGGED_ENCODERS:
+        raise ValueError(ERR_UNSUPPORTED_GEOMETRY.format(geometry_type))
+    func = RAGGED_ENCODERS[geometry_type]
+    return func(header, coords, *offsets, z=z, m=m, as_memoryview=True,
+                envelope_type=envelope_type)
+# End encode_geometries function
+
+
+def ragged_extent(ragged):
+    """
+    Ragged Extent, the extent of the coordinates of ragged arrays computed
+    in bulk, NaN coordinates (null or empty geometries) are ignored
+
+    :param ragged: the coordinates followed by the offsets
+    :type ragged: tuple
+    :return: the extent as min x, min y, max x, max y, see "empty_extent"
+        when there are no coordinates
+    :rtype: list
+    """
+    coords = np.asarray(ragged[0], dtype=float)
+    if not coords.size:
+        return empty_extent()
+    xy = coords.reshape(-1, coords.shape[-1])[:, :2]
+    xy = xy[~np.isnan(xy).any(axis=1)]
+    if not len(xy):
+        return empty_extent()
+    (min_x, min_y), (max_x, max_y) = xy.min(axis=0), xy.max(axis=0)
+    return [float(min_x), float(min_y), float(max_x), float(max_y)]
+# End ragged_extent function
+
+
+def as_column_mapping(columns):
+    """
+    As Column Mapping, a dictionary of the columns of a numpy structured
+    array or of a mapping
+
+    :param columns: the columns by name or a structured array
+    :type columns: dict or numpy.ndarray
+    :return: the columns by name
+    :rtype: dict
+    """
+    names = getattr(getattr(columns, 'dtype', None), 'names', None)
+    if names:
+        return dict((name, columns[name]) for name in names)
+    return dict(columns)
+# End as_column_mapping function
+
+
+def is_ragged(column):
+    """
+    Is Ragged, check if a geometry column holds ragged arrays, a tuple of
+    coordinates followed by offsets, rather than encoded geometries
+
+    :param column: the geometry column
+    :return: boolean indicating ragged arrays
+    :rtype: bool
+    """
+    if not isinstance(column, tuple) or not column:
+        return False
+    return not isinstance(
+        column[0], (bytes, bytearray, memoryview, type(None)))
+# End is_ragged function
+
+
+def _column_values(values, field):
+    """
+    Column Values, converts a chunk of a column into SQLite native values.
+    Arrays are converted in bulk, dates are written as ISO 8601 text and
+    masked or NaT values become nulls.
+
+    :param values: the chunk of the column
+    :type values: numpy.ndarray or list
+    :param field: the field the column is written to
+    :type field: Field
+    :return: the values
+    :rtype: list
+    """
+    if np is None or not isinstance(values, np.ndarray):
+        return list(values)
+    if values.dtype.kind != 'M':
+        return values.tolist()
+    data = np.ma.getdata(values)
+    missing = np.isnat(data) | np.ma.getmaskarray(values)
+    if field.data_type.upper() == SQLFieldTypes.date:
+        text = np.datetime_as_string(data, unit=DATE_UNIT)
+    else:
+        text = np.char.add(
+            np.datetime_as_string(data, unit=DATETIME_UNIT), UTC_SUFFIX)
+    text = text.astype(object)
+    text[missing] = None
+    return text.tolist()
+# End _column_values function
+
+
+def iter_column_rows(columns, fields, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Iterate Column Rows, a generator of rows built from columns a chunk at a
+    time, each chunk of each column is converted in bulk.
+
+    :param columns: the columns, sequences or arrays of equal length
+    :type columns: list
+    :param fields: the field for each column
+    :type fields: list of Field
+    :param chunk_size: the number of rows converted at a time
+    :type chunk_size: int
+    :return: generator of rows
+    :rtype: generator
+    """
+    counts = set(len(values) for values in columns)
+    if len(counts) > 1:
+        raise ValueError(ERR_COLUMN_LENGTHS)
+    count = counts.pop() if counts else 0
+    for start in range(0, count, chunk_size):
+        stop = start + chunk_size
+        chunk = [_column_values(values[start:stop], field)
+                 for values, field in zip(columns, fields)]
+        for row in zip(*chunk):
+            yield row
+# End iter_column_rows function
+
+
+if __name__ == '__main__':
+    pass
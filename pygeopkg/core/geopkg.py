@@ -4,29 +4,76 @@ Geo Package Class
 
 
 from sys import version_info
+from collections import namedtuple
+from contextlib import contextmanager
 from datetime import datetime
+from sqlite3 import connect, OperationalError
 from os import remove
 from os.path import exists, dirname, basename, join
+from shutil import rmtree
+from tempfile import mkdtemp
+from pygeopkg.conversion.from_geopkg_geom import gpkg_to_geometry
+from pygeopkg.conversion.to_geopkg_geom import make_gpkg_geom_header
+from pygeopkg.core.cache import MetadataCache
+from pygeopkg.core.columns import (
+    read_columns, iter_column_rows, encode_geometries, as_column_mapping,
+    is_ragged, ragged_extent)
 from pygeopkg.core.field import Field
+from pygeopkg.core.profile import get_pragma_profile
+from pygeopkg.core.writer import BatchWriter, QueuedWriter
 from pygeopkg.core.utils import (
     connection_execute, insert_table_rows, get_table_count,
-    connection_execute_many, create_gpkg_from_sql)
+    connection_execute_many, create_gpkg_from_sql, register_spatial_functions,
+    connection_iterate, empty_extent, accumulate_extent)
 from pygeopkg.shared.enumeration import (
     GeometryType, DataType, SQLFieldTypes, GeoPackageCoreTableNames,
-    GPKGFLavors, GEOMETRY_FIELD_TYPES)
+    GPKGFLavors, GEOMETRY_FIELD_TYPES, EnvelopeType, PragmaProfiles,
+    ENVELOPE_CONTENTS)
 from pygeopkg.shared.messages import (
-    ERR_DATASET_NO_EXIST, ERR_PROVIDE_PARAMS_FC, ERR_TABLE_EXISTS)
+    ERR_DATASET_NO_EXIST, ERR_PROVIDE_PARAMS_FC, ERR_TABLE_EXISTS,
+    ERR_GPKG_NO_EXIST, ERR_FIELD_NO_EXIST, ERR_UNSUPPORTED_GEOMETRY)
 from pygeopkg.shared.sql import (
     CREATE_FEATURE_TABLE, GPKG_OGR_CONTENTS_DELETE_TRIGGER,
     GPKG_OGR_CONTENTS_INSERT_TRIGGER, INSERT_GPKG_CONTENTS_SHORT,
-    INSERT_GPKG_CONTENTS, INSERT_GPKG_OGR_CONTENTS, INSERT_GPKG_SRS,
-    INSERT_GPKG_GEOM_COL, TABLE_EXISTS, PRAGMA_TABLE_INFO,
-    CREATE_NON_SPATIAL_TABLE, CHECK_SRS_EXISTS, GET_TABLE_NAMES_BY_TYPE,
-    GET_TABLE_NAME_BY_TYPE, DELETE_FROM_TABLE_BY_NAME, DROP_TABLE, ADD_COLUMN,
-    SELECT_SRS_BY_TABLE_NAME, UPDATE_CONTENTS_EXTENT, GET_FC_EXTENT)
-from pygeopkg.shared.constants import COMMA, COMMA_SPACE, SHAPE, GPKG_EXT
+    INSERT_GPKG_OGR_CONTENTS, INSERT_GPKG_SRS,
+    INSERT_GPKG_GEOM_COL, PRAGMA_TABLE_INFO, CREATE_NON_SPATIAL_TABLE,
+    GET_TABLE_NAMES_BY_TYPE, DELETE_FROM_TABLE_BY_NAME, DROP_TABLE, ADD_COLUMN,
+    SELECT_SRS_BY_TABLE_NAME, UPDATE_CONTENTS_EXTENT, GET_FC_EXTENT,
+    BEGIN_IMMEDIATE, COMMIT, ROLLBACK, SAVEPOINT, RELEASE_SAVEPOINT,
+    ROLLBACK_TO_SAVEPOINT, GPKG_OGR_CONTENTS_INSERT_TRIGGER_NAME,
+    GPKG_OGR_CONTENTS_DELETE_TRIGGER_NAME, TRIGGER_EXISTS, DROP_TRIGGER,
+    UPDATE_GPKG_OGR_CONTENTS_COUNT, CREATE_RTREE, DROP_RTREE,
+    POPULATE_RTREE, SELECT_MAX_FID, INSERT_GPKG_EXTENSION,
+    DELETE_EXTENSIONS_BY_TABLE, RTREE_EXTENSION_NAME,
+    RTREE_EXTENSION_DEFINITION, RTREE_EXTENSION_SCOPE, RTREE_TRIGGERS,
+    RTREE_TRIGGER_NAME, RTREE_TRIGGER_SUFFIXES, SELECT_BBOX_RTREE,
+    SELECT_BBOX_ENVELOPE, SELECT_FIELDS, WHERE_CLAUSE, SELECT_GEOMETRY_COLUMNS,
+    EXPAND_CONTENTS_EXTENT, SELECT_RTREE_EXTENT, SELECT_TABLE_NAMES,
+    SELECT_CONTENTS_DATA_TYPES, SELECT_SRS_IDS, GET_EXTENSION_COLUMNS,
+    SELECT_GEOMETRY_EXTENT, SELECT_GPKG_OGR_CONTENTS_COUNT,
+    SELECT_GPKG_OGR_CONTENTS, SET_GPKG_OGR_CONTENTS_COUNT,
+    GET_TABLE_NAMES_BY_TYPES, ATTACH_DATABASE, DETACH_DATABASE,
+    INSERT_FROM_ATTACHED, SELECT_ATTACHED_CONTENTS, ENVELOPE_EXTENSION_NAME,
+    ENVELOPE_EXTENSION_DEFINITION, ENVELOPE_EXTENSION_SCOPE,
+    SELECT_ENVELOPE_EXTENSIONS, DELETE_ENVELOPE_EXTENSIONS)
+from pygeopkg.shared.constants import (
+    COMMA, COMMA_SPACE, SHAPE, GPKG_EXT, WAL_EXT, SHM_EXT, SAVEPOINT_PREFIX,
+    DEFAULT_ROWS_PER_COMMIT, DEFAULT_CHUNK_SIZE, DEFAULT_QUEUE_SIZE,
+    SHARD_ALIAS, SHARD_NAME, SHARD_PREFIX, DEFAULT_ATTACHED_LIMIT)
 from pygeopkg.core.srs import SRS
 
+if version_info > (3,):
+    from concurrent.futures import ProcessPoolExecutor
+    from contextlib import ExitStack
+    from os import cpu_count
+else:  # pragma: no cover
+    ProcessPoolExecutor = ExitStack = cpu_count = None
+
+try:
+    from sqlite3 import SQLITE_LIMIT_ATTACHED
+except ImportError:  # pragma: no cover
+    SQLITE_LIMIT_ATTACHED = None
+
 
 if version_info > (3,):
     # noinspection PyShadowingBuiltins
@@ -36,54 +83,276 @@ if version_info > (3,):
 class GeoPackage(object):
     """
     GeoPackage class
+
+    By default each operation opens its own connection to the database.  Use
+    the GeoPackage as a context manager (or call "connect") to hold a single
+    connection for the lifetime of a session, tables and feature classes
+    obtained from the GeoPackage share that connection.  A performance
+    profile (see pygeopkg.core.profile) is applied to the persistent
+    connection when it is opened.
+
+    Catalog information (table schemas, geometry columns, spatial reference
+    systems and the table registry) is cached, see "clear_cache".
     """
-    def __init__(self, full_path):
+    def __init__(self, full_path, profile=None):
         """
         Init
 
         :param full_path: Full path to the geopackage sqlite db
         :type full_path: str
+        :param profile: The performance profile for the persistent connection
+        :type profile: str or PragmaProfile
         """
         self.full_path = full_path
+        self.profile = get_pragma_profile(profile)
+        self._connection = None
+        self._savepoint_count = 0
+        self._metadata = MetadataCache()
     # End __init_ builtin method
 
-    def _add_row_to_gpkg_contents(
-            self, table_name, srs_id=None, data_type=DataType.features,
-            description='', min_x=None, min_y=None, max_x=None, max_y=None):
+    def __enter__(self):
         """
-        Add a row to the gpkg_contents table
+        Enter a session, opens the persistent connection
 
-        :param table_name: The table name
-        :type table_name: str
-        :param srs_id: The SRS id
-        :param data_type: The data_type
-        :param description: Description of the feature class
-        :param min_x: min x
-        :param min_y: min y
-        :param max_x: max x
-        :param max_y: max y
+        :return: this GeoPackage
+        :rtype: GeoPackage
         """
-        time_stamp = self.get_now()
-        sql = INSERT_GPKG_CONTENTS
-        values = (table_name, data_type, table_name, description, time_stamp,
-                  min_x, min_y, max_x, max_y, srs_id)
-        if None in (min_x, min_y, max_x, max_y):
-            sql = INSERT_GPKG_CONTENTS_SHORT
-            values = (table_name, data_type, table_name, description,
-                      time_stamp, srs_id)
-        connection_execute(self.full_path, sql, values)
-    # End _add_row_to_gpkg_contents method
+        return self.connect()
+    # End __enter__ built-in
 
-    def _add_row_to_gpkg_ogr_contents(self, table_name):
+    def __exit__(self, exc_type, exc_val, exc_tb):
         """
-        Add a row to the gpkg_ogr_contents table
+        Exit a session, closes the persistent connection.  An open
+        transaction is committed on a clean exit and rolled back when an
+        error is raised.
+        """
+        conn = self._connection
+        if exc_type is not None and conn is not None and conn.in_transaction:
+            self.clear_cache()
+            conn.execute(ROLLBACK)
+        self.close()
+    # End __exit__ built-in
 
-        :param table_name: The table name
-        :type table_name: str
+    @classmethod
+    def open(cls, full_path, profile=None):
+        """
+        Open an existing GeoPackage with a persistent connection, suitable
+        for use as a context manager.
+
+        :param full_path: Full path to the geopackage sqlite db
+        :type full_path: str
+        :param profile: The performance profile for the persistent connection
+        :type profile: str or PragmaProfile
+        :return: A connected GeoPackage
+        :rtype: GeoPackage
+        """
+        if not exists(full_path):
+            raise ValueError(ERR_GPKG_NO_EXIST.format(full_path))
+        return cls(full_path, profile=profile).connect()
+    # End open method
+
+    def connect(self):
+        """
+        Open the persistent connection if it is not already open.  The
+        connection is in autocommit mode, each statement is committed unless
+        it is part of a larger transaction.
+
+        :return: this GeoPackage
+        :rtype: GeoPackage
+        """
+        if self._connection is None:
+            conn = connect(self.full_path, isolation_level=None)
+            register_spatial_functions(conn)
+            if self.profile is not None:
+                self.profile.apply(conn)
+            self._connection = conn
+        return self
+    # End connect method
+
+    def close(self):
+        """
+        Close the persistent connection, if any, and the connection used to
+        check the catalog cache.  Durable settings are restored if the
+        performance profile calls for it.
+        """
+        self._metadata.close()
+        if self._connection is None:
+            return
+        conn, self._connection = self._connection, None
+        try:
+            if conn.in_transaction:
+                conn.commit()
+            if self.profile is not None:
+                self.profile.restore_durable(conn)
+        finally:
+            conn.close()
+    # End close method
+
+    @contextmanager
+    def transaction(self):
+        """
+        Transaction context, statements executed through this GeoPackage
+        (and its tables) inside the context are committed together when the
+        context exits or rolled back if an error is raised.  Transactions
+        can be nested, an inner transaction is a savepoint that can be
+        rolled back without discarding the outer transaction.
+
+        If the GeoPackage is not connected a connection is opened for the
+        duration of the transaction.
+
+        :return: this GeoPackage
+        :rtype: GeoPackage
+        """
+        opened = not self.is_connected
+        conn = self.connect()._connection
+        savepoint = None
+        if conn.in_transaction:
+            self._savepoint_count += 1
+            savepoint = '{0}{1}'.format(
+                SAVEPOINT_PREFIX, self._savepoint_count)
+            conn.execute(SAVEPOINT.format(name=savepoint))
+        else:
+            conn.execute(BEGIN_IMMEDIATE)
+        try:
+            yield self
+        except BaseException:
+            self.clear_cache()
+            if savepoint:
+                conn.execute(ROLLBACK_TO_SAVEPOINT.format(name=savepoint))
+                conn.execute(RELEASE_SAVEPOINT.format(name=savepoint))
+            elif conn.in_transaction:
+                conn.execute(ROLLBACK)
+            raise
+        else:
+            if savepoint:
+                conn.execute(RELEASE_SAVEPOINT.format(name=savepoint))
+            else:
+                conn.execute(COMMIT)
+        finally:
+            if opened:
+                self.close()
+    # End transaction method
+
+    def batch_writer(self, dataset_name, field_names,
+                     rows_per_commit=DEFAULT_ROWS_PER_COMMIT,
+                     bytes_per_commit=None):
+        """
+        Batch Writer for a Table, rows written to it are committed every
+        rows_per_commit rows or every bytes_per_commit (estimated) bytes.
+
+        :param dataset_name: the name of the dataset to work with
+        :type dataset_name: str
+        :param field_names: the name of the fields
+        :type field_names: list or tuple
+        :param rows_per_commit: the number of rows in a batch
+        :type rows_per_commit: int
+        :param bytes_per_commit: the estimated number of bytes in a batch
+        :type bytes_per_commit: int
+        :return: a batch writer, use as a context manager or close when done
+        :rtype: BatchWriter
+        """
+        if not self.table_exists(dataset_name):
+            raise ValueError(ERR_DATASET_NO_EXIST)
+        return BatchWriter(
+            self, dataset_name, field_names, rows_per_commit=rows_per_commit,
+            bytes_per_commit=bytes_per_commit)
+    # End batch_writer method
+
+    def writer(self, rows_per_commit=DEFAULT_ROWS_PER_COMMIT,
+               queue_size=DEFAULT_QUEUE_SIZE):
+        """
+        Queued Writer, a single writer thread with its own connection that
+        inserts batches of rows put on a bounded queue by any number of
+        threads, see QueuedWriter.  Use instead of calling insert_rows from
+        several threads, which contend for the database lock.
+
+        :param rows_per_commit: the number of rows in a transaction
+        :type rows_per_commit: int
+        :param queue_size: the number of batches waiting to be written
+            before putting another blocks
+        :type queue_size: int
+        :return: a started writer, use as a context manager or close when
+            done
+        :rtype: QueuedWriter
+        """
+        return QueuedWriter(
+            self, rows_per_commit=rows_per_commit, queue_size=queue_size)
+    # End writer method
+
+    def clear_cache(self):
+        """
+        Clear the cached catalog information.  Changes made through this
+        library and changes committed by other connections are picked up
+        automatically, clear the cache after changing the gpkg_* tables
+        directly (e.g. with execute_query) on the persistent connection.
+        """
+        self._metadata.clear()
+    # End clear_cache method
+
+    def _get_metadata(self, key, loader):
+        """
+        Get cached catalog information, see MetadataCache.get
+
+        :param key: the key of the value
+        :type key: tuple
+        :param loader: function reading the value, called with the
+            connection
+        :return: the value
+        """
+        return self._metadata.get(self.database, key, loader)
+    # End _get_metadata method
+
+    def _get_geometry_columns(self):
+        """
+        Get the geometry columns of the feature classes
+
+        :return: the geometry column name, z and m flags by table name
+        :rtype: dict
+        """
+        def _load(conn):
+            return dict((table_name, (column_name, z, m)) for
+                        table_name, column_name, z, m in
+                        connection_execute(conn, SELECT_GEOMETRY_COLUMNS))
+        return self._get_metadata(('geometry_columns',), _load)
+    # End _get_geometry_columns method
+
+    def _get_data_types(self):
+        """
+        Get the registered tables (gpkg_contents)
+
+        :return: the data type by table name
+        :rtype: dict
+        """
+        def _load(conn):
+            return dict(connection_execute(conn, SELECT_CONTENTS_DATA_TYPES))
+        return self._get_metadata(('data_types',), _load)
+    # End _get_data_types method
+
+    @property
+    def is_connected(self):
+        """
+        Is Connected
+
+        :return: boolean indicating if a persistent connection is open
+        :rtype: bool
+        """
+        return self._connection is not None
+    # End is_connected property
+
+    @property
+    def database(self):
+        """
+        Database, the open persistent connection when connected, otherwise
+        the path to the geopackage.  Suitable for the functions in
+        pygeopkg.core.utils.
+
+        :return: the connection or the path
+        :rtype: Connection or str
         """
-        sql = INSERT_GPKG_OGR_CONTENTS
-        connection_execute(self.full_path, sql, (table_name, 0))
-    # End _add_row_to_gpkg_ogr_contents method
+        if self._connection is not None:
+            return self._connection
+        return self.full_path
+    # End database property
 
     def _add_gpkg_ogr_contents_triggers(self, table_name):
         """
@@ -94,45 +363,369 @@ class GeoPackage(object):
         """
         names = table_name, table_name, table_name
         sql = GPKG_OGR_CONTENTS_INSERT_TRIGGER
-        connection_execute(self.full_path, sql % names)
+        connection_execute(self.database, sql % names)
         sql = GPKG_OGR_CONTENTS_DELETE_TRIGGER
-        connection_execute(self.full_path, sql % names)
+        connection_execute(self.database, sql % names)
     # End _add_gpkg_ogr_contents_triggers method
 
-    def _add_row_to_gpkg_geom_columns(
-            self, table_name, geometry_type, srs_id, z_enabled, m_enabled):
+    def _drop_gpkg_ogr_contents_triggers(self, table_name):
         """
-        Add a row to the geopackage geom columns table
+        Drop the triggers for gpkg_ogr_contents
 
-        :param table_name: The name of the table
+        :param table_name: The table name
         :type table_name: str
-        :param geometry_type: The geometry type
-        :type geometry_type: str
-        :param srs_id: The SRS id
-        :type srs_id: int
-        :param z_enabled: The z value
-        :type z_enabled: bool
-        :param m_enabled: The m value
-        :type m_enabled: bool
+        :return: boolean indicating if the triggers existed
+        :rtype: bool
+        """
+        insert_name = GPKG_OGR_CONTENTS_INSERT_TRIGGER_NAME.format(table_name)
+        delete_name = GPKG_OGR_CONTENTS_DELETE_TRIGGER_NAME.format(table_name)
+        exists_ = bool(connection_execute(
+            self.database, TRIGGER_EXISTS.format(name=insert_name)))
+        for name in insert_name, delete_name:
+            connection_execute(self.database, DROP_TRIGGER.format(name=name))
+        return exists_
+    # End _drop_gpkg_ogr_contents_triggers method
+
+    def _get_feature_count(self, table_name):
+        """
+        Get the feature count maintained in gpkg_ogr_contents, the count is
+        only trusted while both of its triggers are in place (they are
+        suspended in bulk mode, for example).
+
+        :param table_name: The table name
+        :type table_name: str
+        :return: the feature count or None when it is not maintained
+        :rtype: int
+        """
+        sql = SELECT_GPKG_OGR_CONTENTS_COUNT.format(
+            table_name=table_name,
+            insert_name=GPKG_OGR_CONTENTS_INSERT_TRIGGER_NAME.format(
+                table_name),
+            delete_name=GPKG_OGR_CONTENTS_DELETE_TRIGGER_NAME.format(
+                table_name))
+        try:
+            result = connection_execute(self.database, sql)
+        except OperationalError:
+            # geopackages written elsewhere may not have gpkg_ogr_contents
+            return None
+        if not result:
+            return None
+        return result[0][0]
+    # End _get_feature_count method
+
+    def verify_counts(self):
+        """
+        Verify Counts, reconciles the feature counts in gpkg_ogr_contents
+        with the rows of every feature class and attribute table in a single
+        transaction.  Counts that are missing or wrong are corrected and
+        missing feature count triggers are added.
+
+        :return: the actual counts of the tables that were corrected, by
+            table name
+        :rtype: dict
+        """
+        sql = GET_TABLE_NAMES_BY_TYPES.format(data_types=COMMA_SPACE.join(
+            "'{0}'".format(data_type)
+            for data_type in (DataType.features, DataType.attributes)))
+        corrected = {}
+        with self.transaction():
+            recorded = dict(connection_execute(
+                self.database, SELECT_GPKG_OGR_CONTENTS))
+            for table_name, in connection_execute(self.database, sql):
+                count = get_table_count(self.database, table_name)
+                key = table_name.lower()
+                if key not in recorded:
+                    connection_execute(
+                        self.database, INSERT_GPKG_OGR_CONTENTS,
+                        (table_name, count))
+                elif recorded[key] != count:
+                    connection_execute(
+                        self.database, SET_GPKG_OGR_CONTENTS_COUNT,
+                        (count, table_name))
+                if recorded.get(key) != count:
+                    corrected[table_name] = count
+                if self._get_feature_count(table_name) is None:
+                    # one or both of the triggers are missing
+                    self._drop_gpkg_ogr_contents_triggers(table_name)
+                    self._add_gpkg_ogr_contents_triggers(table_name)
+        return corrected
+    # End verify_counts method
+
+    @contextmanager
+    def bulk_mode(self, table_name):
+        """
+        Bulk Mode for a Table, the per row triggers maintaining the feature
+        count in gpkg_ogr_contents and the spatial index are suspended
+        inside the context.  When the context exits the feature count is
+        recomputed once, the spatial index (if any) is populated with the
+        new features in a single statement and the triggers are reinstated.
+        Everything happens in a single transaction.
+
+        Bulk mode is intended for inserts, features updated or deleted
+        inside the context are not reflected in the spatial index.
+
+        :param table_name: The table name
+        :type table_name: str
+        :return: this GeoPackage
+        :rtype: GeoPackage
+        """
+        with self.transaction():
+            had_triggers = self._drop_gpkg_ogr_contents_triggers(table_name)
+            column_name = self._get_spatial_index_column(table_name)
+            had_rtree_triggers = False
+            if column_name:
+                had_rtree_triggers = self._drop_rtree_triggers(
+                    table_name, column_name)
+                max_fid = self._get_max_fid(table_name)
+            yield self
+            connection_execute(
+                self.database,
+                UPDATE_GPKG_OGR_CONTENTS_COUNT.format(table_name=table_name))
+            if had_triggers:
+                self._add_gpkg_ogr_contents_triggers(table_name)
+            if column_name:
+                self._populate_spatial_index(table_name, column_name, max_fid)
+            if had_rtree_triggers:
+                self._add_rtree_triggers(table_name, column_name)
+    # End bulk_mode method
+
+    def _get_max_fid(self, table_name):
+        """
+        Get the largest feature id in a table
+
+        :param table_name: The table name
+        :type table_name: str
+        :return: the largest fid, 0 for an empty table
+        :rtype: int
+        """
+        result = connection_execute(
+            self.database, SELECT_MAX_FID.format(table_name=table_name))
+        return result[0][0]
+    # End _get_max_fid method
+
+    def _get_geometry_column(self, table_name):
+        """
+        Get the name of the geometry column of a feature class
+
+        :param table_name: The table name
+        :type table_name: str
+        :return: the column name or None if the table is not a feature class
+        :rtype: str
+        """
+        info = self._get_geometry_columns().get(table_name)
+        if not info:
+            return None
+        return info[0]
+    # End _get_geometry_column method
+
+    def _get_spatial_index_column(self, table_name):
+        """
+        Get the name of the column with a spatial index (R-tree)
+
+        :param table_name: The table name
+        :type table_name: str
+        :return: the column name or None if the table has no spatial index
+        :rtype: str
+        """
+        def _load(conn):
+            return dict(connection_execute(conn, GET_EXTENSION_COLUMNS.format(
+                extension_name=RTREE_EXTENSION_NAME)))
+        return self._get_metadata(('spatial_indexes',), _load).get(table_name)
+    # End _get_spatial_index_column method
+
+    def _get_envelope_type(self, table_name):
+        """
+        Get the envelope type saved for a feature class
+
+        :param table_name: The table name
+        :type table_name: str
+        :return: the envelope type, see EnvelopeType
+        :rtype: int
+        """
+        def _load(conn):
+            types = dict((ENVELOPE_EXTENSION_NAME.format(contents), value)
+                         for value, contents in ENVELOPE_CONTENTS.items())
+            return dict((name, types[extension_name]) for
+                        name, extension_name in connection_execute(
+                            conn, SELECT_ENVELOPE_EXTENSIONS)
+                        if extension_name in types)
+        return self._get_metadata(('envelope_types',), _load).get(
+            table_name, EnvelopeType.none)
+    # End _get_envelope_type method
+
+    def _set_envelope_types(self, envelope_types):
+        """
+        Save the envelope type of feature classes, registered in
+        gpkg_extensions with an extension per envelope type
+
+        :param envelope_types: the table name, geometry column name and
+            envelope type of each feature class
+        :type envelope_types: list of tuple
+        """
+        connection_execute_many(
+            self.database, DELETE_ENVELOPE_EXTENSIONS,
+            [(table_name,) for table_name, _, _ in envelope_types])
+        connection_execute_many(self.database, INSERT_GPKG_EXTENSION, [(
+            table_name, column_name,
+            ENVELOPE_EXTENSION_NAME.format(ENVELOPE_CONTENTS[envelope_type]),
+            ENVELOPE_EXTENSION_DEFINITION, ENVELOPE_EXTENSION_SCOPE)
+            for table_name, column_name, envelope_type in envelope_types
+            if envelope_type])
+        self.clear_cache()
+    # End _set_envelope_types method
+
+    def _add_rtree_triggers(self, table_name, column_name):
+        """
+        Add the triggers maintaining the spatial index
+
+        :param table_name: The table name
+        :type table_name: str
+        :param column_name: The geometry column name
+        :type column_name: str
+        """
+        for sql in RTREE_TRIGGERS:
+            connection_execute(self.database, sql.format(
+                table_name=table_name, column_name=column_name))
+    # End _add_rtree_triggers method
+
+    def _drop_rtree_triggers(self, table_name, column_name):
+        """
+        Drop the triggers maintaining the spatial index
+
+        :param table_name: The table name
+        :type table_name: str
+        :param column_name: The geometry column name
+        :type column_name: str
+        :return: boolean indicating if the triggers existed
+        :rtype: bool
+        """
+        names = [RTREE_TRIGGER_NAME.format(
+            table_name=table_name, column_name=column_name, suffix=suffix)
+            for suffix in RTREE_TRIGGER_SUFFIXES]
+        exists_ = bool(connection_execute(
+            self.database, TRIGGER_EXISTS.format(name=names[0])))
+        for name in names:
+            connection_execute(self.database, DROP_TRIGGER.format(name=name))
+        return exists_
+    # End _drop_rtree_triggers method
+
+    def _populate_spatial_index(self, table_name, column_name, min_fid=0):
+        """
+        Populate the spatial index from the geometry envelopes in a single
+        statement
+
+        :param table_name: The table name
+        :type table_name: str
+        :param column_name: The geometry column name
+        :type column_name: str
+        :param min_fid: only features with a larger fid are added
+        :type min_fid: int
         """
-        z_enabled = 1 if z_enabled else 0
-        m_enabled = 1 if m_enabled else 0
-        values = (table_name, SHAPE, geometry_type, srs_id, z_enabled,
-                  m_enabled)
-        connection_execute(self.full_path, INSERT_GPKG_GEOM_COL, values)
-    # End _add_row_to_gpkg_geom_columns method
+        sql = POPULATE_RTREE.format(
+            table_name=table_name, column_name=column_name)
+        connection_execute(self.database, sql, (min_fid,))
+    # End _populate_spatial_index method
 
-    def _add_row_to_gpkg_srs(self, srs_obj):
+    def create_spatial_index(self, table_name, column_name=SHAPE,
+                             triggers=True):
         """
-        Add a row to the geopackage srs table
+        Create a Spatial Index (gpkg_rtree_index extension) for a Feature
+        Class, the index is populated from the existing features in one pass.
+        Calling again rebuilds the index.
+
+        Building the index after loading data is faster than maintaining it
+        row by row, to load into an indexed feature class use bulk mode.
+
+        :param table_name: The feature class name
+        :type table_name: str
+        :param column_name: The geometry column name
+        :type column_name: str
+        :param triggers: flag to add the triggers that keep the index up to
+            date as features are inserted, updated and deleted.  Without the
+            triggers the index reflects the features at the time it was built.
+        :type triggers: bool
+        """
+        if not self.feature_class_exists(table_name):
+            raise ValueError(ERR_DATASET_NO_EXIST)
+        with self.transaction():
+            self._build_spatial_index(table_name, column_name, triggers)
+    # End create_spatial_index method
 
-        :param srs_obj: The SRS object
-        :type srs_obj: SRS
+    def _build_spatial_index(self, table_name, column_name, triggers=True):
         """
-        if self.check_srs_exists(srs_obj.srs_id):
+        Build the Spatial Index of a Feature Class, see
+        "create_spatial_index"
+
+        :param table_name: The feature class name
+        :type table_name: str
+        :param column_name: The geometry column name
+        :type column_name: str
+        :param triggers: flag to add the triggers that maintain the index
+        :type triggers: bool
+        """
+        names = dict(table_name=table_name, column_name=column_name)
+        # dropping and recreating is much faster than deleting entries
+        self._drop_rtree_triggers(table_name, column_name)
+        connection_execute(self.database, DROP_RTREE.format(**names))
+        connection_execute(self.database, CREATE_RTREE.format(**names))
+        connection_execute(self.database, INSERT_GPKG_EXTENSION, (
+            table_name, column_name, RTREE_EXTENSION_NAME,
+            RTREE_EXTENSION_DEFINITION, RTREE_EXTENSION_SCOPE))
+        self.clear_cache()
+        self._populate_spatial_index(table_name, column_name)
+        if triggers:
+            self._add_rtree_triggers(table_name, column_name)
+    # End _build_spatial_index method
+
+    def _expand_extent(self, table_name, extent):
+        """
+        Expand the extent of a feature class in gpkg_contents to include
+        the given extent, an empty extent is ignored
+
+        :param table_name: The table name
+        :type table_name: str
+        :param extent: the extent as min x, min y, max x, max y
+        :type extent: tuple or list
+        """
+        if not extent or extent[0] > extent[2]:
             return
-        connection_execute(self.full_path, INSERT_GPKG_SRS, srs_obj.row)
-    # End _add_row_to_gpkg_srs method
+        min_x, min_y, max_x, max_y = extent
+        connection_execute(self.database, EXPAND_CONTENTS_EXTENT, dict(
+            min_x=min_x, min_y=min_y, max_x=max_x, max_y=max_y,
+            table_name=table_name))
+    # End _expand_extent method
+
+    def recompute_extent(self, table_name):
+        """
+        Recompute the Extent of a Feature Class in gpkg_contents from the
+        features in a single aggregate query.  The spatial index is used
+        when there is one (its single precision envelopes are rounded
+        outwards), otherwise the geometry envelopes are read from their
+        headers (or their coordinates).  The extent maintained by inserts
+        only grows, recompute it after updating or deleting features.
+
+        :param table_name: The feature class name
+        :type table_name: str
+        :return: the extent (min_x, min_y, max_x, max_y) or None when there
+            are no features with a geometry
+        :rtype: tuple
+        """
+        column_name = self._get_spatial_index_column(table_name)
+        sql = SELECT_RTREE_EXTENT
+        if not column_name:
+            column_name = self._get_geometry_column(table_name)
+            sql = SELECT_GEOMETRY_EXTENT
+        if not column_name:
+            raise ValueError(ERR_DATASET_NO_EXIST)
+        sql = sql.format(table_name=table_name, column_name=column_name)
+        with self.transaction():
+            extent = connection_execute(self.database, sql)[0]
+            connection_execute(
+                self.database, UPDATE_CONTENTS_EXTENT, extent + (table_name,))
+        if extent[0] is None:
+            return None
+        return extent
+    # End recompute_extent method
 
     def check_srs_exists(self, srs_id):
         """
@@ -144,13 +737,14 @@ class GeoPackage(object):
         :return: boolean indicating existence
         :rtype: bool
         """
-        sql = CHECK_SRS_EXISTS.format(srs_id)
-        results = connection_execute(self.full_path, sql)
-        return len(results) > 0
+        def _load(conn):
+            return set(srs_id for srs_id, in connection_execute(
+                conn, SELECT_SRS_IDS))
+        return srs_id in self._get_metadata(('srs_ids',), _load)
     # End check_srs_exists method
 
     @classmethod
-    def create(cls, target_path, flavor=GPKGFLavors.esri):
+    def create(cls, target_path, flavor=GPKGFLavors.esri, profile=None):
         """
         Create a new GeoPackage.  Note that this method overwrites anything
         that might already exist.
@@ -160,18 +754,24 @@ class GeoPackage(object):
         :param flavor: definition to use for the default WGS 84
          SRS defined in the SRS table. Options are ESRI or EPSG.  Note that ESRI
          will view definition of WGS 84 not in its particular style as "custom".
+        :param profile: The performance profile, used to create the
+            geopackage (e.g. page size) and for the persistent connection
+        :type profile: str or PragmaProfile
         :return: A new empty GeoPackage
         :rtype: GeoPackage
         """
-        if exists(target_path):
-            remove(target_path)
-        create_gpkg_from_sql(target_path, flavor)
-        return cls(target_path)
+        paths = target_path, target_path + WAL_EXT, target_path + SHM_EXT
+        for path in paths:
+            if exists(path):
+                remove(path)
+        create_gpkg_from_sql(target_path, flavor, profile=profile)
+        return cls(target_path, profile=profile)
     # End create method
 
     def create_feature_class(
             self, name, srs, shape_type=GeometryType.point,
-            z_enabled=False, m_enabled=False, fields=None, description=''):
+            z_enabled=False, m_enabled=False, fields=None, description='',
+            envelope_type=EnvelopeType.none, spatial_index=False):
         """
         Creates a feature class in the GeoPackage per the options given.
 
@@ -189,24 +789,112 @@ class GeoPackage(object):
         :type description: str
         :param srs: the spatial reference system
         :type srs: SRS
+        :param envelope_type: the envelope to include in geometry headers
+            built for the feature class, see EnvelopeType
+        :type envelope_type: int
+        :param spatial_index: flag to create a spatial index maintained by
+            triggers, see "create_spatial_index"
+        :type spatial_index: bool
         :return: GeoPkgFeatureClass
         :rtype: GeoPkgFeatureClass
         """
-        if not fields:
-            fields = []
-        if self.table_exists(name):
-            raise ValueError(ERR_TABLE_EXISTS.format(name))
-        self._create_feature_table(name, shape_type, fields)
-        self._add_row_to_gpkg_srs(srs)
-        self._add_row_to_gpkg_geom_columns(
-            name, shape_type, srs.srs_id, z_enabled, m_enabled)
-        self._add_row_to_gpkg_contents(
-            name, srs.srs_id, description=description)
-        self._add_row_to_gpkg_ogr_contents(name)
-        self._add_gpkg_ogr_contents_triggers(name)
-        return GeoPkgFeatureClass(geopackage=self, name=name)
+        fc, = self.create_feature_classes([dict(
+            name=name, srs=srs, shape_type=shape_type, z_enabled=z_enabled,
+            m_enabled=m_enabled, fields=fields, description=description,
+            envelope_type=envelope_type, spatial_index=spatial_index)])
+        return fc
     # End create_feature_class method
 
+    def _check_new_table_names(self, names):
+        """
+        Check that none of the names are taken, by existing tables or by
+        each other, against a single read of the catalog
+
+        :param names: the names of the tables to be created
+        :type names: list of str
+        """
+        taken = set(name.lower() for name in self._get_metadata(
+            ('table_names',), _load_table_names))
+        for name in names:
+            if name.lower() in taken:
+                raise ValueError(ERR_TABLE_EXISTS.format(name))
+            taken.add(name.lower())
+    # End _check_new_table_names method
+
+    def _register_tables(self, names, data_type, descriptions, srs_ids):
+        """
+        Register new tables in gpkg_contents and gpkg_ogr_contents and add
+        the feature count triggers
+
+        :param names: the table names
+        :type names: list of str
+        :param data_type: The data type, see DataType
+        :type data_type: str
+        :param descriptions: the description of each table
+        :type descriptions: list of str
+        :param srs_ids: the srs id of each table
+        :type srs_ids: list of int
+        """
+        time_stamp = self.get_now()
+        connection_execute_many(self.database, INSERT_GPKG_CONTENTS_SHORT, [
+            (name, data_type, name, description, time_stamp, srs_id)
+            for name, description, srs_id in zip(
+                names, descriptions, srs_ids)])
+        connection_execute_many(
+            self.database, INSERT_GPKG_OGR_CONTENTS,
+            [(name, 0) for name in names])
+        for name in names:
+            self._add_gpkg_ogr_contents_triggers(name)
+        self.clear_cache()
+    # End _register_tables method
+
+    def create_feature_classes(self, specs):
+        """
+        Create many Feature Classes in a single transaction.  The names are
+        checked against a single read of the catalog, each distinct spatial
+        reference is registered once and the metadata rows are inserted
+        together.  Nothing is created if any of the feature classes cannot
+        be.
+
+        :param specs: the feature classes, dictionaries of the arguments
+            of "create_feature_class", name and srs are required
+        :type specs: list of dict
+        :return: the feature classes, in the order of the specs
+        :rtype: list of GeoPkgFeatureClass
+        """
+        specs = [_feature_class_spec(**spec) for spec in specs]
+        names = [spec['name'] for spec in specs]
+        with self.transaction():
+            self._check_new_table_names(names)
+            srs_objs = {}
+            for spec in specs:
+                srs_objs.setdefault(spec['srs'].srs_id, spec['srs'])
+            new_srs = [srs_obj.row for srs_id, srs_obj in srs_objs.items()
+                       if not self.check_srs_exists(srs_id)]
+            if new_srs:
+                connection_execute_many(
+                    self.database, INSERT_GPKG_SRS, new_srs)
+            for spec in specs:
+                self._create_feature_table(
+                    spec['name'], spec['shape_type'], spec['fields'])
+            connection_execute_many(self.database, INSERT_GPKG_GEOM_COL, [(
+                spec['name'], SHAPE, spec['shape_type'], spec['srs'].srs_id,
+                int(bool(spec['z_enabled'])), int(bool(spec['m_enabled'])))
+                for spec in specs])
+            self._register_tables(
+                names, DataType.features,
+                [spec['description'] for spec in specs],
+                [spec['srs'].srs_id for spec in specs])
+            self._set_envelope_types([
+                (spec['name'], SHAPE, spec['envelope_type'])
+                for spec in specs if spec['envelope_type']])
+            for spec in specs:
+                if spec['spatial_index']:
+                    self._build_spatial_index(spec['name'], SHAPE)
+        return [GeoPkgFeatureClass(geopackage=self, name=name)
+                for name in names]
+    # End create_feature_classes method
+
     def _create_feature_table(self, table_name, shape_type, fields):
         """
         Create a Feature Table
@@ -223,7 +911,7 @@ class GeoPackage(object):
             cols = ''
         sql = CREATE_FEATURE_TABLE.format(
             name=table_name,  feature_type=shape_type, other_fields=cols)
-        connection_execute(self.full_path, sql)
+        connection_execute(self.database, sql)
     # End _create_feature_table method
 
     def create_table(self, name, fields, description=''):
@@ -239,16 +927,34 @@ class GeoPackage(object):
         :return: GeoPkgTable
         :rtype: GeoPkgTable
         """
-        if self.table_exists(name):
-            raise ValueError(ERR_TABLE_EXISTS.format())
-        self._create_nonspatial_table(name, fields)
-        self._add_row_to_gpkg_contents(
-            name, data_type=DataType.attributes, description=description)
-        self._add_row_to_gpkg_ogr_contents(name)
-        self._add_gpkg_ogr_contents_triggers(name)
-        return GeoPkgTable(geopackage=self, name=name)
+        table, = self.create_tables([dict(
+            name=name, fields=fields, description=description)])
+        return table
     # End create_table method
 
+    def create_tables(self, specs):
+        """
+        Create many non-spatial Tables in a single transaction, see
+        "create_feature_classes"
+
+        :param specs: the tables, dictionaries of the arguments of
+            "create_table", name and fields are required
+        :type specs: list of dict
+        :return: the tables, in the order of the specs
+        :rtype: list of GeoPkgTable
+        """
+        specs = [_table_spec(**spec) for spec in specs]
+        names = [spec['name'] for spec in specs]
+        with self.transaction():
+            self._check_new_table_names(names)
+            for spec in specs:
+                self._create_nonspatial_table(spec['name'], spec['fields'])
+            self._register_tables(
+                names, DataType.attributes,
+                [spec['description'] for spec in specs], [None] * len(specs))
+        return [GeoPkgTable(geopackage=self, name=name) for name in names]
+    # End create_tables method
+
     def _create_nonspatial_table(self, table_name, fields):
         """
         Create non spatial table
@@ -261,7 +967,7 @@ class GeoPackage(object):
         cols = COMMA_SPACE.join([unicode(field) for field in fields])
         sql = CREATE_NON_SPATIAL_TABLE.format(
             name=table_name,  other_fields=cols)
-        connection_execute(self.full_path, sql)
+        connection_execute(self.database, sql)
     # End _create_nonspatial_table method
 
     def delete_feature_class(self, name):
@@ -280,9 +986,18 @@ class GeoPackage(object):
             gpkg_table=GeoPackageCoreTableNames.gpkg_contents,
             table_name=name)
         drop_table = DROP_TABLE.format(table_name=name)
-        connection_execute(self.full_path, drop_table)
-        connection_execute(self.full_path, delete_contents_table)
-        connection_execute(self.full_path, delete_geom_col_table)
+        with self.transaction():
+            column_name = self._get_spatial_index_column(name)
+            if column_name:
+                connection_execute(self.database, DROP_RTREE.format(
+                    table_name=name, column_name=column_name))
+            connection_execute(
+                self.database,
+                DELETE_EXTENSIONS_BY_TABLE.format(table_name=name))
+            connection_execute(self.database, drop_table)
+            connection_execute(self.database, delete_contents_table)
+            connection_execute(self.database, delete_geom_col_table)
+            self.clear_cache()
     # End delete_feature_class method
 
     @staticmethod
@@ -296,7 +1011,8 @@ class GeoPackage(object):
         return datetime.now().strftime('%Y-%m-%dT%H:%M:%S.%fZ')
     # End get_now method
 
-    def insert_rows(self, dataset_name, field_names, data):
+    def insert_rows(self, dataset_name, field_names, data,
+                    chunk_size=DEFAULT_CHUNK_SIZE, bulk=False):
         """
         Insert Rows into a Table
 
@@ -304,14 +1020,227 @@ class GeoPackage(object):
         :type dataset_name: str
         :param field_names: the name of the fields
         :type field_names: list or tuple
-        :param data: the data
-        :type data: list, tuple
+        :param data: the data, any iterable of rows including a generator
+        :type data: list, tuple or iterable
+        :param chunk_size: the number of rows consumed from data at a time
+        :type chunk_size: int
+        :param bulk: flag to insert in bulk mode, see "bulk_mode"
+        :type bulk: bool
         """
         if not self.table_exists(dataset_name):
             raise ValueError(ERR_DATASET_NO_EXIST)
-        insert_table_rows(self.full_path, dataset_name, field_names, data)
+        self._insert_rows(dataset_name, field_names, data,
+                          chunk_size=chunk_size, bulk=bulk)
     # End insert_rows method
 
+    def _insert_rows(self, table_name, field_names, data,
+                     chunk_size=DEFAULT_CHUNK_SIZE, bulk=False, extent=None):
+        """
+        Insert Rows into a Table, the extent of a feature class in
+        gpkg_contents is expanded to include the inserted geometries once
+        the rows are inserted, in the same transaction.
+
+        :param table_name: The table name
+        :type table_name: str
+        :param field_names: the name of the fields
+        :type field_names: list or tuple
+        :param data: the data, any iterable of rows including a generator
+        :type data: list, tuple or iterable
+        :param chunk_size: the number of rows consumed from data at a time
+        :type chunk_size: int
+        :param bulk: flag to insert in bulk mode, see "bulk_mode"
+        :type bulk: bool
+        :param extent: the extent of the inserted geometries when already
+            known (e.g. from their coordinates), otherwise it is accumulated
+            from the geometry envelopes as the rows are inserted, see
+            "accumulate_extent"
+        :type extent: tuple
+        """
+        column_name = self._get_geometry_column(table_name)
+        names = [name.lower() for name in field_names]
+        if not column_name or column_name.lower() not in names:
+            column_name = None
+        elif extent is None:
+            extent = empty_extent()
+            data = accumulate_extent(
+                data, names.index(column_name.lower()), extent)
+        if bulk:
+            context = self.bulk_mode(table_name)
+        else:
+            context = self.transaction()
+        with context:
+            insert_table_rows(self.database, table_name, field_names, data,
+                              chunk_size=chunk_size)
+            if column_name:
+                self._expand_extent(table_name, extent)
+    # End _insert_rows method
+
+    def parallel_build(self, partitions, worker_fn, processes=None,
+                       table_names=None):
+        """
+        Parallel Build, loads partitions of the data in separate processes
+        and merges the results into this GeoPackage.  Each partition is
+        written into its own temporary geopackage (a shard) holding empty
+        copies of the tables, so the processes never contend for a lock.
+
+        worker_fn is called in a worker process with the connected shard
+        and the partition, it must be a module level function (as must the
+        partitions be picklable) and write through the library so the shard
+        extents are maintained.  The shards are merged only when every
+        worker succeeded, in the order of the partitions, with ATTACH and
+        INSERT ... SELECT in bulk mode.  Feature ids are assigned by this
+        GeoPackage, following the existing features, and the shard extents
+        are combined into gpkg_contents.
+
+        :param partitions: the partitions, one worker_fn call each
+        :type partitions: list
+        :param worker_fn: the function writing a partition, called with the
+            shard GeoPackage and the partition
+        :type worker_fn: function
+        :param processes: the number of worker processes, defaults to the
+            number of processors
+        :type processes: int
+        :param table_names: the tables and feature classes copied into the
+            shards and merged, defaults to all of them
+        :type table_names: list of str
+        :return: the number of rows merged by table name
+        :rtype: dict
+        """
+        if table_names is None:
+            table_names = sorted(
+                name for name, data_type in self._get_data_types().items()
+                if data_type in (DataType.features, DataType.attributes))
+        specs = self._shard_specs(table_names)
+        folder = mkdtemp(
+            prefix=SHARD_PREFIX, dir=dirname(self.full_path) or None)
+        try:
+            paths = [join(folder, SHARD_NAME.format(i))
+                     for i in range(len(partitions))]
+            with ProcessPoolExecutor(
+                    max_workers=processes or cpu_count()) as executor:
+                list(executor.map(
+                    _build_shard, [self.__class__] * len(paths), paths,
+                    [specs] * len(paths), [worker_fn] * len(paths),
+                    partitions))
+            return self._merge_shards(paths, table_names, specs)
+        finally:
+            rmtree(folder, ignore_errors=True)
+    # End parallel_build method
+
+    def _shard_specs(self, table_names):
+        """
+        Shard Specs, the specs of "create_feature_classes" and
+        "create_tables" for empty copies of tables in a shard.  Primary keys
+        are left out, the geometry column of a shard is always SHAPE.
+
+        :param table_names: the table names
+        :type table_names: list of str
+        :return: the feature class specs and the table specs
+        :rtype: tuple
+        """
+        fc_specs, table_specs = [], []
+        geometry_columns = self._get_geometry_columns()
+        for name in table_names:
+            table = self._get_table(name)
+            keys = [row[1].lower() for row in connection_execute(
+                self.database, PRAGMA_TABLE_INFO.format(table_name=name))
+                if row[5]]
+            fields = [f for f in table.fields if f.name.lower() not in keys]
+            if name not in geometry_columns:
+                table_specs.append(dict(name=name, fields=fields))
+                continue
+            column_name, z, m = geometry_columns[name]
+            shape, = [f for f in fields if f.name.lower() ==
+                      column_name.lower()]
+            fields = [f for f in fields if f is not shape]
+            fc_specs.append(dict(
+                name=name, srs=table.srs, shape_type=shape.data_type,
+                z_enabled=bool(z), m_enabled=bool(m), fields=fields,
+                envelope_type=self._get_envelope_type(name)))
+        return fc_specs, table_specs
+    # End _shard_specs method
+
+    def _merge_shards(self, paths, table_names, specs):
+        """
+        Merge Shards, inserts the rows of the shards into the tables, as
+        many shards are attached at a time as SQLite allows and each group
+        is merged in a single transaction
+
+        :param paths: the paths to the shards
+        :type paths: list of str
+        :param table_names: the table names
+        :type table_names: list of str
+        :param specs: the feature class specs and the table specs
+        :type specs: tuple
+        :return: the number of rows merged by table name
+        :rtype: dict
+        """
+        fc_specs, table_specs = specs
+        geometry_columns = self._get_geometry_columns()
+        statements = {}
+        for spec in fc_specs + table_specs:
+            names = [f.name for f in spec['fields']]
+            targets, sources = list(names), list(names)
+            if spec['name'] in geometry_columns:
+                targets.append(geometry_columns[spec['name']][0])
+                sources.append(SHAPE)
+            statements[spec['name']] = (
+                COMMA_SPACE.join(targets), COMMA_SPACE.join(sources))
+        counts = dict((name, 0) for name in table_names)
+        opened = not self.is_connected
+        conn = self.connect()._connection
+        try:
+            # the limit can only be read from Python 3.11
+            size = DEFAULT_ATTACHED_LIMIT
+            if SQLITE_LIMIT_ATTACHED is not None:
+                size = conn.getlimit(SQLITE_LIMIT_ATTACHED)
+            for start in range(0, len(paths), size):
+                aliases = []
+                try:
+                    for i, path in enumerate(paths[start:start + size]):
+                        alias = SHARD_ALIAS.format(i)
+                        conn.execute(ATTACH_DATABASE.format(alias=alias),
+                                     (path,))
+                        aliases.append(alias)
+                    self._merge_attached(aliases, statements, counts)
+                finally:
+                    for alias in aliases:
+                        conn.execute(DETACH_DATABASE.format(alias=alias))
+        finally:
+            if opened:
+                self.close()
+        return counts
+    # End _merge_shards method
+
+    def _merge_attached(self, aliases, statements, counts):
+        """
+        Merge the tables of attached shards in bulk mode
+
+        :param aliases: the names of the attached shards
+        :type aliases: list of str
+        :param statements: the target and source column lists by table name
+        :type statements: dict
+        :param counts: the number of rows merged by table name, updated
+        :type counts: dict
+        """
+        with ExitStack() as stack:
+            for table_name in statements:
+                stack.enter_context(self.bulk_mode(table_name))
+            for alias in aliases:
+                for table_name, (targets, sources) in statements.items():
+                    connection_execute(
+                        self.database, INSERT_FROM_ATTACHED.format(
+                            table_name=table_name, target_names=targets,
+                            source_names=sources, alias=alias))
+                    row, = connection_execute(
+                        self.database,
+                        SELECT_ATTACHED_CONTENTS.format(alias=alias),
+                        (table_name,))
+                    counts[table_name] += row[4] or 0
+                    if row[0] is not None:
+                        self._expand_extent(table_name, row[:4])
+    # End _merge_attached method
+
     @property
     def feature_classes(self):
         """
@@ -321,27 +1250,48 @@ class GeoPackage(object):
         :rtype: list of GeoPkgFeatureClass
         """
         sql = GET_TABLE_NAMES_BY_TYPE.format(data_type=DataType.features)
-        results = connection_execute(self.full_path, sql)
+        results = connection_execute(self.database, sql)
         output = []
         for fc in results:
             output.append(GeoPkgFeatureClass(geopackage=self, name=fc[0]))
         return output
     # End feature_classes property
 
-    def get_feature_class(self, name):
+    def get_feature_class(self, name, envelope_type=None):
         """
         Get a Feature Class By Name
 
         :param name: feature class name to look for
         :type name: str
+        :param envelope_type: the envelope to include in geometry headers
+            built for the feature class, see EnvelopeType, defaults to the
+            envelope type saved with the feature class
+        :type envelope_type: int
         :return: A GeoPkgFeatureClass or None
         :rtype: GeoPkgFeatureClass
         """
         if not self.feature_class_exists(name):
             return None
-        return GeoPkgFeatureClass(geopackage=self, name=name)
+        return GeoPkgFeatureClass(
+            geopackage=self, name=name, envelope_type=envelope_type)
     # End get_feature_class method
 
+    def _get_table(self, name):
+        """
+        Get a Feature Class or Table By Name
+
+        :param name: the name of the table/fc
+        :type name: str
+        :return: the feature class or table
+        :rtype: GeoPkgFeatureClass or GeoPkgTable
+        """
+        if self.feature_class_exists(name):
+            return GeoPkgFeatureClass(geopackage=self, name=name)
+        if not self.table_exists(name):
+            raise ValueError(ERR_DATASET_NO_EXIST)
+        return GeoPkgTable(geopackage=self, name=name)
+    # End _get_table method
+
     def feature_class_exists(self, name):
         """
         Check if a feature class exists
@@ -351,12 +1301,7 @@ class GeoPackage(object):
         :return: boolean indicating existence
         :rtype: bool
         """
-        sql = GET_TABLE_NAME_BY_TYPE.format(
-            table_name=name, data_type=DataType.features)
-        results = connection_execute(self.full_path, sql)
-        if not results:
-            return False
-        return True
+        return self._get_data_types().get(name) == DataType.features
     # End feature_class_exists method
 
     def get_feature_class_srs(self, name):
@@ -368,8 +1313,10 @@ class GeoPackage(object):
         :return: The feature class SRS
         :rtype: SRS
         """
-        sql = SELECT_SRS_BY_TABLE_NAME.format(name)
-        result = self.execute_query(sql)
+        def _load(conn):
+            return connection_execute(
+                conn, SELECT_SRS_BY_TABLE_NAME.format(name))
+        result = self._get_metadata(('srs', name), _load)
         if not result:
             return None
         _, srs_name, org, org_srs_id, definition, description = result[0]
@@ -385,9 +1332,8 @@ class GeoPackage(object):
         :return: bool if the table exists
         :rtype: bool
         """
-        out = connection_execute(
-            self.full_path, TABLE_EXISTS.format(table_name=table_name))
-        return len(out) > 0
+        return table_name in self._get_metadata(
+            ('table_names',), _load_table_names)
     # End check_table_exists
 
     def execute_query(self, sql, values=None):
@@ -400,7 +1346,7 @@ class GeoPackage(object):
         :return: The results of the query
         :rtype: list
         """
-        return connection_execute(self.full_path, sql, values)
+        return connection_execute(self.database, sql, values)
     # End execute_query method
 
     def execute_many_query(self, sql, values=None):
@@ -413,11 +1359,108 @@ class GeoPackage(object):
         :return: The results of the query
         :rtype: list
         """
-        return connection_execute_many(self.full_path, sql, values)
+        return connection_execute_many(self.database, sql, values)
     # End execute_query method
 # End GeoPackage class
 
 
+def _build_shard(cls, path, specs, worker_fn, partition):
+    """
+    Build Shard, creates a shard with empty copies of the tables and writes
+    a partition into it, run in a worker process by
+    "GeoPackage.parallel_build"
+
+    :param cls: the GeoPackage class
+    :type cls: type
+    :param path: the path of the shard
+    :type path: str
+    :param specs: the feature class specs and the table specs
+    :type specs: tuple
+    :param worker_fn: the function writing the partition
+    :type worker_fn: function
+    :param partition: the partition
+    :return: the path of the shard
+    :rtype: str
+    """
+    fc_specs, table_specs = specs
+    create_gpkg_from_sql(path, profile=PragmaProfiles.bulk_load, restore=False)
+    with cls(path, profile=PragmaProfiles.bulk_load) as shard:
+        if fc_specs:
+            shard.create_feature_classes(fc_specs)
+        if table_specs:
+            shard.create_tables(table_specs)
+        worker_fn(shard, partition)
+    return path
+# End _build_shard function
+
+
+def _load_table_names(conn):
+    """
+    Load the names of the tables in the database
+
+    :param conn: The connection
+    :type conn: Connection
+    :return: the table names
+    :rtype: set
+    """
+    return set(name for name, in connection_execute(conn, SELECT_TABLE_NAMES))
+# End _load_table_names function
+
+
+def _feature_class_spec(name, srs, shape_type=GeometryType.point,
+                        z_enabled=False, m_enabled=False, fields=None,
+                        description='', envelope_type=EnvelopeType.none,
+                        spatial_index=False):
+    """
+    Feature Class Spec, the arguments of "GeoPackage.create_feature_class"
+    with the defaults applied
+
+    :return: the arguments by name
+    :rtype: dict
+    """
+    return dict(name=name, srs=srs, shape_type=shape_type,
+                z_enabled=z_enabled, m_enabled=m_enabled,
+                fields=fields or [], description=description,
+                envelope_type=envelope_type, spatial_index=spatial_index)
+# End _feature_class_spec function
+
+
+def _table_spec(name, fields, description=''):
+    """
+    Table Spec, the arguments of "GeoPackage.create_table" with the
+    defaults applied
+
+    :return: the arguments by name
+    :rtype: dict
+    """
+    return dict(name=name, fields=fields, description=description)
+# End _table_spec function
+
+
+def _convert_rows(rows, geometry_indexes, row_type):
+    """
+    Convert Rows, decodes geometry values and / or wraps the rows
+
+    :param rows: the rows
+    :type rows: iterable
+    :param geometry_indexes: positions of the geometry values to decode
+    :type geometry_indexes: list of int
+    :param row_type: the type to wrap each row in, optional
+    :type row_type: type
+    :return: generator of rows
+    :rtype: generator
+    """
+    for row in rows:
+        if geometry_indexes:
+            row = list(row)
+            for index in geometry_indexes:
+                row[index] = gpkg_to_geometry(row[index])
+        if row_type is not None:
+            row = row_type(*row)
+        yield row
+# End _convert_rows function
+
+
 class BaseGeoPkgTable(object):
     """
     Base Geopackage Table
@@ -458,26 +1501,210 @@ class BaseGeoPkgTable(object):
             raise ValueError('Field already exists!')
         sql = ADD_COLUMN.format(
             table_name=self.name, column_name_type=str(field))
-        connection_execute(self.geopackage.full_path, sql)
+        connection_execute(self.geopackage.database, sql)
+        self.geopackage.clear_cache()
     # End add_field method
 
-    def insert_rows(self, field_names, data):
+    def insert_rows(self, field_names, data, chunk_size=DEFAULT_CHUNK_SIZE,
+                    bulk=False):
         """
         Insert Rows into a Table
 
         :param field_names: the name of the fields
         :type field_names: list or tuple
-        :param data: the data
-        :type data: list, tuple
+        :param data: the data, any iterable of rows including a generator
+        :type data: list, tuple or iterable
+        :param chunk_size: the number of rows consumed from data at a time
+        :type chunk_size: int
+        :param bulk: flag to insert in bulk mode, see GeoPackage.bulk_mode
+        :type bulk: bool
         """
         if not field_names:
             return
         if isinstance(field_names[0], Field):
             field_names = [f.name for f in field_names]
-        insert_table_rows(
-            self.geopackage.full_path, self.name, field_names, data)
+        self.geopackage._insert_rows(
+            self.name, field_names, data, chunk_size=chunk_size, bulk=bulk)
     # End insert_rows method
 
+    def insert_columns(self, columns, chunk_size=DEFAULT_CHUNK_SIZE,
+                       bulk=False):
+        """
+        Insert Columns into a Table, the columnar counterpart of
+        "insert_rows".  Columns are matched to the fields of the table by
+        name (ignoring case) and converted to SQLite values a chunk at a
+        time, numpy arrays are converted in bulk.  Geometry columns hold
+        encoded geometries, or ragged arrays (coordinates followed by
+        offsets) that are encoded in bulk for feature classes.
+
+        :param columns: the columns by field name, or a numpy structured
+            array whose field names match the fields of the table
+        :type columns: dict or numpy.ndarray
+        :param chunk_size: the number of rows converted at a time
+        :type chunk_size: int
+        :param bulk: flag to insert in bulk mode, see GeoPackage.bulk_mode
+        :type bulk: bool
+        """
+        field_names, rows, extent = self._column_rows(
+            columns, chunk_size=chunk_size)
+        if not field_names:
+            return
+        self.geopackage._insert_rows(
+            self.name, field_names, rows, chunk_size=chunk_size, bulk=bulk,
+            extent=extent)
+    # End insert_columns method
+
+    def _column_rows(self, columns, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Column Rows, matches columns to the fields of the table and encodes
+        ragged geometries, see "insert_columns"
+
+        :param columns: the columns by field name, or a numpy structured
+            array whose field names match the fields of the table
+        :type columns: dict or numpy.ndarray
+        :param chunk_size: the number of rows converted at a time
+        :type chunk_size: int
+        :return: the field names, a generator of rows and the extent of
+            ragged geometries (None when the geometries are encoded)
+        :rtype: tuple
+        """
+        lookup = dict((f.name.lower(), f) for f in self.fields)
+        fields, values = [], []
+        extent = None
+        for name, column in as_column_mapping(columns).items():
+            field = lookup.get(name.lower())
+            if field is None:
+                raise ValueError(ERR_FIELD_NO_EXIST.format(name))
+            if field.data_type in GEOMETRY_FIELD_TYPES and is_ragged(column):
+                extent = ragged_extent(column)
+                column = self._encode_geometries(field, column)
+            fields.append(field)
+            values.append(column)
+        rows = iter_column_rows(values, fields, chunk_size=chunk_size)
+        return [f.name for f in fields], rows, extent
+    # End _column_rows method
+
+    def _encode_geometries(self, field, ragged):
+        """
+        Encode geometries held as ragged arrays, not supported by tables
+
+        :param field: the geometry field
+        :type field: Field
+        :param ragged: the coordinates followed by the offsets
+        :type ragged: tuple
+        """
+        raise ValueError(ERR_UNSUPPORTED_GEOMETRY.format(field.data_type))
+    # End _encode_geometries method
+
+    def batch_writer(self, field_names,
+                     rows_per_commit=DEFAULT_ROWS_PER_COMMIT,
+                     bytes_per_commit=None):
+        """
+        Batch Writer for the Table, rows written to it are committed every
+        rows_per_commit rows or every bytes_per_commit (estimated) bytes.
+
+        :param field_names: the name of the fields
+        :type field_names: list or tuple
+        :param rows_per_commit: the number of rows in a batch
+        :type rows_per_commit: int
+        :param bytes_per_commit: the estimated number of bytes in a batch
+        :type bytes_per_commit: int
+        :return: a batch writer, use as a context manager or close when done
+        :rtype: BatchWriter
+        """
+        if field_names and isinstance(field_names[0], Field):
+            field_names = [f.name for f in field_names]
+        return BatchWriter(
+            self.geopackage, self.name, field_names,
+            rows_per_commit=rows_per_commit, bytes_per_commit=bytes_per_commit)
+    # End batch_writer method
+
+    def search(self, fields=None, where=None, params=None,
+               batch_size=DEFAULT_CHUNK_SIZE, named=False, decode=False):
+        """
+        Search the Table, a generator of the rows matching a filter.  Rows
+        are fetched in batches from a single cursor so a table of any size
+        can be read without holding it in memory.  The persistent connection
+        is used when the GeoPackage is connected, otherwise a connection is
+        held open while the rows are read.
+
+        :param fields: the fields to return, all fields when not given
+        :type fields: list of str or list of Field
+        :param where: the filter, a SQL expression, use placeholders (? or
+            :name) for values and provide them in params
+        :type where: str
+        :param params: the values for the placeholders in the filter
+        :type params: tuple or dict
+        :param batch_size: the number of rows fetched at a time
+        :type batch_size: int
+        :param named: flag to return rows as named tuples
+        :type named: bool
+        :param decode: flag to decode geometry values, see
+            pygeopkg.conversion.from_geopkg_geom.gpkg_to_geometry
+        :type decode: bool
+        :return: generator of rows, values in the order of the fields
+        :rtype: generator
+        """
+        table_fields = self.fields
+        if not fields:
+            fields = [f.name for f in table_fields]
+        else:
+            fields = [f.name if isinstance(f, Field) else f for f in fields]
+        sql = SELECT_FIELDS.format(
+            field_names=COMMA_SPACE.join(fields), table_name=self.name)
+        if where:
+            sql += WHERE_CLAUSE.format(where=where)
+        rows = connection_iterate(
+            self.geopackage.database, sql, params, batch_size=batch_size)
+        geometry_indexes = []
+        if decode:
+            geometry_names = set(f.name.lower() for f in table_fields
+                                 if f.data_type in GEOMETRY_FIELD_TYPES)
+            geometry_indexes = [i for i, name in enumerate(fields)
+                                if name.lower() in geometry_names]
+        row_type = None
+        if named:
+            row_type = namedtuple('Row', fields, rename=True)
+        if not geometry_indexes and row_type is None:
+            return rows
+        return _convert_rows(rows, geometry_indexes, row_type)
+    # End search method
+
+    def to_columns(self, fields=None, where=None, params=None,
+                   chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        To Columns, reads the table into one numpy array per field (requires
+        numpy).  Data types follow the field types, integer and boolean
+        fields with nulls become float arrays with NaN, text and blob fields
+        are object arrays.  Geometry fields are decoded in bulk into a tuple
+        of coordinates and offsets, see
+        pygeopkg.conversion.vectorized.gpkg_geometries_to_ragged.
+
+        :param fields: the fields to read, all fields when not given
+        :type fields: list of str or list of Field
+        :param where: the filter, a SQL expression, use placeholders (? or
+            :name) for values and provide them in params
+        :type where: str
+        :param params: the values for the placeholders in the filter
+        :type params: tuple or dict
+        :param chunk_size: the number of rows fetched and converted at a time
+        :type chunk_size: int
+        :return: the columns by field name
+        :rtype: dict
+        """
+        table_fields = self.fields
+        if fields:
+            lookup = dict((f.name.lower(), f) for f in table_fields)
+            names = [f.name if isinstance(f, Field) else f for f in fields]
+            try:
+                table_fields = [lookup[name.lower()] for name in names]
+            except KeyError as err:
+                raise ValueError(ERR_FIELD_NO_EXIST.format(err.args[0]))
+        return read_columns(
+            self.geopackage.database, self.name, table_fields, where=where,
+            params=params, chunk_size=chunk_size)
+    # End to_columns method
+
     @property
     def fields(self):
         """
@@ -486,8 +1713,10 @@ class BaseGeoPkgTable(object):
         :return: List of fields
         :rtype: list of Field
         """
-        sql = PRAGMA_TABLE_INFO.format(table_name=self.name)
-        out = connection_execute(self.geopackage.full_path, sql)
+        def _load(conn):
+            return connection_execute(
+                conn, PRAGMA_TABLE_INFO.format(table_name=self.name))
+        out = self.geopackage._get_metadata(('fields', self.name), _load)
         fields = []
         for _, name, type_, _, _, _ in out:
             size = None
@@ -512,14 +1741,31 @@ class BaseGeoPkgTable(object):
     @property
     def count(self):
         """
-        Row count
+        Row count, see "get_count"
 
         :return: The row count
         :rtype: int
         """
-        return get_table_count(self.geopackage.full_path, self.name)
+        return self.get_count()
     # End count property
 
+    def get_count(self, exact=False):
+        """
+        Get the Row count, read from gpkg_ogr_contents when the count is
+        maintained there by triggers, otherwise the rows are counted.
+
+        :param exact: flag to always count the rows, a full table scan
+        :type exact: bool
+        :return: The row count
+        :rtype: int
+        """
+        if not exact:
+            count = self.geopackage._get_feature_count(self.name)
+            if count is not None:
+                return count
+        return get_table_count(self.geopackage.database, self.name)
+    # End get_count method
+
     def execute_query(self, sql, values=None):
         """
         Execute Query against the Table or Feature Class
@@ -530,7 +1776,7 @@ class BaseGeoPkgTable(object):
         :return: The results of the query
         :rtype: list
         """
-        return connection_execute(self.geopackage.full_path, sql, values)
+        return connection_execute(self.geopackage.database, sql, values)
     # End execute_query method
 
     def execute_many_query(self, sql, values=None):
@@ -543,7 +1789,7 @@ class BaseGeoPkgTable(object):
         :return: The results of the query
         :rtype: list
         """
-        return connection_execute_many(self.geopackage.full_path, sql, values)
+        return connection_execute_many(self.geopackage.database, sql, values)
     # End execute_query method
 # End BaseGeoPkgTable class
 
@@ -560,6 +1806,179 @@ class GeoPkgFeatureClass(BaseGeoPkgTable):
     """
     GeoPackage Feature Class
     """
+    def __init__(self, geopackage=None, name='', full_path='',
+                 envelope_type=None):
+        """
+        Initialize the GeoPkgFeatureClass class
+
+        :param geopackage: The geopackage
+        :type geopackage: GeoPackage
+        :param name: the name of the table/fc
+        :type name: str
+        :param full_path: Full path to the table (optional alternative)
+        :param envelope_type: the envelope to include in geometry headers
+            built for the feature class, see EnvelopeType, defaults to the
+            envelope type saved with the feature class
+        :type envelope_type: int
+        """
+        super(GeoPkgFeatureClass, self).__init__(
+            geopackage=geopackage, name=name, full_path=full_path)
+        self._envelope_type = envelope_type
+    # End init built-in
+
+    @property
+    def envelope_type(self):
+        """
+        Envelope Type, the envelope included in geometry headers built for
+        the feature class, the envelope type given to the feature class or
+        else the one saved with it when it was created
+
+        :return: the envelope type, see EnvelopeType
+        :rtype: int
+        """
+        if self._envelope_type is not None:
+            return self._envelope_type
+        return self.geopackage._get_envelope_type(self.name)
+    # End envelope_type property
+
+    @property
+    def geometry_header(self):
+        """
+        Geometry Header, the geopackage geometry header for the srs of the
+        feature class with the flags of its envelope type.  The conversion
+        functions given this header compute the envelope of each geometry.
+
+        :return: the packed header
+        :rtype: bytes
+        """
+        return make_gpkg_geom_header(
+            self.srs.srs_id, envelope_type=self.envelope_type)
+    # End geometry_header property
+
+    @property
+    def z_m_enabled(self):
+        """
+        Z and M Enabled
+
+        :return: flags indicating if the geometries have z and m values
+        :rtype: tuple of bool
+        """
+        info = self.geopackage._get_geometry_columns().get(self.name)
+        if not info:
+            return False, False
+        _, z, m = info
+        return bool(z), bool(m)
+    # End z_m_enabled property
+
+    def insert_columns(self, columns, geometry=None,
+                       chunk_size=DEFAULT_CHUNK_SIZE, bulk=False):
+        """
+        Insert Columns into the Feature Class, see
+        BaseGeoPkgTable.insert_columns.  Geometries held as ragged arrays
+        are encoded with the vectorized encoder for the geometry type of
+        the feature class, using its envelope type.
+
+        :param columns: the columns by field name, or a numpy structured
+            array whose field names match the fields of the feature class
+        :type columns: dict or numpy.ndarray
+        :param geometry: the geometries for the shape field, encoded
+            geometries or ragged arrays (coordinates followed by offsets)
+        :type geometry: tuple or list
+        :param chunk_size: the number of rows converted at a time
+        :type chunk_size: int
+        :param bulk: flag to insert in bulk mode, see GeoPackage.bulk_mode
+        :type bulk: bool
+        """
+        if geometry is not None:
+            columns = as_column_mapping(columns)
+            columns[self.shape_field_name] = geometry
+        super(GeoPkgFeatureClass, self).insert_columns(
+            columns, chunk_size=chunk_size, bulk=bulk)
+    # End insert_columns method
+
+    def _encode_geometries(self, field, ragged):
+        """
+        Encode geometries held as ragged arrays
+
+        :param field: the geometry field
+        :type field: Field
+        :param ragged: the coordinates followed by the offsets
+        :type ragged: tuple
+        :return: the encoded geometries
+        :rtype: BlobSequence
+        """
+        z, m = self.z_m_enabled
+        return encode_geometries(
+            field.data_type, self.geometry_header, ragged, z=z, m=m,
+            envelope_type=self.envelope_type)
+    # End _encode_geometries method
+
+    def create_spatial_index(self, triggers=True):
+        """
+        Create a Spatial Index (R-tree) for the Feature Class, populated from
+        the existing features, see GeoPackage.create_spatial_index
+
+        :param triggers: flag to add the triggers that maintain the index
+        :type triggers: bool
+        """
+        self.geopackage.create_spatial_index(
+            self.name, self.shape_field_name, triggers=triggers)
+    # End create_spatial_index method
+
+    @property
+    def has_spatial_index(self):
+        """
+        Has Spatial Index
+
+        :return: boolean indicating if the feature class has an R-tree
+        :rtype: bool
+        """
+        return bool(self.geopackage._get_spatial_index_column(self.name))
+    # End has_spatial_index property
+
+    def query_bbox(self, min_x, min_y, max_x, max_y, fields=None,
+                   batch_size=DEFAULT_CHUNK_SIZE):
+        """
+        Query by Bounding Box, a generator of the rows for features whose
+        envelope intersects the bounding box.  The spatial index is used
+        when the feature class has one, otherwise the envelope of each
+        geometry is read from its header (or its coordinates).
+
+        The spatial index stores envelopes with single precision, features
+        touching the bounding box within that precision may be included.
+
+        :param min_x: minimum x of the bounding box
+        :type min_x: float
+        :param min_y: minimum y of the bounding box
+        :type min_y: float
+        :param max_x: maximum x of the bounding box
+        :type max_x: float
+        :param max_y: maximum y of the bounding box
+        :type max_y: float
+        :param fields: the fields to return, all fields when not given
+        :type fields: list of str or list of Field
+        :param batch_size: the number of rows fetched at a time
+        :type batch_size: int
+        :return: generator of rows, values in the order of the fields
+        :rtype: generator
+        """
+        if not fields:
+            fields = self.field_names
+        elif isinstance(fields[0], Field):
+            fields = [f.name for f in fields]
+        column_name = self.geopackage._get_spatial_index_column(self.name)
+        sql = SELECT_BBOX_RTREE
+        if not column_name:
+            column_name = self.shape_field_name
+            sql = SELECT_BBOX_ENVELOPE
+        sql = sql.format(
+            field_names=COMMA_SPACE.join(fields), table_name=self.name,
+            column_name=column_name)
+        return connection_iterate(
+            self.geopackage.database, sql, (max_x, min_x, max_y, min_y),
+            batch_size=batch_size)
+    # End query_bbox method
+
     @property
     def extent(self):
         """
@@ -591,6 +2010,17 @@ class GeoPkgFeatureClass(BaseGeoPkgTable):
         self.execute_query(UPDATE_CONTENTS_EXTENT, value)
     # End extent property
 
+    def recompute_extent(self):
+        """
+        Recompute the Extent of the Feature Class from its features, see
+        GeoPackage.recompute_extent
+
+        :return: the extent (min_x, min_y, max_x, max_y) or None
+        :rtype: tuple
+        """
+        return self.geopackage.recompute_extent(self.name)
+    # End recompute_extent method
+
     @property
     def shape_field(self):
         """
@@ -613,8 +2043,9 @@ class GeoPkgFeatureClass(BaseGeoPkgTable):
         :return: the name of the shape field
         :rtype: str
         """
-        if self.shape_field:
-            return self.shape_field.name
+        shape_field = self.shape_field
+        if shape_field:
+            return shape_field.name
         return
     # End shape_field_name property
 
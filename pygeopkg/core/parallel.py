@@ -0,0 +1,329 @@
+"""
+Parallel Geometry Encoding
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from os import cpu_count
+
+from pygeopkg.conversion.to_geopkg_geom import (
+    make_gpkg_geom_header, point_to_gpkg_point, point_z_to_gpkg_point_z,
+    point_m_to_gpkg_point_m, point_zm_to_gpkg_point_zm,
+    points_to_gpkg_multipoint, points_to_gpkg_line_string,
+    points_z_to_gpkg_line_string_z, points_m_to_gpkg_line_string_m,
+    points_zm_to_gpkg_line_string_zm, point_lists_to_gpkg_multi_line_string,
+    point_lists_to_gpkg_polygon, point_lists_to_gpkg_multi_polygon)
+from pygeopkg.conversion.vectorized import BlobSequence
+from pygeopkg.core.columns import encode_geometries
+from pygeopkg.shared.constants import DEFAULT_CHUNK_SIZE
+from pygeopkg.shared.enumeration import GeometryType, EnvelopeType
+from pygeopkg.shared.messages import ERR_UNSUPPORTED_GEOMETRY
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+try:
+    from multiprocessing.shared_memory import SharedMemory
+except ImportError:  # pragma: no cover
+    SharedMemory = None
+
+
+# encoders for geometries held as coordinate lists, by geometry type and
+# the z and m flags, points are unpacked into their values
+NESTED_ENCODERS = {
+    (GeometryType.point, False, False): point_to_gpkg_point,
+    (GeometryType.point, True, False): point_z_to_gpkg_point_z,
+    (GeometryType.point, False, True): point_m_to_gpkg_point_m,
+    (GeometryType.point, True, True): point_zm_to_gpkg_point_zm,
+    (GeometryType.multi_point, False, False): points_to_gpkg_multipoint,
+    (GeometryType.linestring, False, False): points_to_gpkg_line_string,
+    (GeometryType.linestring, True, False): points_z_to_gpkg_line_string_z,
+    (GeometryType.linestring, False, True): points_m_to_gpkg_line_string_m,
+    (GeometryType.linestring, True, True): points_zm_to_gpkg_line_string_zm,
+    (GeometryType.multi_linestring, False, False):
+        point_lists_to_gpkg_multi_line_string,
+    (GeometryType.polygon, False, False): point_lists_to_gpkg_polygon,
+    (GeometryType.multi_polygon, False, False):
+        point_lists_to_gpkg_multi_polygon,
+}
+
+
+def _is_ragged(geometries):
+    """
+    Is Ragged, check if geometries are held as ragged arrays, a tuple of a
+    coordinate array followed by offset arrays
+
+    :param geometries: the geometries
+    :return: boolean indicating ragged arrays
+    :rtype: bool
+    """
+    return (isinstance(geometries, tuple) and len(geometries) > 0 and
+            getattr(geometries[0], 'ndim', None) == 2)
+# End _is_ragged function
+
+
+def _share_arrays(arrays):
+    """
+    Share Arrays, copies arrays into shared memory blocks
+
+    :param arrays: the arrays
+    :type arrays: list of numpy.ndarray
+    :return: the shared memory blocks and the description of each array
+        (block name, shape and data type) used to attach to it
+    :rtype: tuple
+    """
+    blocks, specs = [], []
+    try:
+        for array in arrays:
+            block = SharedMemory(create=True, size=max(array.nbytes, 1))
+            blocks.append(block)
+            shared = np.ndarray(
+                array.shape, dtype=array.dtype, buffer=block.buf)
+            shared[...] = array
+            del shared
+            specs.append((block.name, array.shape, array.dtype.str))
+    except BaseException:
+        _release_blocks(blocks)
+        raise
+    return blocks, specs
+# End _share_arrays function
+
+
+def _release_blocks(blocks):
+    """
+    Release shared memory blocks made by "_share_arrays"
+
+    :param blocks: the shared memory blocks
+    :type blocks: list
+    """
+    for block in blocks:
+        block.close()
+        block.unlink()
+# End _release_blocks function
+
+
+def _slice_ragged(arrays, start, stop):
+    """
+    Slice Ragged, the ragged arrays of a range of geometries, offsets are
+    rebased to start at zero
+
+    :param arrays: the coordinates followed by the offsets
+    :type arrays: list of numpy.ndarray
+    :param start: the index of the first geometry
+    :type start: int
+    :param stop: the index following the last geometry
+    :type stop: int
+    :return: the coordinates followed by the offsets
+    :rtype: tuple
+    """
+    offsets = []
+    for array in arrays[1:]:
+        array = array[start:stop + 1]
+        start, stop = int(array[0]), int(array[-1])
+        offsets.append(array - start)
+    return (arrays[0][start:stop],) + tuple(offsets)
+# End _slice_ragged function
+
+
+def _encode_ragged_shard(specs, geometry_type, header, z, m, envelope_type,
+                         start, stop):
+    """
+    Encode a shard of ragged geometries in a worker, the arrays are attached
+    from shared memory (or passed as is when shared memory is unavailable)
+
+    :return: the encoded buffer and the byte offsets of the blobs
+    :rtype: tuple
+    """
+    blocks, arrays = [], []
+    for spec in specs:
+        if not isinstance(spec, tuple):
+            arrays.append(spec)
+            continue
+        name, shape, dtype = spec
+        block = SharedMemory(name=name)
+        blocks.append(block)
+        arrays.append(np.ndarray(shape, dtype=dtype, buffer=block.buf))
+    try:
+        ragged = _slice_ragged(arrays, start, stop)
+        blobs = encode_geometries(
+            geometry_type, header, ragged, z=z, m=m,
+            envelope_type=envelope_type)
+        del ragged
+        return blobs.tobytes(), blobs.offsets
+    finally:
+        # views must be released before the blocks are closed
+        del arrays[:]
+        for block in blocks:
+            block.close()
+# End _encode_ragged_shard function
+
+
+def _encode_nested_shard(geometries, geometry_type, header, z, m,
+                         envelope_type):
+    """
+    Encode a shard of geometries held as coordinate lists in a worker
+
+    :return: the blobs
+    :rtype: list
+    """
+    func = NESTED_ENCODERS[geometry_type, z, m]
+    if geometry_type == GeometryType.point:
+        return [func(header, *values, envelope_type=envelope_type)
+                for values in geometries]
+    return [func(header, coordinates, envelope_type=envelope_type)
+            for coordinates in geometries]
+# End _encode_nested_shard function
+
+
+def iter_encode_parallel(geometries, geometry_type, srs_id, z=False, m=False,
+                         envelope_type=EnvelopeType.none, workers=None,
+                         chunk_size=DEFAULT_CHUNK_SIZE, executor=None):
+    """
+    Iterate Encode Parallel, a generator of shards of encoded geometries in
+    input order, see "encode_parallel".  Each shard is the index of its
+    first geometry and the blobs, so the shards can be streamed into a
+    writer with the matching slice of the attributes while the following
+    shards are still being encoded.  At most two shards per worker are in
+    flight at a time.
+
+    :param geometries: ragged arrays (coordinates followed by offsets) or a
+        sequence of geometries held as coordinate lists
+    :type geometries: tuple or list
+    :param geometry_type: the geometry type, see GeometryType
+    :type geometry_type: str
+    :param srs_id: the spatial reference id written in the headers
+    :type srs_id: int
+    :param z: flag for z values
+    :param m: flag for m values
+    :param envelope_type: The envelope to include in the header
+    :type envelope_type: int
+    :param workers: the number of worker processes, defaults to the number
+        of processors
+    :type workers: int
+    :param chunk_size: the number of geometries in a shard
+    :type chunk_size: int
+    :param executor: an executor to reuse instead of starting a process
+        pool for the call
+    :type executor: concurrent.futures.Executor
+    :return: generator of the first index and the blobs of each shard
+    :rtype: generator
+    """
+    geometry_type = geometry_type.upper()
+    z, m = bool(z), bool(m)
+    header = make_gpkg_geom_header(srs_id)
+    blocks = []
+    ragged = _is_ragged(geometries)
+    if ragged:
+        arrays = [np.ascontiguousarray(geometries[0], dtype='<f8')]
+        arrays.extend(np.ascontiguousarray(offsets, dtype=np.int64)
+                      for offsets in geometries[1:])
+        if len(arrays) == 1:
+            # points, the offsets of the coordinates are implied
+            arrays.append(np.arange(len(arrays[0]) + 1, dtype=np.int64))
+        count = len(arrays[1]) - 1
+        specs = arrays
+        if SharedMemory is not None:
+            blocks, specs = _share_arrays(arrays)
+    else:
+        if (geometry_type, z, m) not in NESTED_ENCODERS:
+            raise ValueError(ERR_UNSUPPORTED_GEOMETRY.format(geometry_type))
+        count = len(geometries)
+    workers = workers or cpu_count() or 1
+    owned = executor is None
+    if owned:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    chunk_size = max(int(chunk_size), 1)
+    futures = deque()
+    try:
+        for start in range(0, count, chunk_size):
+            stop = min(start + chunk_size, count)
+            if ragged:
+                future = executor.submit(
+                    _encode_ragged_shard, specs, geometry_type, header, z, m,
+                    envelope_type, start, stop)
+            else:
+                future = executor.submit(
+                    _encode_nested_shard, geometries[start:stop],
+                    geometry_type, header, z, m, envelope_type)
+            futures.append((start, future))
+            if len(futures) >= 2 * workers:
+                yield _shard_result(*futures.popleft())
+        while futures:
+            yield _shard_result(*futures.popleft())
+    finally:
+        for _, future in futures:
+            future.cancel()
+        if owned:
+            executor.shutdown(wait=True)
+        _release_blocks(blocks)
+# End iter_encode_parallel function
+
+
+def _shard_result(start, future):
+    """
+    Shard Result, waits for a shard to be encoded
+
+    :param start: the index of the first geometry of the shard
+    :type start: int
+    :param future: the future of the shard
+    :type future: concurrent.futures.Future
+    :return: the index of the first geometry and the blobs
+    :rtype: tuple
+    """
+    result = future.result()
+    if isinstance(result, tuple):
+        result = BlobSequence(*result)
+    return start, result
+# End _shard_result function
+
+
+def encode_parallel(geometries, geometry_type, srs_id, z=False, m=False,
+                    envelope_type=EnvelopeType.none, workers=None,
+                    chunk_size=DEFAULT_CHUNK_SIZE, executor=None):
+    """
+    Encode Parallel, encodes geometries into geopackage blobs in worker
+    processes, the input is split into shards of chunk_size geometries.
+
+    Ragged arrays (coordinates followed by offsets, as for the vectorized
+    encoders, numpy required) are copied once into shared memory and each
+    worker encodes its range of geometries with the vectorized encoder for
+    the geometry type.  Geometries held as coordinate lists are sent to the
+    workers a shard at a time and encoded with the encoders in
+    pygeopkg.conversion.to_geopkg_geom, which support z and m values for
+    points and line strings only.
+
+    :param geometries: ragged arrays (coordinates followed by offsets) or a
+        sequence of geometries held as coordinate lists
+    :type geometries: tuple or list
+    :param geometry_type: the geometry type, see GeometryType
+    :type geometry_type: str
+    :param srs_id: the spatial reference id written in the headers
+    :type srs_id: int
+    :param z: flag for z values
+    :param m: flag for m values
+    :param envelope_type: The envelope to include in the header
+    :type envelope_type: int
+    :param workers: the number of worker processes, defaults to the number
+        of processors
+    :type workers: int
+    :param chunk_size: the number of geometries in a shard
+    :type chunk_size: int
+    :param executor: an executor to reuse instead of starting a process
+        pool for the call
+    :type executor: concurrent.futures.Executor
+    :return: the blobs in input order
+    :rtype: list
+    """
+    blobs = []
+    for _, shard in iter_encode_parallel(
+            geometries, geometry_type, srs_id, z=z, m=m,
+            envelope_type=envelope_type, workers=workers,
+            chunk_size=chunk_size, executor=executor):
+        blobs.extend(shard)
+    return blobs
+# End encode_parallel function
+
+
+if __name__ == '__main__':
+    pass
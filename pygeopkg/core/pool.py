@@ -0,0 +1,305 @@
+"""
+Shared GeoPackage, a thread safe handle with pooled read connections
+"""
+from collections import deque
+from contextlib import contextmanager
+from os import getpid
+from pathlib import Path
+from sqlite3 import connect
+from threading import Condition, Lock, RLock, local
+from time import monotonic
+
+from pygeopkg.core.geopkg import GeoPackage
+from pygeopkg.core.profile import get_pragma_profile
+from pygeopkg.core.utils import register_spatial_functions
+from pygeopkg.shared.constants import (
+    DEFAULT_POOL_SIZE, DEFAULT_IDLE_TIMEOUT, READ_ONLY_MODE)
+from pygeopkg.shared.enumeration import PragmaProfiles, JournalModes
+from pygeopkg.shared.messages import ERR_HANDLE_CLOSED, ERR_GPKG_NO_EXIST
+from pygeopkg.shared.sql import (
+    PRAGMA_JOURNAL_MODE, PRAGMA_QUERY_ONLY, ROLLBACK)
+
+
+class SharedGeoPackage(object):
+    """
+    Shared GeoPackage, a handle to a geopackage that is safe to share
+    between the threads of a server.  Each thread reading borrows its own
+    read only connection (query_only) from a small pool, the database is
+    switched to WAL mode so readers are not blocked by the writer.  Writes
+    go through a single writer connection, one thread at a time.
+
+    Connections idle for longer than idle_timeout seconds are closed.  The
+    process id is checked whenever a connection is handed out, a process
+    forked from the one that opened the connections (e.g. a gunicorn or
+    uwsgi worker) starts with an empty pool and never uses, or closes, the
+    connections of its parent.  Fork before starting threads that use the
+    handle.
+    """
+    def __init__(self, full_path, pool_size=DEFAULT_POOL_SIZE,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT,
+                 profile=PragmaProfiles.read_serving):
+        """
+        Initialize the SharedGeoPackage class, the database is switched to
+        WAL mode
+
+        :param full_path: Full path to the geopackage sqlite db
+        :type full_path: str
+        :param pool_size: the maximum number of read connections, threads
+            wait for a connection when all are in use
+        :type pool_size: int
+        :param idle_timeout: the number of seconds a read connection is
+            kept unused before it is closed
+        :type idle_timeout: float
+        :param profile: The performance profile for every connection
+        :type profile: str or PragmaProfile
+        """
+        super(SharedGeoPackage, self).__init__()
+        path = Path(full_path)
+        if not path.exists():
+            raise ValueError(ERR_GPKG_NO_EXIST.format(full_path))
+        self.full_path = full_path
+        self.pool_size = max(pool_size, 1)
+        self.idle_timeout = idle_timeout
+        self.profile = get_pragma_profile(profile)
+        self._uri = path.resolve().as_uri() + READ_ONLY_MODE
+        self._closed = False
+        # connections of a parent process, kept referenced so they are
+        # never closed in a forked child
+        self._abandoned = []
+        self._reset()
+        with self.writer():
+            pass
+    # End init built-in
+
+    def __enter__(self):
+        """
+        Enter
+
+        :return: this SharedGeoPackage
+        :rtype: SharedGeoPackage
+        """
+        return self
+    # End __enter__ built-in
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """
+        Exit, closes every connection
+        """
+        self.close()
+    # End __exit__ built-in
+
+    def _reset(self):
+        """
+        Reset, an empty pool owned by the current process
+        """
+        self._pid = getpid()
+        self._condition = Condition(Lock())
+        self._idle = deque()
+        self._open_count = 0
+        self._local = local()
+        self._write_lock = RLock()
+        self._writer = None
+    # End _reset method
+
+    def _check(self):
+        """
+        Check the handle is open and owned by this process, the pool is
+        reset in a forked process
+        """
+        if self._closed:
+            raise ValueError(ERR_HANDLE_CLOSED)
+        if self._pid == getpid():
+            return
+        self._abandoned.extend(gpkg for gpkg, _ in self._idle)
+        if self._writer is not None:
+            self._abandoned.append(self._writer)
+        self._reset()
+    # End _check method
+
+    def _open(self, read_only):
+        """
+        Open a connection with the profile applied
+
+        :param read_only: flag for a read only, query only connection
+        :type read_only: bool
+        :return: a connected geopackage
+        :rtype: GeoPackage
+        """
+        if read_only:
+            conn = connect(self._uri, uri=True, isolation_level=None,
+                           check_same_thread=False)
+        else:
+            conn = connect(self.full_path, isolation_level=None,
+                           check_same_thread=False)
+        try:
+            register_spatial_functions(conn)
+            if not read_only:
+                conn.execute(PRAGMA_JOURNAL_MODE.format(JournalModes.wal))
+            if self.profile is not None:
+                self.profile.apply(conn)
+            if read_only:
+                conn.execute(PRAGMA_QUERY_ONLY)
+        except BaseException:
+            conn.close()
+            raise
+        gpkg = GeoPackage(self.full_path)
+        gpkg._connection = conn
+        return gpkg
+    # End _open method
+
+    def _evict_idle(self):
+        """
+        Close the read connections idle for longer than the timeout, the
+        condition must be held
+        """
+        limit = monotonic() - self.idle_timeout
+        while self._idle and self._idle[0][1] < limit:
+            gpkg, _ = self._idle.popleft()
+            self._open_count -= 1
+            gpkg.close()
+    # End _evict_idle method
+
+    def _checkout(self):
+        """
+        Check out a read connection, the most recently used idle one or a
+        new one while the pool is not full, otherwise wait for one
+
+        :return: a geopackage with a read only connection
+        :rtype: GeoPackage
+        """
+        with self._condition:
+            while True:
+                self._evict_idle()
+                if self._idle:
+                    return self._idle.pop()[0]
+                if self._open_count < self.pool_size:
+                    self._open_count += 1
+                    break
+                self._condition.wait()
+        try:
+            return self._open(read_only=True)
+        except BaseException:
+            with self._condition:
+                self._open_count -= 1
+                self._condition.notify()
+            raise
+    # End _checkout method
+
+    def _checkin(self, gpkg, pid):
+        """
+        Return a read connection to the pool
+
+        :param gpkg: the geopackage holding the connection
+        :type gpkg: GeoPackage
+        :param pid: the process id when the connection was checked out
+        :type pid: int
+        """
+        if pid != self._pid:
+            return
+        conn = gpkg._connection
+        with self._condition:
+            if self._closed or conn is None:
+                self._open_count -= 1
+                gpkg.close()
+            else:
+                if conn.in_transaction:
+                    conn.execute(ROLLBACK)
+                self._idle.append((gpkg, monotonic()))
+            self._condition.notify()
+    # End _checkin method
+
+    @contextmanager
+    def reader(self):
+        """
+        Reader, borrows a read only connection for the current thread.
+        Nested use in the same thread shares the connection.  The
+        GeoPackage (and the tables obtained from it) must not be used
+        once the context exits.
+
+        :return: a geopackage with a read only connection
+        :rtype: GeoPackage
+        """
+        self._check()
+        gpkg = getattr(self._local, 'gpkg', None)
+        if gpkg is not None:
+            yield gpkg
+            return
+        pid = self._pid
+        gpkg = self._checkout()
+        self._local.gpkg = gpkg
+        try:
+            yield gpkg
+        finally:
+            self._local.gpkg = None
+            self._checkin(gpkg, pid)
+    # End reader method
+
+    @contextmanager
+    def writer(self):
+        """
+        Writer, the writer connection for the current thread, other threads
+        wait until the context exits.  The statements executed inside the
+        context are committed together, or rolled back if an error is
+        raised, see GeoPackage.transaction.
+
+        :return: a geopackage with the writer connection
+        :rtype: GeoPackage
+        """
+        self._check()
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._open(read_only=False)
+            with self._writer.transaction():
+                yield self._writer
+    # End writer method
+
+    def execute_query(self, sql, values=None):
+        """
+        Execute a read only Query on a pooled connection
+
+        :param sql: the sql to execute
+        :type sql: str
+        :param values: the values to use
+        :return: The results of the query
+        :rtype: list
+        """
+        with self.reader() as gpkg:
+            return gpkg.execute_query(sql, values)
+    # End execute_query method
+
+    @property
+    def idle_count(self):
+        """
+        Idle Count
+
+        :return: the number of read connections waiting in the pool
+        :rtype: int
+        """
+        return len(self._idle)
+    # End idle_count property
+
+    def close(self):
+        """
+        Close the idle read connections and the writer connection, read
+        connections in use are closed when they are returned
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._pid != getpid():
+            return
+        with self._condition:
+            while self._idle:
+                gpkg, _ = self._idle.popleft()
+                self._open_count -= 1
+                gpkg.close()
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+    # End close method
+# End SharedGeoPackage class
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,149 @@
+"""
+Performance Profiles
+"""
+from pygeopkg.shared.enumeration import (
+    PragmaProfiles, JournalModes, SynchronousModes, TempStores)
+from pygeopkg.shared.messages import ERR_UNKNOWN_PROFILE
+from pygeopkg.shared.sql import (
+    PRAGMA_JOURNAL_MODE, PRAGMA_SYNCHRONOUS, PRAGMA_PAGE_SIZE,
+    PRAGMA_CACHE_SIZE, PRAGMA_TEMP_STORE, PRAGMA_MMAP_SIZE)
+
+
+class PragmaProfile(object):
+    """
+    Pragma Profile, a named set of PRAGMA settings for a connection
+    """
+    def __init__(self, name, journal_mode=None, synchronous=None,
+                 page_size=None, cache_size=None, temp_store=None,
+                 mmap_size=None, restore=None):
+        """
+        Initialize the PragmaProfile class, settings left as None are not
+        changed from the SQLite defaults.
+
+        :param name: The name of the profile
+        :type name: str
+        :param journal_mode: The journal mode
+        :type journal_mode: str
+        :param synchronous: The synchronous mode
+        :type synchronous: str
+        :param page_size: The page size in bytes, only applied when a
+            geopackage is created since it must be set before the first table
+        :type page_size: int
+        :param cache_size: The cache size, negative values are in KiB
+        :type cache_size: int
+        :param temp_store: The temp store location
+        :type temp_store: str
+        :param mmap_size: The maximum number of bytes to memory map
+        :type mmap_size: int
+        :param restore: Name of the profile whose durable settings (journal
+            mode and synchronous) are restored when the connection closes
+        :type restore: str
+        """
+        super(PragmaProfile, self).__init__()
+        self.name = name
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.page_size = page_size
+        self.cache_size = cache_size
+        self.temp_store = temp_store
+        self.mmap_size = mmap_size
+        self.restore = restore
+    # End init built-in
+
+    def __repr__(self):
+        """
+        String representation
+        """
+        return '{0}({1!r})'.format(self.__class__.__name__, self.name)
+    # End __repr__ built-in
+
+    @property
+    def pragmas(self):
+        """
+        Pragmas applied to each connection, the page size is excluded
+
+        :return: list of PRAGMA statements
+        :rtype: list of str
+        """
+        settings = (
+            (PRAGMA_JOURNAL_MODE, self.journal_mode),
+            (PRAGMA_SYNCHRONOUS, self.synchronous),
+            (PRAGMA_CACHE_SIZE, self.cache_size),
+            (PRAGMA_TEMP_STORE, self.temp_store),
+            (PRAGMA_MMAP_SIZE, self.mmap_size))
+        return [sql.format(value) for sql, value in settings
+                if value is not None]
+    # End pragmas property
+
+    def apply(self, conn, creating=False):
+        """
+        Apply the profile to a connection
+
+        :param conn: The connection
+        :type conn: Connection
+        :param creating: Flag indicating the database is being created, the
+            page size is only set in this case
+        :type creating: bool
+        """
+        if creating and self.page_size:
+            conn.execute(PRAGMA_PAGE_SIZE.format(self.page_size))
+        for sql in self.pragmas:
+            conn.execute(sql)
+    # End apply method
+
+    def restore_durable(self, conn):
+        """
+        Restore the durable settings of the restore profile, if any
+
+        :param conn: The connection, it must not be in a transaction
+        :type conn: Connection
+        """
+        if not self.restore:
+            return
+        durable = get_pragma_profile(self.restore)
+        if durable.journal_mode:
+            conn.execute(PRAGMA_JOURNAL_MODE.format(durable.journal_mode))
+        if durable.synchronous:
+            conn.execute(PRAGMA_SYNCHRONOUS.format(durable.synchronous))
+    # End restore_durable method
+# End PragmaProfile class
+
+
+PRAGMA_PROFILES = {
+    PragmaProfiles.safe_default: PragmaProfile(
+        PragmaProfiles.safe_default, journal_mode=JournalModes.delete,
+        synchronous=SynchronousModes.full, page_size=4096, cache_size=-2000,
+        temp_store=TempStores.default, mmap_size=0),
+    PragmaProfiles.bulk_load: PragmaProfile(
+        PragmaProfiles.bulk_load, journal_mode=JournalModes.wal,
+        synchronous=SynchronousModes.off, page_size=65536,
+        cache_size=-262144, temp_store=TempStores.memory,
+        mmap_size=268435456, restore=PragmaProfiles.safe_default),
+    PragmaProfiles.read_serving: PragmaProfile(
+        PragmaProfiles.read_serving, journal_mode=JournalModes.wal,
+        synchronous=SynchronousModes.normal, cache_size=-65536,
+        temp_store=TempStores.memory, mmap_size=1073741824),
+}
+
+
+def get_pragma_profile(profile):
+    """
+    Get a Pragma Profile
+
+    :param profile: The name of a profile or a profile, None is passed
+        through
+    :type profile: str or PragmaProfile
+    :return: The profile or None
+    :rtype: PragmaProfile
+    """
+    if profile is None or isinstance(profile, PragmaProfile):
+        return profile
+    try:
+        return PRAGMA_PROFILES[profile]
+    except KeyError:
+        raise ValueError(ERR_UNKNOWN_PROFILE.format(profile))
+# End get_pragma_profile function
+
+
+if __name__ == '__main__':
+    pass
@@ -1,29 +1,96 @@
 """
 Utilities
 """
+from contextlib import contextmanager
+from itertools import chain, islice
 from os.path import exists, dirname
-from sqlite3 import connect
+from sqlite3 import connect, Connection
+from pygeopkg.conversion.from_geopkg_geom import (
+    gpkg_envelope, gpkg_header_envelope, INF)
+from pygeopkg.core.profile import get_pragma_profile
 from pygeopkg.resources.gpkg_sql import (
     ORDERED_GPKG_SQL, DEFAULT_ESRI_RECS, DEFAULT_EPSG_RECS)
-from pygeopkg.shared.constants import COMMA_SPACE, Q_MARK
+from pygeopkg.shared.constants import COMMA_SPACE, Q_MARK, DEFAULT_CHUNK_SIZE
 from pygeopkg.shared.enumeration import GPKGFLavors
 from pygeopkg.shared.messages import ERR_DIMENSION_NO_MATCH
-from pygeopkg.shared.sql import INSERT_TO_TABLE, SQL_COUNT, INSERT_GPKG_SRS
+from pygeopkg.shared.sql import (
+    INSERT_TO_TABLE, SQL_COUNT, INSERT_GPKG_SRS, BEGIN, COMMIT, ROLLBACK)
+
+
+def register_spatial_functions(conn):
+    """
+    Register the SQL functions used by the R-tree spatial index triggers
+    (ST_MinX, ST_MaxX, ST_MinY, ST_MaxY and ST_IsEmpty) on a connection.
+    The envelope of the most recent geometry is kept so the functions
+    evaluated for the same geometry read it only once.
+
+    :param conn: The connection
+    :type conn: Connection
+    """
+    last = [None, None]
+
+    def _envelope(blob):
+        if blob is None:
+            return None
+        if last[0] != blob:
+            last[:] = blob, gpkg_envelope(blob)
+        return last[1]
+
+    def _value(index):
+        def _func(blob):
+            envelope = _envelope(blob)
+            if envelope is None:
+                return None
+            return envelope[index]
+        return _func
+
+    for index, name in enumerate(('ST_MinX', 'ST_MaxX', 'ST_MinY', 'ST_MaxY')):
+        conn.create_function(name, 1, _value(index))
+
+    def _is_empty(blob):
+        if blob is None:
+            return None
+        return int(_envelope(blob) is None)
+    conn.create_function('ST_IsEmpty', 1, _is_empty)
+# End register_spatial_functions function
+
+
+@contextmanager
+def open_connection(db_path):
+    """
+    Open Connection, yields a connection to the geopackage.  An already open
+    connection is used as is and left open, otherwise a new connection is
+    made, committed and closed when done.
+
+    :param db_path: The path to the geopackage or an open connection
+    :type db_path: str or Connection
+    """
+    if isinstance(db_path, Connection):
+        yield db_path
+        return
+    conn = connect(db_path, isolation_level='EXCLUSIVE')
+    register_spatial_functions(conn)
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+# End open_connection function
 
 
 def connection_execute(db_path, sql, values=None):
     """
     Connection Execute
 
-    :param db_path: The path to the geopackage
-    :type db_path: str
+    :param db_path: The path to the geopackage or an open connection
+    :type db_path: str or Connection
     :param sql: The sql to execute
     :type sql: str
     :param values: The values to use with the sql
     :return: The results if any
     :rtype: list
     """
-    with connect(db_path, isolation_level='EXCLUSIVE') as conn:
+    with open_connection(db_path) as conn:
         if values:
             result = conn.execute(sql, values)
         else:
@@ -32,27 +99,85 @@ def connection_execute(db_path, sql, values=None):
 # End connection_execute function
 
 
+def connection_iterate(db_path, sql, values=None,
+                       batch_size=DEFAULT_CHUNK_SIZE):
+    """
+    Connection Iterate, a generator of the rows returned by a query, rows
+    are fetched in batches so the results are never all held in memory.
+
+    :param db_path: The path to the geopackage or an open connection
+    :type db_path: str or Connection
+    :param sql: The sql to execute
+    :type sql: str
+    :param values: The values to use with the sql
+    :param batch_size: The number of rows fetched at a time
+    :type batch_size: int
+    :return: generator of rows
+    :rtype: generator
+    """
+    with open_connection(db_path) as conn:
+        if values:
+            cursor = conn.execute(sql, values)
+        else:
+            cursor = conn.execute(sql)
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield row
+        finally:
+            cursor.close()
+# End connection_iterate function
+
+
 def connection_execute_many(db_path, sql, values):
     """
-    Run Execute Many into the sqlite database
+    Run Execute Many into the sqlite database.  On a connection in autocommit
+    mode the rows are wrapped in a single transaction rather than committing
+    each row on its own.
 
-    :param db_path: The path to the geopackage
-    :type db_path: str
+    :param db_path: The path to the geopackage or an open connection
+    :type db_path: str or Connection
     :param sql: The sql to execute
     :type sql: str
     :param values: The values to use with the sql
     """
-    with connect(db_path, isolation_level='EXCLUSIVE') as conn:
-        conn.executemany(sql, values)
+    with open_connection(db_path) as conn:
+        with _ensure_transaction(conn):
+            conn.executemany(sql, values)
 # End connection_execute_many function
 
 
+@contextmanager
+def _ensure_transaction(conn):
+    """
+    Ensure Transaction, begins (and commits) a transaction if the connection
+    is in autocommit mode and not already in a transaction.
+
+    :param conn: The connection
+    :type conn: Connection
+    """
+    if conn.in_transaction or conn.isolation_level is not None:
+        yield conn
+        return
+    conn.execute(BEGIN)
+    try:
+        yield conn
+    except Exception:
+        conn.execute(ROLLBACK)
+        raise
+    conn.execute(COMMIT)
+# End _ensure_transaction function
+
+
 def get_table_count(db_path, table_name):
     """
     Get a tables row count
 
-    :param db_path: The path to the geopackage
-    :type db_path: str
+    :param db_path: The path to the geopackage or an open connection
+    :type db_path: str or Connection
     :param table_name: The name of the table
     :type table_name: str
     :return: Returns the count
@@ -64,34 +189,126 @@ def get_table_count(db_path, table_name):
 # End get_table_count function
 
 
-def insert_table_rows(database_path, dataset_name, field_names, data):
+def insert_table_rows(database_path, dataset_name, field_names, data,
+                      chunk_size=DEFAULT_CHUNK_SIZE):
     """
-    Insert Many Table Rows to a Geopackage
+    Insert Many Table Rows to a Geopackage.  The data can be any iterable,
+    including a generator, it is consumed in chunks so rows are never
+    gathered into a list.  The width of the first row in each chunk is
+    checked against the field names.  All chunks are inserted in a single
+    transaction (or the caller's transaction).
 
-    :param database_path: The path to the geopackage
-    :type database_path: str
+    :param database_path: The path to the geopackage or an open connection
+    :type database_path: str or Connection
     :param dataset_name: The name of the dataset
     :type dataset_name: str
     :param field_names: List of field names involved
     :type field_names: list
     :param data: The data to use
-    :type data: list or tuple
+    :type data: list or tuple or iterable
+    :param chunk_size: The number of rows handed to executemany at a time
+    :type chunk_size: int
     :return:
     """
-    if not field_names or not data:
+    if not field_names or data is None:
         return
-    test_row = data[0]
-    if len(test_row) != len(field_names):
-        raise ValueError(ERR_DIMENSION_NO_MATCH)
+    sql = make_insert_sql(dataset_name, field_names)
+    count = len(field_names)
+    rows = iter(data)
+    with open_connection(database_path) as conn:
+        with _ensure_transaction(conn):
+            for first in rows:
+                if len(first) != count:
+                    raise ValueError(ERR_DIMENSION_NO_MATCH)
+                conn.executemany(
+                    sql, chain((first,), islice(rows, chunk_size - 1)))
+# End insert_table_rows function
+
+
+def empty_extent():
+    """
+    Empty Extent, the starting point for "accumulate_extent"
+
+    :return: the extent as min x, min y, max x, max y
+    :rtype: list
+    """
+    return [INF, INF, -INF, -INF]
+# End empty_extent function
+
+
+def accumulate_extent(rows, index, extent):
+    """
+    Accumulate Extent, a generator passing rows through while growing an
+    extent (min x, min y, max x, max y, updated in place) with the envelope
+    of the geometry in each row.  Envelopes are only read from the geometry
+    headers, the coordinates are never decoded.  Null and empty geometries
+    are skipped, as are geometries whose header has no envelope, see
+    GeoPackage.recompute_extent.
+
+    :param rows: the rows
+    :type rows: iterable
+    :param index: the position of the geometry in each row
+    :type index: int
+    :param extent: the extent, see "empty_extent"
+    :type extent: list
+    :return: generator of rows
+    :rtype: generator
+    """
+    for row in rows:
+        envelope = gpkg_header_envelope(row[index])
+        if envelope:
+            min_x, max_x, min_y, max_y = envelope
+            if min_x < extent[0]:
+                extent[0] = min_x
+            if min_y < extent[1]:
+                extent[1] = min_y
+            if max_x > extent[2]:
+                extent[2] = max_x
+            if max_y > extent[3]:
+                extent[3] = max_y
+        yield row
+# End accumulate_extent function
+
+
+def merge_extent(extent, other):
+    """
+    Merge Extent, grows an extent (updated in place) to include another
+
+    :param extent: the extent, see "empty_extent"
+    :type extent: list
+    :param other: the extent to include, as min x, min y, max x, max y
+    :type other: tuple or list
+    :return: the extent
+    :rtype: list
+    """
+    extent[0] = min(extent[0], other[0])
+    extent[1] = min(extent[1], other[1])
+    extent[2] = max(extent[2], other[2])
+    extent[3] = max(extent[3], other[3])
+    return extent
+# End merge_extent function
+
+
+def make_insert_sql(dataset_name, field_names):
+    """
+    Make the parameterized insert statement for a table
+
+    :param dataset_name: The name of the dataset
+    :type dataset_name: str
+    :param field_names: List of field names involved
+    :type field_names: list
+    :return: the insert statement
+    :rtype: str
+    """
     q_marks = COMMA_SPACE.join([Q_MARK for _ in field_names])
     field_names = COMMA_SPACE.join(field_names)
-    sql = INSERT_TO_TABLE.format(
+    return INSERT_TO_TABLE.format(
         table_name=dataset_name, field_names=field_names, q_marks=q_marks)
-    connection_execute_many(database_path, sql, data)
-# End insert_table_rows function
+# End make_insert_sql function
 
 
-def create_gpkg_from_sql(db_path, flavor=GPKGFLavors.esri):
+def create_gpkg_from_sql(db_path, flavor=GPKGFLavors.esri, profile=None,
+                         restore=True):
     """
     Create gpkg from raw sql
 
@@ -99,18 +316,35 @@ def create_gpkg_from_sql(db_path, flavor=GPKGFLavors.esri):
     :type db_path: str
     :param flavor: The flavor to use for the default WKT
     :type flavor: str
+    :param profile: The performance profile to create the geopackage with,
+        the page size and any persistent settings are applied before the
+        first table is created.
+    :type profile: str or PragmaProfile
+    :param restore: Flag to restore the durable settings of the profile
+        once the geopackage is created, pass False when a session with the
+        profile is opened right after
+    :type restore: bool
     """
+    profile = get_pragma_profile(profile)
     if not exists(dirname(db_path)):
         raise ValueError('Containing folder of target location does not exist')
     if exists(db_path):
         raise ValueError('Target database already exists')
-    with connect(db_path) as conn:
-        for sql in ORDERED_GPKG_SQL:
-            conn.execute(sql)
     default_srs_records = DEFAULT_ESRI_RECS
     if flavor == GPKGFLavors.epsg:
         default_srs_records = DEFAULT_EPSG_RECS
-    connection_execute_many(db_path, INSERT_GPKG_SRS, default_srs_records)
+    conn = connect(db_path)
+    try:
+        with conn:
+            if profile is not None:
+                profile.apply(conn, creating=True)
+            for sql in ORDERED_GPKG_SQL:
+                conn.execute(sql)
+            conn.executemany(INSERT_GPKG_SRS, default_srs_records)
+        if restore and profile is not None:
+            profile.restore_durable(conn)
+    finally:
+        conn.close()
 # End create_gpkg_from_sql function
 
 
@@ -0,0 +1,505 @@
+"""
+Batch Writer and Queued Writer
+"""
+from sys import version_info
+from threading import Thread, Event, Lock
+
+from pygeopkg.core.columns import as_column_mapping
+from pygeopkg.core.utils import (
+    connection_execute_many, make_insert_sql, empty_extent, accumulate_extent,
+    merge_extent)
+from pygeopkg.shared.constants import (
+    DEFAULT_ROWS_PER_COMMIT, DEFAULT_QUEUE_SIZE, DEFAULT_CHUNK_SIZE)
+from pygeopkg.shared.messages import (
+    ERR_DIMENSION_NO_MATCH, ERR_NO_GEOMETRY_FIELD, ERR_WRITER_CLOSED)
+
+if version_info > (3,):
+    from queue import Queue, Full
+else:  # pragma: no cover
+    from Queue import Queue, Full
+
+
+# kinds of queued items
+_ROWS = 'rows'
+_FLUSH = 'flush'
+_STOP = 'stop'
+
+# seconds between checks for a failed writer while the queue is full
+POLL_INTERVAL = 0.1
+
+
+def _row_size(row):
+    """
+    Estimate the size of a row in bytes, text and binary values count their
+    length and everything else counts as eight bytes.
+
+    :param row: the row values
+    :type row: tuple or list
+    :return: the estimated size
+    :rtype: int
+    """
+    size = 0
+    for value in row:
+        if isinstance(value, (bytes, bytearray, str)):
+            size += len(value)
+        elif isinstance(value, memoryview):
+            size += value.nbytes
+        else:
+            size += 8
+    return size
+# End _row_size function
+
+
+class BatchWriter(object):
+    """
+    Batch Writer, buffers rows for a table and writes them in batches.  Each
+    batch is inserted and committed in its own transaction once the number
+    of rows (or the estimated number of bytes) reaches the limit.  When the
+    GeoPackage already has a transaction open the batches become savepoints
+    of that transaction and committing is left to the caller.
+    """
+    def __init__(self, geopackage, table_name, field_names,
+                 rows_per_commit=DEFAULT_ROWS_PER_COMMIT,
+                 bytes_per_commit=None):
+        """
+        Initialize the BatchWriter class
+
+        :param geopackage: The geopackage
+        :type geopackage: GeoPackage
+        :param table_name: The name of the table to write to
+        :type table_name: str
+        :param field_names: the names of the fields in each row
+        :type field_names: list or tuple
+        :param rows_per_commit: the number of rows in a batch
+        :type rows_per_commit: int
+        :param bytes_per_commit: the estimated number of bytes in a batch,
+            optional, when given a batch is written when either limit is hit
+        :type bytes_per_commit: int
+        """
+        super(BatchWriter, self).__init__()
+        self.geopackage = geopackage
+        self.table_name = table_name
+        self.field_names = list(field_names)
+        self.rows_per_commit = rows_per_commit
+        self.bytes_per_commit = bytes_per_commit
+        self.row_count = 0
+        self._sql = make_insert_sql(table_name, self.field_names)
+        self._rows = []
+        self._size = 0
+        self._opened = not geopackage.is_connected
+        geopackage.connect()
+        self._geometry_index = None
+        column_name = geopackage._get_geometry_column(table_name)
+        names = [name.lower() for name in self.field_names]
+        if column_name and column_name.lower() in names:
+            self._geometry_index = names.index(column_name.lower())
+    # End init built-in
+
+    def __enter__(self):
+        """
+        Enter
+
+        :return: this BatchWriter
+        :rtype: BatchWriter
+        """
+        return self
+    # End __enter__ built-in
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """
+        Exit, writes outstanding rows unless an error occurred, in which
+        case the rows not yet written are discarded.
+        """
+        if exc_type is not None:
+            self._rows = []
+        self.close()
+    # End __exit__ built-in
+
+    def write(self, row):
+        """
+        Write a row, the row is buffered until the batch is full
+
+        :param row: the row values, in the order of the field names
+        :type row: tuple or list
+        """
+        if not self._rows and len(row) != len(self.field_names):
+            raise ValueError(ERR_DIMENSION_NO_MATCH)
+        self._rows.append(row)
+        if self.bytes_per_commit:
+            self._size += _row_size(row)
+            if self._size >= self.bytes_per_commit:
+                self.flush()
+                return
+        if len(self._rows) >= self.rows_per_commit:
+            self.flush()
+    # End write method
+
+    def write_rows(self, rows):
+        """
+        Write many rows
+
+        :param rows: iterable of row values
+        :type rows: list or tuple
+        """
+        for row in rows:
+            self.write(row)
+    # End write_rows method
+
+    def flush(self):
+        """
+        Write the buffered rows in a single transaction, the extent of a
+        feature class is expanded to include the geometry envelopes of the
+        batch, see "accumulate_extent"
+        """
+        if not self._rows:
+            return
+        rows, self._rows, self._size = self._rows, [], 0
+        extent = None
+        if self._geometry_index is not None:
+            extent = empty_extent()
+            for _ in accumulate_extent(rows, self._geometry_index, extent):
+                pass
+        with self.geopackage.transaction():
+            connection_execute_many(self.geopackage.database, self._sql, rows)
+            if extent:
+                self.geopackage._expand_extent(self.table_name, extent)
+        self.row_count += len(rows)
+    # End flush method
+
+    def close(self):
+        """
+        Write outstanding rows and release the connection if this writer
+        opened it.
+        """
+        try:
+            self.flush()
+        finally:
+            if self._opened:
+                self._opened = False
+                self.geopackage.close()
+    # End close method
+# End BatchWriter class
+
+
+class QueuedWriter(object):
+    """
+    Queued Writer, a dedicated writer thread owning its own connection that
+    inserts batches of rows put on a bounded queue by any number of
+    threads.  Rows are gathered per table and written together, one
+    transaction every rows_per_commit rows, so producers never contend for
+    the database lock.  Putting a batch blocks while the queue is full.
+
+    Producers do the expensive work before queueing: rows are materialized,
+    ragged coordinates are encoded and extents are computed in the calling
+    thread, the writer thread only inserts.  An error in the writer thread
+    discards the rows not yet written and is raised by the next call to
+    write_rows, write_columns, flush or close.
+    """
+    def __init__(self, geopackage, rows_per_commit=DEFAULT_ROWS_PER_COMMIT,
+                 queue_size=DEFAULT_QUEUE_SIZE):
+        """
+        Initialize the QueuedWriter class, starts the writer thread
+
+        :param geopackage: The geopackage
+        :type geopackage: GeoPackage
+        :param rows_per_commit: the number of rows in a transaction
+        :type rows_per_commit: int
+        :param queue_size: the number of batches waiting to be written
+            before putting another blocks
+        :type queue_size: int
+        """
+        super(QueuedWriter, self).__init__()
+        self.full_path = geopackage.full_path
+        self.rows_per_commit = rows_per_commit
+        self.row_count = 0
+        self._factory = geopackage.__class__
+        self._profile = geopackage.profile
+        # unconnected, every lookup uses its own connection and is safe to
+        # make from any thread
+        self._catalog = self._factory(self.full_path)
+        self._tables = {}
+        self._lock = Lock()
+        self._queue = Queue(maxsize=queue_size)
+        self._error = None
+        self._closed = False
+        self._thread = Thread(target=self._run, name='QueuedWriter')
+        self._thread.daemon = True
+        self._thread.start()
+    # End init built-in
+
+    def __enter__(self):
+        """
+        Enter
+
+        :return: this QueuedWriter
+        :rtype: QueuedWriter
+        """
+        return self
+    # End __enter__ built-in
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """
+        Exit, writes outstanding rows unless an error occurred, in which
+        case the rows not yet written are discarded.
+        """
+        if exc_type is not None:
+            self._stop(discard=True)
+        else:
+            self.close()
+    # End __exit__ built-in
+
+    def _check(self):
+        """
+        Check the writer accepts batches, raises the error of the writer
+        thread if it failed
+        """
+        if self._error is not None:
+            raise self._error
+        if self._closed:
+            raise ValueError(ERR_WRITER_CLOSED)
+    # End _check method
+
+    def _put(self, item):
+        """
+        Put an item on the queue, blocks while the queue is full and raises
+        if the writer thread fails in the meantime
+
+        :param item: the item
+        :type item: tuple
+        """
+        while True:
+            self._check()
+            try:
+                self._queue.put(item, timeout=POLL_INTERVAL)
+                return
+            except Full:
+                continue
+    # End _put method
+
+    def _get_table(self, table_name):
+        """
+        Get the feature class or table, looked up once per writer
+
+        :param table_name: The table name
+        :type table_name: str
+        :return: the feature class or table
+        :rtype: GeoPkgFeatureClass or GeoPkgTable
+        """
+        with self._lock:
+            if table_name not in self._tables:
+                self._tables[table_name] = self._catalog._get_table(
+                    table_name)
+            return self._tables[table_name]
+    # End _get_table method
+
+    def _rows_extent(self, table_name, field_names, rows):
+        """
+        Extent of the geometries in rows, None when the rows have no
+        geometries
+
+        :param table_name: The table name
+        :type table_name: str
+        :param field_names: the names of the fields in each row
+        :type field_names: list or tuple
+        :param rows: the rows
+        :type rows: list
+        :return: the extent as min x, min y, max x, max y
+        :rtype: list
+        """
+        column_name = self._catalog._get_geometry_column(table_name)
+        names = [name.lower() for name in field_names]
+        if not column_name or column_name.lower() not in names:
+            return None
+        extent = empty_extent()
+        index = names.index(column_name.lower())
+        for _ in accumulate_extent(rows, index, extent):
+            pass
+        return extent
+    # End _rows_extent method
+
+    def write_rows(self, table_name, field_names, rows):
+        """
+        Write a batch of rows, safe to call from any thread
+
+        :param table_name: The name of the table to write to
+        :type table_name: str
+        :param field_names: the names of the fields in each row
+        :type field_names: list or tuple
+        :param rows: the rows, any iterable of rows including a generator
+        :type rows: list, tuple or iterable
+        """
+        self._check()
+        self._get_table(table_name)
+        rows = list(rows)
+        if not rows:
+            return
+        if len(rows[0]) != len(field_names):
+            raise ValueError(ERR_DIMENSION_NO_MATCH)
+        extent = self._rows_extent(table_name, field_names, rows)
+        self._put((_ROWS, table_name, tuple(field_names), rows, extent))
+    # End write_rows method
+
+    def write_columns(self, table_name, columns, geometry=None,
+                      chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Write a batch of columns, safe to call from any thread.  Columns are
+        converted to rows in the calling thread and geometries held as
+        ragged arrays (coordinates followed by offsets) are encoded there,
+        see BaseGeoPkgTable.insert_columns.
+
+        :param table_name: The name of the table to write to
+        :type table_name: str
+        :param columns: the columns by field name, or a numpy structured
+            array whose field names match the fields of the table
+        :type columns: dict or numpy.ndarray
+        :param geometry: the geometries for the shape field of a feature
+            class, encoded geometries or ragged arrays
+        :type geometry: tuple or list
+        :param chunk_size: the number of rows converted at a time
+        :type chunk_size: int
+        """
+        self._check()
+        table = self._get_table(table_name)
+        if geometry is not None:
+            shape_field_name = getattr(table, 'shape_field_name', None)
+            if not shape_field_name:
+                raise ValueError(ERR_NO_GEOMETRY_FIELD.format(table_name))
+            columns = as_column_mapping(columns)
+            columns[shape_field_name] = geometry
+        field_names, rows, extent = table._column_rows(
+            columns, chunk_size=chunk_size)
+        rows = list(rows)
+        if not rows:
+            return
+        if extent is None:
+            extent = self._rows_extent(table_name, field_names, rows)
+        self._put((_ROWS, table_name, tuple(field_names), rows, extent))
+    # End write_columns method
+
+    def flush(self):
+        """
+        Wait until every batch put so far is written and committed
+        """
+        self._check()
+        event = Event()
+        self._put((_FLUSH, event))
+        event.wait()
+        self._check()
+    # End flush method
+
+    def _stop(self, discard=False):
+        """
+        Stop the writer thread and wait for it to finish
+
+        :param discard: flag to discard the rows not yet written
+        :type discard: bool
+        """
+        if self._closed:
+            return
+        self._closed = True
+        # the writer thread keeps draining the queue after an error
+        self._queue.put((_STOP, discard))
+        self._thread.join()
+    # End _stop method
+
+    def close(self):
+        """
+        Write outstanding rows, stop the writer thread and release its
+        connection.  Raises the error of the writer thread, if any.
+        """
+        self._stop()
+        if self._error is not None:
+            raise self._error
+    # End close method
+
+    def _run(self):
+        """
+        Writer thread, inserts the queued batches until stopped
+        """
+        pending = {}
+        geopackage = None
+        try:
+            geopackage = self._factory(
+                self.full_path, profile=self._profile).connect()
+        except Exception as err:
+            self._error = err
+        while True:
+            item = self._queue.get()
+            kind = item[0]
+            try:
+                if self._error is not None:
+                    pending.clear()
+                elif kind == _ROWS:
+                    self._add_pending(pending, *item[1:])
+                    if sum(len(rows) for rows, _ in pending.values()) >= \
+                            self.rows_per_commit:
+                        self._write(geopackage, pending)
+                elif kind == _FLUSH or not item[1]:
+                    self._write(geopackage, pending)
+            except Exception as err:
+                self._error = err
+                pending.clear()
+            finally:
+                if kind == _FLUSH:
+                    item[1].set()
+                self._queue.task_done()
+            if kind == _STOP:
+                break
+        if geopackage is not None:
+            try:
+                geopackage.close()
+            except Exception as err:
+                if self._error is None:
+                    self._error = err
+    # End _run method
+
+    @staticmethod
+    def _add_pending(pending, table_name, field_names, rows, extent):
+        """
+        Add a batch to the pending rows of its table and fields
+
+        :param pending: the pending rows and extent by table and fields
+        :type pending: dict
+        :param table_name: The table name
+        :type table_name: str
+        :param field_names: the names of the fields in each row
+        :type field_names: tuple
+        :param rows: the rows
+        :type rows: list
+        :param extent: the extent of the geometries, if any
+        :type extent: list
+        """
+        key = table_name, field_names
+        if key not in pending:
+            pending[key] = [rows, extent]
+            return
+        batch = pending[key]
+        batch[0].extend(rows)
+        if batch[1] is not None and extent is not None:
+            merge_extent(batch[1], extent)
+    # End _add_pending method
+
+    def _write(self, geopackage, pending):
+        """
+        Write the pending rows of every table in a single transaction
+
+        :param geopackage: The geopackage of the writer thread
+        :type geopackage: GeoPackage
+        :param pending: the pending rows and extent by table and fields
+        :type pending: dict
+        """
+        if not pending:
+            return
+        batches = list(pending.items())
+        pending.clear()
+        with geopackage.transaction():
+            for (table_name, field_names), (rows, extent) in batches:
+                geopackage._insert_rows(
+                    table_name, field_names, rows, extent=extent)
+        self.row_count += sum(len(rows) for _, (rows, _) in batches)
+    # End _write method
+# End QueuedWriter class
+
+
+if __name__ == '__main__':
+    pass
@@ -7,6 +7,20 @@ COMMA_SPACE = ', '
 SHAPE = 'SHAPE'
 Q_MARK = '?'
 GPKG_EXT = '.gpkg'
+WAL_EXT = '-wal'
+SHM_EXT = '-shm'
+SAVEPOINT_PREFIX = 'pygeopkg_sp_'
+SHARD_ALIAS = 'pygeopkg_shard_{0}'
+SHARD_NAME = 'shard_{0}.gpkg'
+SHARD_PREFIX = 'pygeopkg_shards_'
+# the SQLite default for the number of attached databases
+DEFAULT_ATTACHED_LIMIT = 10
+DEFAULT_ROWS_PER_COMMIT = 100000
+DEFAULT_CHUNK_SIZE = 10000
+DEFAULT_QUEUE_SIZE = 16
+DEFAULT_POOL_SIZE = 4
+DEFAULT_IDLE_TIMEOUT = 300.0
+READ_ONLY_MODE = '?mode=ro'
 
 
 if __name__ == '__main__':
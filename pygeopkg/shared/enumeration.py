@@ -13,6 +13,51 @@ class GPKGFLavors(object):
 # End GPKGFLavors class
 
 
+class PragmaProfiles(object):
+    """
+    Named performance profiles, sets of PRAGMA settings applied to a
+    connection, see pygeopkg.core.profile
+    """
+    bulk_load = 'bulk_load'
+    read_serving = 'read_serving'
+    safe_default = 'safe_default'
+# End PragmaProfiles class
+
+
+class JournalModes(object):
+    """
+    SQLite journal modes
+    """
+    delete = 'DELETE'
+    truncate = 'TRUNCATE'
+    persist = 'PERSIST'
+    memory = 'MEMORY'
+    wal = 'WAL'
+    off = 'OFF'
+# End JournalModes class
+
+
+class SynchronousModes(object):
+    """
+    SQLite synchronous modes
+    """
+    off = 'OFF'
+    normal = 'NORMAL'
+    full = 'FULL'
+    extra = 'EXTRA'
+# End SynchronousModes class
+
+
+class TempStores(object):
+    """
+    SQLite temp store locations
+    """
+    default = 'DEFAULT'
+    file = 'FILE'
+    memory = 'MEMORY'
+# End TempStores class
+
+
 class DataType(object):
     """
     Allowed Data Type values
@@ -36,6 +81,27 @@ class GeometryType(object):
 # End GeometryType class
 
 
+class EnvelopeType(object):
+    """
+    Geopackage geometry header envelope types, the value is the envelope
+    contents indicator stored in the header flags
+    """
+    none = 0
+    xy = 1
+    xyz = 2
+    xym = 3
+    xyzm = 4
+# End EnvelopeType class
+
+
+ENVELOPE_CONTENTS = {
+    EnvelopeType.xy: 'xy',
+    EnvelopeType.xyz: 'xyz',
+    EnvelopeType.xym: 'xym',
+    EnvelopeType.xyzm: 'xyzm',
+}
+
+
 class SQLFieldTypes(object):
     """
     SQL Field Types
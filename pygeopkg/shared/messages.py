@@ -8,7 +8,25 @@ ERR_DIMENSION_NO_MATCH = (
     'same number of fields as there are in a row')
 ERR_PROVIDE_PARAMS_FC = (
     'Please Provide proper parameters to the GeoPkgFeatureClass')
+ERR_GPKG_NO_EXIST = 'GeoPackage {0} does not exist!'
+ERR_UNKNOWN_PROFILE = 'Unknown performance profile {0}'
+ERR_NUMPY_REQUIRED = 'numpy is required for vectorized conversion'
+ERR_COORDS_SHAPE = 'Coordinates must have shape (N, {0}), got {1}'
+ERR_COORDS_BUFFER = (
+    'Coordinate buffers must be contiguous little endian float64 values, '
+    '{0} per point')
+ERR_BAD_OFFSETS = (
+    'Offsets must be non-decreasing, start at 0 and end at {0}')
+ERR_MIXED_DIMENSIONS = 'Geometries must all have the same dimensions'
+ERR_MIXED_GEOMETRY_TYPES = (
+    'Geometries must all be points, lines or polygons (single or multi part)')
+ERR_FIELD_NO_EXIST = 'Field {0} does not exist!'
+ERR_COLUMN_LENGTHS = 'Columns must all have the same length'
+ERR_UNSUPPORTED_GEOMETRY = 'Geometry type {0} is not supported'
 ERR_TABLE_EXISTS = 'Table or Feature Class by name {0} already exists!'
+ERR_NO_GEOMETRY_FIELD = 'Table {0} does not have a geometry field'
+ERR_WRITER_CLOSED = 'The writer is closed'
+ERR_HANDLE_CLOSED = 'The GeoPackage handle is closed'
 
 
 if __name__ == '__main__':
@@ -3,17 +3,14 @@ SQL Constants
 """
 
 
-INSERT_GPKG_CONTENTS = """
-    INSERT INTO gpkg_contents (table_name, data_type, identifier, 
-    description, last_change, min_x, min_y, max_x, max_y, srs_id) 
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-"""
-
-
 INSERT_GPKG_OGR_CONTENTS = """
     INSERT INTO gpkg_ogr_contents (table_name, feature_count) VALUES (?, ?)
 """
 
+GPKG_OGR_CONTENTS_INSERT_TRIGGER_NAME = 'trigger_insert_feature_count_{0}'
+
+GPKG_OGR_CONTENTS_DELETE_TRIGGER_NAME = 'trigger_delete_feature_count_{0}'
+
 GPKG_OGR_CONTENTS_INSERT_TRIGGER = """
     CREATE TRIGGER trigger_insert_feature_count_%s
     AFTER INSERT ON %s
@@ -30,6 +27,29 @@ GPKG_OGR_CONTENTS_DELETE_TRIGGER = """
 """
 
 
+UPDATE_GPKG_OGR_CONTENTS_COUNT = """
+    UPDATE gpkg_ogr_contents 
+    SET feature_count = (SELECT COUNT(*) FROM {table_name}) 
+    WHERE table_name = '{table_name}'
+"""
+
+SELECT_GPKG_OGR_CONTENTS_COUNT = """
+    SELECT feature_count FROM gpkg_ogr_contents 
+    WHERE lower(table_name) = lower('{table_name}') 
+    AND feature_count NOT NULL 
+    AND (SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' 
+         AND name IN ('{insert_name}', '{delete_name}')) = 2
+"""
+
+SELECT_GPKG_OGR_CONTENTS = (
+    """SELECT lower(table_name), feature_count FROM gpkg_ogr_contents""")
+
+SET_GPKG_OGR_CONTENTS_COUNT = """
+    UPDATE gpkg_ogr_contents SET feature_count = ? 
+    WHERE lower(table_name) = lower(?)
+"""
+
+
 INSERT_GPKG_CONTENTS_SHORT = """
     INSERT INTO gpkg_contents (table_name, data_type, identifier, 
     description, last_change, srs_id) VALUES (?, ?, ?, ?, ?, ?)
@@ -66,23 +86,33 @@ INSERT_GPKG_SRS = (
 INSERT_TO_TABLE = (
     """INSERT INTO {table_name}({field_names}) VALUES ({q_marks})""")
 
-TABLE_EXISTS = (
-    "SELECT name FROM sqlite_master WHERE type='table' AND name='{table_name}'")
+TRIGGER_EXISTS = (
+    "SELECT name FROM sqlite_master WHERE type='trigger' AND name='{name}'")
+
+DROP_TRIGGER = """DROP TRIGGER IF EXISTS {name}"""
 
 PRAGMA_TABLE_INFO = "PRAGMA table_info({table_name})"
 
+PRAGMA_SCHEMA_VERSION = 'PRAGMA schema_version'
+
+PRAGMA_DATA_VERSION = 'PRAGMA data_version'
+
+SELECT_TABLE_NAMES = "SELECT name FROM sqlite_master WHERE type='table'"
+
+SELECT_CONTENTS_DATA_TYPES = (
+    """SELECT table_name, data_type FROM gpkg_contents""")
+
+SELECT_SRS_IDS = """SELECT srs_id FROM gpkg_spatial_ref_sys"""
+
 SQL_COUNT = 'SELECT COUNT(*) FROM {table_name}'
 
-CHECK_SRS_EXISTS = "SELECT srs_id FROM gpkg_spatial_ref_sys WHERE srs_id = {0}"
+GET_TABLE_NAMES_BY_TYPES = (
+    """SELECT table_name FROM gpkg_contents """
+    """WHERE data_type IN ({data_types})""")
 
 GET_TABLE_NAMES_BY_TYPE = (
     """SELECT table_name FROM gpkg_contents WHERE data_type = '{data_type}'""")
 
-GET_TABLE_NAME_BY_TYPE = (
-    """SELECT table_name FROM gpkg_contents WHERE data_type = '{data_type}' """
-    """AND table_name = '{table_name}'"""
-)
-
 DELETE_FROM_TABLE_BY_NAME = (
     """DELETE FROM {gpkg_table} WHERE table_name = '{table_name}'""")
 
@@ -120,6 +150,204 @@ GET_FC_EXTENT = (
     WHERE table_name = '{table_name}'
     """)
 
+SELECT_GEOMETRY_COLUMNS = (
+    """SELECT table_name, column_name, z, m FROM gpkg_geometry_columns""")
+
+EXPAND_CONTENTS_EXTENT = (
+    """UPDATE gpkg_contents """
+    """SET min_x = MIN(COALESCE(min_x, :min_x), :min_x), """
+    """min_y = MIN(COALESCE(min_y, :min_y), :min_y), """
+    """max_x = MAX(COALESCE(max_x, :max_x), :max_x), """
+    """max_y = MAX(COALESCE(max_y, :max_y), :max_y) """
+    """WHERE table_name = :table_name""")
+
+ATTACH_DATABASE = 'ATTACH DATABASE ? AS {alias}'
+
+DETACH_DATABASE = 'DETACH DATABASE {alias}'
+
+INSERT_FROM_ATTACHED = (
+    """INSERT INTO main.{table_name} ({target_names}) """
+    """SELECT {source_names} FROM {alias}.{table_name} ORDER BY rowid""")
+
+SELECT_ATTACHED_CONTENTS = (
+    """SELECT c.min_x, c.min_y, c.max_x, c.max_y, o.feature_count """
+    """FROM {alias}.gpkg_contents c LEFT JOIN {alias}.gpkg_ogr_contents o """
+    """ON lower(c.table_name) = lower(o.table_name) """
+    """WHERE lower(c.table_name) = lower(?)""")
+
+SELECT_RTREE_EXTENT = (
+    """SELECT MIN(minx), MIN(miny), MAX(maxx), MAX(maxy) """
+    """FROM rtree_{table_name}_{column_name}""")
+
+SELECT_GEOMETRY_EXTENT = (
+    """SELECT MIN(ST_MinX({column_name})), MIN(ST_MinY({column_name})), """
+    """MAX(ST_MaxX({column_name})), MAX(ST_MaxY({column_name})) """
+    """FROM {table_name} WHERE {column_name} NOT NULL""")
+
+RTREE_EXTENSION_NAME = 'gpkg_rtree_index'
+
+RTREE_EXTENSION_DEFINITION = (
+    'http://www.geopackage.org/spec120/#extension_rtree')
+
+RTREE_EXTENSION_SCOPE = 'write-only'
+
+CREATE_RTREE = (
+    """CREATE VIRTUAL TABLE rtree_{table_name}_{column_name} """
+    """USING rtree(id, minx, maxx, miny, maxy)""")
+
+DROP_RTREE = """DROP TABLE IF EXISTS rtree_{table_name}_{column_name}"""
+
+POPULATE_RTREE = """
+    INSERT OR REPLACE INTO rtree_{table_name}_{column_name}
+    SELECT fid, ST_MinX({column_name}), ST_MaxX({column_name}), 
+           ST_MinY({column_name}), ST_MaxY({column_name}) 
+    FROM {table_name} 
+    WHERE {column_name} NOT NULL AND NOT ST_IsEmpty({column_name}) 
+          AND fid > ?
+"""
+
+SELECT_MAX_FID = """SELECT COALESCE(MAX(fid), 0) FROM {table_name}"""
+
+INSERT_GPKG_EXTENSION = (
+    """INSERT OR REPLACE INTO gpkg_extensions (table_name, column_name, """
+    """extension_name, definition, scope) VALUES (?, ?, ?, ?, ?)""")
+
+GET_EXTENSION_COLUMNS = (
+    """SELECT table_name, column_name FROM gpkg_extensions """
+    """WHERE extension_name = '{extension_name}'""")
+
+DELETE_EXTENSIONS_BY_TABLE = (
+    """DELETE FROM gpkg_extensions WHERE table_name = '{table_name}'""")
+
+ENVELOPE_EXTENSION_NAME = 'pygeopkg_envelope_{0}'
+
+ENVELOPE_EXTENSION_DEFINITION = (
+    'http://www.geopackage.org/spec120/#gpb_format')
+
+ENVELOPE_EXTENSION_SCOPE = 'write-only'
+
+SELECT_ENVELOPE_EXTENSIONS = (
+    """SELECT table_name, extension_name FROM gpkg_extensions """
+    """WHERE extension_name GLOB 'pygeopkg_envelope_*'""")
+
+DELETE_ENVELOPE_EXTENSIONS = (
+    """DELETE FROM gpkg_extensions WHERE table_name = ? """
+    """AND extension_name GLOB 'pygeopkg_envelope_*'""")
+
+RTREE_TRIGGER_SUFFIXES = (
+    'insert', 'update1', 'update2', 'update3', 'update4', 'delete')
+
+RTREE_TRIGGER_NAME = 'rtree_{table_name}_{column_name}_{suffix}'
+
+RTREE_TRIGGERS = (
+    """
+    CREATE TRIGGER rtree_{table_name}_{column_name}_insert 
+    AFTER INSERT ON {table_name} 
+    WHEN (new.{column_name} NOT NULL AND NOT ST_IsEmpty(NEW.{column_name}))
+    BEGIN
+      INSERT OR REPLACE INTO rtree_{table_name}_{column_name} VALUES (
+        NEW.fid, 
+        ST_MinX(NEW.{column_name}), ST_MaxX(NEW.{column_name}), 
+        ST_MinY(NEW.{column_name}), ST_MaxY(NEW.{column_name}));
+    END
+    """,
+    """
+    CREATE TRIGGER rtree_{table_name}_{column_name}_update1 
+    AFTER UPDATE OF {column_name} ON {table_name} 
+    WHEN OLD.fid = NEW.fid AND 
+         (NEW.{column_name} NOTNULL AND NOT ST_IsEmpty(NEW.{column_name}))
+    BEGIN
+      INSERT OR REPLACE INTO rtree_{table_name}_{column_name} VALUES (
+        NEW.fid, 
+        ST_MinX(NEW.{column_name}), ST_MaxX(NEW.{column_name}), 
+        ST_MinY(NEW.{column_name}), ST_MaxY(NEW.{column_name}));
+    END
+    """,
+    """
+    CREATE TRIGGER rtree_{table_name}_{column_name}_update2 
+    AFTER UPDATE OF {column_name} ON {table_name} 
+    WHEN OLD.fid = NEW.fid AND 
+         (NEW.{column_name} IS NULL OR ST_IsEmpty(NEW.{column_name}))
+    BEGIN
+      DELETE FROM rtree_{table_name}_{column_name} WHERE id = OLD.fid;
+    END
+    """,
+    """
+    CREATE TRIGGER rtree_{table_name}_{column_name}_update3 
+    AFTER UPDATE ON {table_name} 
+    WHEN OLD.fid != NEW.fid AND 
+         (NEW.{column_name} NOTNULL AND NOT ST_IsEmpty(NEW.{column_name}))
+    BEGIN
+      DELETE FROM rtree_{table_name}_{column_name} WHERE id = OLD.fid;
+      INSERT OR REPLACE INTO rtree_{table_name}_{column_name} VALUES (
+        NEW.fid, 
+        ST_MinX(NEW.{column_name}), ST_MaxX(NEW.{column_name}), 
+        ST_MinY(NEW.{column_name}), ST_MaxY(NEW.{column_name}));
+    END
+    """,
+    """
+    CREATE TRIGGER rtree_{table_name}_{column_name}_update4 
+    AFTER UPDATE ON {table_name} 
+    WHEN OLD.fid != NEW.fid AND 
+         (NEW.{column_name} IS NULL OR ST_IsEmpty(NEW.{column_name}))
+    BEGIN
+      DELETE FROM rtree_{table_name}_{column_name} 
+      WHERE id IN (OLD.fid, NEW.fid);
+    END
+    """,
+    """
+    CREATE TRIGGER rtree_{table_name}_{column_name}_delete 
+    AFTER DELETE ON {table_name} 
+    WHEN old.{column_name} NOT NULL
+    BEGIN
+      DELETE FROM rtree_{table_name}_{column_name} WHERE id = OLD.fid;
+    END
+    """,
+)
+
+SELECT_FIELDS = """SELECT {field_names} FROM {table_name}"""
+
+WHERE_CLAUSE = """ WHERE {where}"""
+
+SELECT_BBOX_RTREE = (
+    """SELECT {field_names} FROM {table_name} WHERE fid IN ("""
+    """SELECT id FROM rtree_{table_name}_{column_name} """
+    """WHERE minx <= ? AND maxx >= ? AND miny <= ? AND maxy >= ?)""")
+
+SELECT_BBOX_ENVELOPE = (
+    """SELECT {field_names} FROM {table_name} """
+    """WHERE {column_name} NOT NULL """
+    """AND ST_MinX({column_name}) <= ? AND ST_MaxX({column_name}) >= ? """
+    """AND ST_MinY({column_name}) <= ? AND ST_MaxY({column_name}) >= ?""")
+
+PRAGMA_JOURNAL_MODE = 'PRAGMA journal_mode={0}'
+
+PRAGMA_SYNCHRONOUS = 'PRAGMA synchronous={0}'
+
+PRAGMA_PAGE_SIZE = 'PRAGMA page_size={0}'
+
+PRAGMA_CACHE_SIZE = 'PRAGMA cache_size={0}'
+
+PRAGMA_TEMP_STORE = 'PRAGMA temp_store={0}'
+
+PRAGMA_MMAP_SIZE = 'PRAGMA mmap_size={0}'
+
+PRAGMA_QUERY_ONLY = 'PRAGMA query_only=1'
+
+BEGIN = 'BEGIN'
+
+BEGIN_IMMEDIATE = 'BEGIN IMMEDIATE'
+
+SAVEPOINT = 'SAVEPOINT {name}'
+
+RELEASE_SAVEPOINT = 'RELEASE SAVEPOINT {name}'
+
+ROLLBACK_TO_SAVEPOINT = 'ROLLBACK TO SAVEPOINT {name}'
+
+COMMIT = 'COMMIT'
+
+ROLLBACK = 'ROLLBACK'
+
 
 if __name__ == '__main__':
     pass
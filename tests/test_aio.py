@@ -0,0 +1,103 @@
+"""
+Test Async GeoPackage
+"""
+
+
+from asyncio import run, gather, sleep
+from os.path import dirname, join
+from sqlite3 import IntegrityError
+from unittest import TestCase
+from pygeopkg.core.aio import AsyncGeoPackage
+from pygeopkg.core.field import Field
+from pygeopkg.core.srs import SRS
+from pygeopkg.shared.enumeration import SQLFieldTypes
+from tests.projection_strings import WGS_1984_UTM_Zone_23N
+from tests.utils import random_points_and_attrs
+
+
+class TestAsyncGeoPackage(TestCase):
+    """
+    Test Async GeoPackage
+    """
+    def test_async_geopackage(self):
+        """
+        Test creating, writing and streaming reads without blocking the loop
+        """
+        target_path = join(dirname(__file__), 'test_async.gpkg')
+        srs = SRS('WGS_1984_UTM_Zone_23N', 'EPSG', 32623, WGS_1984_UTM_Zone_23N)
+        fields = [Field('int_fld', SQLFieldTypes.integer),
+                  Field('text_fld', SQLFieldTypes.text)]
+        rows = random_points_and_attrs(250, srs.srs_id)
+        field_names = ['SHAPE', 'int_fld', 'text_fld']
+        rows = [row[:3] for row in rows]
+
+        async def _ticker(ticks):
+            for _ in range(5):
+                ticks.append(1)
+                await sleep(0)
+
+        async def _main():
+            gpkg = await AsyncGeoPackage.create(target_path)
+            async with gpkg:
+                fc = await gpkg.create_feature_class(
+                    'test1', srs, fields=fields, spatial_index=True)
+                table = await gpkg.create_table('table1', fields=fields)
+                await fc.insert_rows(field_names, rows[:50])
+                ticks = []
+                async with fc.writer(
+                        field_names, rows_per_commit=20,
+                        max_pending=2) as writer:
+                    await gather(writer.write_rows(rows[50:]),
+                                 _ticker(ticks))
+                self.assertEqual(writer.row_count, 200)
+                self.assertEqual(len(ticks), 5)
+                self.assertEqual(await fc.get_count(), 250)
+
+                values = [row async for row in fc.search(
+                    ['int_fld'], batch_size=7)]
+                self.assertEqual(values, [row[1:2] for row in rows])
+                found = [row async for row in fc.query_bbox(
+                    -1e9, -1e9, 1e9, 1e9, fields=['int_fld'])]
+                self.assertEqual(len(found), 250)
+                counted = [row async for row in gpkg.iterate(
+                    'SELECT fid FROM test1 WHERE fid <= ?', (10,),
+                    batch_size=3)]
+                self.assertEqual(counted, [(i,) for i in range(1, 11)])
+
+                await gpkg.insert_rows('table1', ['int_fld'], [(1,), (2,)])
+                self.assertEqual(await table.get_count(exact=True), 2)
+                self.assertEqual(await gpkg.execute_query(
+                    'SELECT SUM(int_fld) FROM table1'), [(3,)])
+                self.assertEqual(
+                    (await gpkg.get_table('test1')).name, 'test1')
+                self.assertEqual(
+                    await gpkg.run(gpkg.geopackage.verify_counts), {})
+
+                writer = table.writer(
+                    ['fid', 'int_fld'], rows_per_commit=1, max_pending=1)
+                with self.assertRaises(IntegrityError):
+                    async with writer:
+                        await writer.write_rows([(10, 1), (10, 2), (11, 3)])
+                self.assertEqual(await table.get_count(), 3)
+                with self.assertRaises(ValueError):
+                    await writer.write((1,))
+
+                writer = table.writer(
+                    ['fid', 'int_fld'], rows_per_commit=2)
+                await writer.write_rows([(20, 1), (20, 2)])
+                # the failed batch is done once the database thread is idle
+                await gpkg.run(len, [])
+                with self.assertRaises(IntegrityError):
+                    await writer.write((21, 3))
+                self.assertEqual(writer.row_count, 0)
+                await writer.close()
+                self.assertEqual(await table.get_count(), 3)
+            self.assertFalse(gpkg.geopackage.is_connected)
+
+        run(_main())
+    # End test_async_geopackage method
+# End TestAsyncGeoPackage class
+
+
+if __name__ == '__main__':
+    pass
@@ -2,19 +2,30 @@
 Test conversion
 """
 import sys
-from unittest import TestCase
-from struct import unpack
+from array import array
+from unittest import TestCase, skipIf
+from struct import pack, unpack
 from pygeopkg.conversion.to_geopkg_geom import (
     make_gpkg_geom_header, point_to_gpkg_point, points_to_gpkg_line_string,
     point_lists_to_gpkg_polygon, points_z_to_gpkg_line_string_z,
     points_m_to_gpkg_line_string_m, points_zm_to_gpkg_line_string_zm, GP_MAGIC,
-    points_to_gpkg_multipoint)
+    points_to_gpkg_multipoint, point_lists_to_gpkg_multi_polygon,
+    point_lists_to_gpkg_multi_line_string, point_zm_to_gpkg_point_zm)
+from pygeopkg.conversion.from_geopkg_geom import (
+    gpkg_envelope, gpkg_is_empty, read_gpkg_header, gpkg_to_geometry,
+    gpkg_to_wkb, wkb_to_geometry, gpkg_header_envelope)
+from pygeopkg.shared.enumeration import EnvelopeType
 from pygeopkg.conversion.to_wkb import (
     point_to_wkb_point, points_to_wkb_line_string, point_lists_to_wkb_polygon,
     point_z_to_wkb_point_z, point_m_to_wkb_point_m, point_zm_to_wkb_point_zm,
     points_z_to_wkb_line_string_z, point_lists_to_wkb_multipolygon,
     multipoint_to_wkb_multipoint, point_lists_to_multi_line_string)
 
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
 
 class TestConversion(TestCase):
     """
@@ -330,6 +341,28 @@ class TestConversion(TestCase):
         self.assertEqual(expected, points)
     # End test_wkb_poly
 
+    def test_wkb_many_parts(self):
+        """
+        Test multi part geometries with many parts, written with a header
+        """
+        hdr = make_gpkg_geom_header(32623)
+        ring = [(0., 0.), (0., 1.), (1., 1.), (1., 0.), (0., 0.)]
+        polys = [[ring, ring[::-1]]] * 5000
+        out = point_lists_to_gpkg_multi_polygon(hdr, polys)
+        parts = pack('<BI', 1, 6) + pack('<I', len(polys)) + b''.join(
+            point_lists_to_wkb_polygon(poly) for poly in polys)
+        self.assertEqual(out, hdr + parts)
+        self.assertEqual(gpkg_to_geometry(out), (32623, 6, polys))
+        lines = [ring] * 5000
+        out = point_lists_to_gpkg_multi_line_string(hdr, lines)
+        self.assertEqual(gpkg_to_geometry(out), (32623, 5, lines))
+        out = points_to_gpkg_multipoint(hdr, ring, EnvelopeType.xy)
+        self.assertEqual(gpkg_to_geometry(out), (32623, 4, ring))
+        self.assertEqual(gpkg_envelope(out), (0., 1., 0., 1.))
+        self.assertEqual(point_lists_to_gpkg_polygon(hdr, []),
+                         hdr + pack('<BII', 1, 3, 0))
+    # End test_wkb_many_parts
+
     def test_gpkg_header(self):
         """
         Test the Geopackage Header
@@ -339,6 +372,163 @@ class TestConversion(TestCase):
         self.assertEqual((GP_MAGIC, 0, 1, 32623), test)
     # End test_gpkg_header
 
+    def test_gpkg_header_envelope(self):
+        """
+        Test the Geopackage Header with an envelope
+        """
+        hdr = make_gpkg_geom_header(32623, (1., 2., 3., 4.), EnvelopeType.xy)
+        test = unpack('<2s2bi4d', hdr)
+        self.assertEqual((GP_MAGIC, 0, 3, 32623, 1., 2., 3., 4.), test)
+        hdr = make_gpkg_geom_header(32623)
+        ring = [(300000.0, 1.0), (300000.0, 4000000.0),
+                (700000.0, 4000000.0), (700000.0, 1.0), (300000.0, 1.0)]
+        out = point_lists_to_gpkg_polygon(hdr, [ring], EnvelopeType.xy)
+        test = unpack('<2s2bi4d', out[:40])
+        self.assertEqual(
+            (GP_MAGIC, 0, 3, 32623, 300000.0, 700000.0, 1.0, 4000000.0), test)
+        self.assertEqual(out[40:], point_lists_to_gpkg_polygon(hdr, [ring])[8:])
+        out = points_zm_to_gpkg_line_string_zm(
+            hdr, [(0., 1., 2., 3.), (4., 5., 6., 7.)], EnvelopeType.xym)
+        test = unpack('<2s2bi6d', out[:56])
+        self.assertEqual((GP_MAGIC, 0, 7, 32623, 0., 4., 1., 5., 3., 7.), test)
+        template = make_gpkg_geom_header(32623, envelope_type=EnvelopeType.xy)
+        self.assertEqual(len(template), 40)
+        self.assertEqual(
+            point_lists_to_gpkg_polygon(template, [ring]),
+            point_lists_to_gpkg_polygon(hdr, [ring], EnvelopeType.xy))
+        self.assertEqual(
+            point_lists_to_gpkg_polygon(template, [ring], EnvelopeType.none),
+            point_lists_to_gpkg_polygon(hdr, [ring]))
+    # End test_gpkg_header_envelope
+
+    def test_buffer_coordinates(self):
+        """
+        Test coordinates given as buffers encode the same as tuples
+        """
+        hdr = make_gpkg_geom_header(32623)
+        ring = [(300000.0, 1.0), (300000.0, 4000000.0),
+                (700000.0, 4000000.0), (700000.0, 1.0), (300000.0, 1.0)]
+        flat = array('d', [value for point in ring for value in point])
+        for coords in (flat, memoryview(flat), flat.tobytes()):
+            self.assertEqual(points_to_wkb_line_string(ring),
+                             points_to_wkb_line_string(coords))
+            self.assertEqual(point_lists_to_wkb_polygon([ring]),
+                             point_lists_to_wkb_polygon([coords]))
+            self.assertEqual(
+                point_lists_to_multi_line_string([ring, ring]),
+                point_lists_to_multi_line_string([coords, ring]))
+            self.assertEqual(multipoint_to_wkb_multipoint(ring),
+                             multipoint_to_wkb_multipoint(coords))
+            for envelope_type in (EnvelopeType.none, EnvelopeType.xy):
+                self.assertEqual(
+                    point_lists_to_gpkg_polygon(hdr, [ring], envelope_type),
+                    point_lists_to_gpkg_polygon(hdr, [coords], envelope_type))
+                self.assertEqual(
+                    points_to_gpkg_line_string(hdr, ring, envelope_type),
+                    points_to_gpkg_line_string(hdr, coords, envelope_type))
+                self.assertEqual(
+                    point_lists_to_gpkg_multi_polygon(
+                        hdr, [[ring], [ring]], envelope_type),
+                    point_lists_to_gpkg_multi_polygon(
+                        hdr, [[coords], [ring]], envelope_type))
+        line = [(0., 1., 2., 3.), (4., 5., 6., 7.)]
+        flat = array('d', [value for point in line for value in point])
+        self.assertEqual(
+            points_zm_to_gpkg_line_string_zm(hdr, line, EnvelopeType.xyzm),
+            points_zm_to_gpkg_line_string_zm(hdr, flat, EnvelopeType.xyzm))
+        with self.assertRaises(ValueError):
+            points_to_wkb_line_string(array('d', [1., 2., 3.]))
+        with self.assertRaises(ValueError):
+            points_to_wkb_line_string(array('f', [1., 2.]))
+    # End test_buffer_coordinates
+
+    @skipIf(np is None, 'numpy is not installed')
+    def test_numpy_coordinates(self):
+        """
+        Test coordinates given as numpy arrays encode the same as tuples
+        """
+        hdr = make_gpkg_geom_header(32623)
+        ring = [(300000.0, 1.0), (300000.0, 4000000.0),
+                (700000.0, 4000000.0), (700000.0, 1.0), (300000.0, 1.0)]
+        coords = np.array(ring)
+        self.assertEqual(
+            point_lists_to_gpkg_polygon(hdr, [ring], EnvelopeType.xy),
+            point_lists_to_gpkg_polygon(hdr, [coords], EnvelopeType.xy))
+        self.assertEqual(points_to_wkb_line_string(ring),
+                         points_to_wkb_line_string(coords.ravel()))
+        with self.assertRaises(ValueError):
+            points_to_wkb_line_string(np.zeros((4, 3)))
+        with self.assertRaises(ValueError):
+            points_to_wkb_line_string(np.asfortranarray(np.zeros((4, 2))))
+        with self.assertRaises(ValueError):
+            points_to_wkb_line_string(coords.astype('>f8'))
+    # End test_numpy_coordinates
+
+    def test_gpkg_envelope(self):
+        """
+        Test reading the envelope of geopackage geometries
+        """
+        hdr = make_gpkg_geom_header(32623)
+        rings = [[(0.0, 1.0), (0.0, 9.0), (5.0, 9.0), (5.0, 1.0), (0.0, 1.0)],
+                 [(1.0, 2.0), (2.0, 2.0), (2.0, 3.0), (1.0, 2.0)]]
+        expected = (0.0, 5.0, 1.0, 9.0)
+        self.assertEqual(
+            gpkg_envelope(point_lists_to_gpkg_polygon(hdr, rings)), expected)
+        out = point_lists_to_gpkg_polygon(hdr, rings, EnvelopeType.xy)
+        self.assertEqual(gpkg_envelope(out), expected)
+        self.assertEqual(read_gpkg_header(out),
+                         (32623, EnvelopeType.xy, False, expected, 40))
+        self.assertEqual(gpkg_header_envelope(out), expected)
+        self.assertEqual(
+            gpkg_header_envelope(point_lists_to_gpkg_polygon(hdr, rings)), ())
+        self.assertIsNone(gpkg_header_envelope(None))
+        out = points_zm_to_gpkg_line_string_zm(
+            hdr, [(3.0, 4.0, 5.0, 6.0), (1.0, 8.0, 7.0, 9.0)])
+        self.assertEqual(gpkg_envelope(out), (1.0, 3.0, 4.0, 8.0))
+        out = points_to_gpkg_multipoint(hdr, [(2.0, 3.0), (-1.0, 7.0)])
+        self.assertEqual(gpkg_envelope(out), (-1.0, 2.0, 3.0, 7.0))
+        out = point_to_gpkg_point(hdr, float('nan'), float('nan'))
+        self.assertTrue(gpkg_is_empty(out))
+        self.assertIsNone(gpkg_envelope(out))
+        self.assertEqual(gpkg_header_envelope(out), ())
+        self.assertIsNone(gpkg_is_empty(None))
+        self.assertFalse(gpkg_is_empty(point_to_gpkg_point(hdr, 1.0, 2.0)))
+    # End test_gpkg_envelope
+
+    def test_gpkg_decode(self):
+        """
+        Test decoding geopackage geometries
+        """
+        hdr = make_gpkg_geom_header(32623)
+        line = [(0.0, 1.0), (2.0, 3.0), (4.0, 5.0)]
+        rings = [[(0.0, 1.0), (0.0, 9.0), (5.0, 9.0), (5.0, 1.0), (0.0, 1.0)],
+                 [(1.0, 2.0), (2.0, 2.0), (2.0, 3.0), (1.0, 2.0)]]
+        cases = (
+            (point_to_gpkg_point(hdr, 1.0, 2.0), 1, (1.0, 2.0)),
+            (point_zm_to_gpkg_point_zm(hdr, 1.0, 2.0, 3.0, 4.0), 3001,
+             (1.0, 2.0, 3.0, 4.0)),
+            (points_to_gpkg_line_string(hdr, line), 2, line),
+            (points_m_to_gpkg_line_string_m(
+                hdr, [(x, y, 7.0) for x, y in line], EnvelopeType.xym),
+             2002, [(x, y, 7.0) for x, y in line]),
+            (point_lists_to_gpkg_polygon(hdr, rings), 3, rings),
+            (points_to_gpkg_multipoint(hdr, line), 4, line),
+            (point_lists_to_gpkg_multi_line_string(hdr, rings), 5, rings),
+            (point_lists_to_gpkg_multi_polygon(hdr, [rings, rings[:1]]), 6,
+             [rings, rings[:1]]),
+        )
+        for blob, wkb_type, expected in cases:
+            self.assertEqual(
+                gpkg_to_geometry(blob), (32623, wkb_type, expected))
+            wkb = gpkg_to_wkb(blob)
+            self.assertEqual(wkb, blob[-len(wkb):])
+            self.assertEqual(wkb_to_geometry(wkb), (wkb_type, expected))
+        self.assertIsNone(gpkg_to_geometry(None))
+        # big endian header and body
+        blob = GP_MAGIC + pack('>2bi', 0, 0, 4326) + pack('>BI2d', 0, 1, 5, 6)
+        self.assertEqual(gpkg_to_geometry(blob), (4326, 1, (5.0, 6.0)))
+    # End test_gpkg_decode
+
     def test_gpkg_point(self):
         """
         Test geopackage point
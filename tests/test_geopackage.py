@@ -3,22 +3,60 @@ Test GeoPackage
 """
 
 
+import os
 from os.path import dirname, join, exists, isfile
-from unittest import TestCase
+from struct import unpack
+from inspect import isgenerator
+from sqlite3 import connect, OperationalError
+from threading import Thread
+from multiprocessing import get_context
+from unittest import TestCase, skipIf
 from pygeopkg.conversion.to_geopkg_geom import (
     points_to_gpkg_line_string, make_gpkg_geom_header,
     point_lists_to_gpkg_polygon, points_z_to_gpkg_line_string_z,
     points_m_to_gpkg_line_string_m, points_zm_to_gpkg_line_string_zm,
     point_lists_to_gpkg_multi_polygon, points_to_gpkg_multipoint,
-    point_lists_to_gpkg_multi_line_string)
+    point_lists_to_gpkg_multi_line_string, point_to_gpkg_point)
+from pygeopkg.conversion.from_geopkg_geom import read_gpkg_header
+from pygeopkg.conversion.vectorized import np, points_to_gpkg_points
 from pygeopkg.core.geopkg import GeoPackage, GeoPkgFeatureClass, GeoPkgTable
+from pygeopkg.core.pool import SharedGeoPackage
 from pygeopkg.core.srs import SRS
 from pygeopkg.core.field import Field
-from pygeopkg.shared.enumeration import GeometryType, SQLFieldTypes
+from pygeopkg.shared.enumeration import (
+    GeometryType, SQLFieldTypes, PragmaProfiles, EnvelopeType)
+from pygeopkg.shared.sql import INSERT_GPKG_SRS
 from tests.projection_strings import WGS_1984_UTM_Zone_23N
 from tests.utils import (
     check_ogr_trigger_exists, get_table_rows, check_table_exists,
-    random_points_and_attrs, random_attrs)
+    random_points_and_attrs, random_attrs, get_table_count)
+
+
+def _write_partition(geopackage, partition):
+    """
+    Write a partition of points and attributes, see parallel_build
+    """
+    if partition is None:
+        raise ValueError('bad partition')
+    start, count = partition
+    fc = geopackage.get_feature_class('test1')
+    hdr = fc.geometry_header
+    fc.insert_rows(['SHAPE', 'int_fld'], [
+        (point_to_gpkg_point(hdr, float(i), -float(i)), i)
+        for i in range(start, start + count)])
+    if geopackage.table_exists('table1'):
+        geopackage.insert_rows('table1', ['int_fld'], [(start,)])
+# End _write_partition function
+
+
+def _read_in_child(handle, queue):
+    """
+    Read through a shared geopackage in a forked process
+    """
+    with handle.reader() as gpkg:
+        count = gpkg.execute_query('SELECT COUNT(*) FROM table1')[0][0]
+    queue.put((count, len(handle._abandoned), handle.idle_count))
+# End _read_in_child function
 
 
 class TestGeoPackage(TestCase):
@@ -531,6 +569,822 @@ class TestGeoPackage(TestCase):
         self.assertEqual(fc.count, 1)
         self.assertEqual('SHAPE', fc.shape_field_name)
     # End test_insert_multi_lines method
+
+    def test_session(self):
+        """
+        Test a persistent connection shared by the geopackage and its tables
+        """
+        target_path, gpkg, srs, fields = self._setup_basics(
+            'test_session.gpkg')
+        self.assertFalse(gpkg.is_connected)
+        self.assertEqual(gpkg.database, target_path)
+        with GeoPackage.open(target_path) as session:
+            self.assertTrue(session.is_connected)
+            conn = session.database
+            fc = session.create_feature_class('test1', srs, fields=fields)
+            self.assertIs(fc.geopackage.database, conn)
+            rows = random_points_and_attrs(100, srs.srs_id)
+            fc.insert_rows(['SHAPE'] + [f.name for f in fields], rows)
+            self.assertEqual(fc.count, 100)
+            self.assertTrue(session.table_exists('test1'))
+            self.assertIs(session.database, conn)
+        self.assertFalse(session.is_connected)
+        self.assertEqual(get_table_count(target_path, 'test1'), 100)
+        with self.assertRaises(RuntimeError):
+            with GeoPackage.open(target_path) as session:
+                session.execute_query('BEGIN')
+                session.execute_query('DELETE FROM test1')
+                raise RuntimeError
+        self.assertEqual(get_table_count(target_path, 'test1'), 100)
+        with self.assertRaises(ValueError):
+            GeoPackage.open(join(dirname(__file__), 'no_such.gpkg'))
+    # End test_session method
+
+    def test_envelope_type(self):
+        """
+        Test the envelope type is saved with the feature class
+        """
+        target_path, gpkg, srs, fields = self._setup_basics(
+            'test_envelope_type.gpkg')
+        gpkg.create_feature_class(
+            'test1', srs, shape_type=GeometryType.linestring,
+            envelope_type=EnvelopeType.xy)
+        gpkg.create_feature_class('test2', srs)
+        fc = gpkg.get_feature_class('test1')
+        self.assertEqual(fc.envelope_type, EnvelopeType.xy)
+        self.assertEqual(gpkg._get_table('test1').envelope_type,
+                         EnvelopeType.xy)
+        envelope_types = dict(
+            (f.name, f.envelope_type) for f in gpkg.feature_classes)
+        self.assertEqual(envelope_types, {
+            'test1': EnvelopeType.xy, 'test2': EnvelopeType.none})
+        self.assertEqual(gpkg.get_feature_class(
+            'test1', EnvelopeType.none).envelope_type, EnvelopeType.none)
+
+        line = [(0.0, 5.0), (2.0, 1.0), (1.0, 3.0)]
+        fc.insert_rows(['SHAPE'], [
+            (points_to_gpkg_line_string(fc.geometry_header, line),)])
+        fc.insert_columns({}, geometry=(np.array(line), np.array([0, 3])))
+        with GeoPackage.open(target_path) as session:
+            with session.writer() as writer:
+                writer.write_columns('test1', {}, geometry=(
+                    np.array(line), np.array([0, 3])))
+        for blob, in gpkg.execute_query('SELECT SHAPE FROM test1'):
+            self.assertEqual(read_gpkg_header(blob)[1:4], (
+                EnvelopeType.xy, False, (0.0, 2.0, 1.0, 5.0)))
+
+        gpkg.delete_feature_class('test1')
+        self.assertEqual(gpkg.execute_query(
+            "SELECT COUNT(*) FROM gpkg_extensions "
+            "WHERE table_name = 'test1'"), [(0,)])
+    # End test_envelope_type method
+
+    def test_transaction(self):
+        """
+        Test transactions, including rollback of a nested savepoint
+        """
+        target_path, gpkg, srs, fields = self._setup_basics(
+            'test_transaction.gpkg')
+        field_names = ['SHAPE'] + [f.name for f in fields]
+        with self.assertRaises(RuntimeError):
+            with gpkg.transaction():
+                gpkg.create_feature_class('test1', srs, fields=fields)
+                raise RuntimeError('boom')
+        self.assertFalse(gpkg.is_connected)
+        self.assertFalse(gpkg.table_exists('test1'))
+        self.assertIsNone(gpkg.get_feature_class('test1'))
+
+        with gpkg.transaction():
+            fc = gpkg.create_feature_class('test1', srs, fields=fields)
+            fc.insert_rows(field_names, random_points_and_attrs(10, 32623))
+            with self.assertRaises(RuntimeError):
+                with gpkg.transaction():
+                    fc.insert_rows(
+                        field_names, random_points_and_attrs(5, 32623))
+                    raise RuntimeError('boom')
+        self.assertEqual(get_table_count(target_path, 'test1'), 10)
+        self.assertEqual(fc.count, 10)
+    # End test_transaction method
+
+    def test_batch_writer(self):
+        """
+        Test the batch writer commits in batches
+        """
+        target_path, gpkg, srs, fields = self._setup_basics(
+            'test_batch_writer.gpkg')
+        fc = gpkg.create_feature_class('test1', srs, fields=fields)
+        field_names = ['SHAPE'] + [f.name for f in fields]
+        rows = random_points_and_attrs(250, srs.srs_id)
+        with fc.batch_writer(field_names, rows_per_commit=100) as writer:
+            writer.write_rows(rows[:200])
+            self.assertEqual(writer.row_count, 200)
+            self.assertEqual(get_table_count(target_path, 'test1'), 200)
+            writer.write_rows(rows[200:])
+        self.assertEqual(writer.row_count, 250)
+        self.assertEqual(fc.count, 250)
+        self.assertFalse(gpkg.is_connected)
+
+        with gpkg.batch_writer('test1', field_names, bytes_per_commit=1) as w:
+            w.write(rows[0])
+            self.assertEqual(w.row_count, 1)
+            with self.assertRaises(ValueError):
+                w.write(rows[0][:2])
+        self.assertEqual(fc.count, 251)
+    # End test_batch_writer method
+
+    def test_pragma_profiles(self):
+        """
+        Test creating and opening with performance profiles
+        """
+        target_path = join(dirname(__file__), 'test_profiles.gpkg')
+        gpkg = GeoPackage.create(
+            target_path, profile=PragmaProfiles.bulk_load)
+        self.assertEqual(gpkg.execute_query('PRAGMA page_size')[0][0], 65536)
+        self.assertEqual(
+            gpkg.execute_query('PRAGMA journal_mode')[0][0], 'delete')
+        self.assertFalse(exists(target_path + '-wal'))
+        with gpkg:
+            self.assertEqual(
+                gpkg.execute_query('PRAGMA journal_mode')[0][0], 'wal')
+            self.assertEqual(gpkg.execute_query('PRAGMA synchronous')[0][0], 0)
+            srs = SRS('WGS_1984_UTM_Zone_23N', 'EPSG', 32623,
+                      WGS_1984_UTM_Zone_23N)
+            gpkg.create_feature_class('test1', srs)
+        self.assertEqual(
+            gpkg.execute_query('PRAGMA journal_mode')[0][0], 'delete')
+
+        with GeoPackage.open(target_path, PragmaProfiles.read_serving) as gpkg:
+            self.assertEqual(
+                gpkg.execute_query('PRAGMA journal_mode')[0][0], 'wal')
+            self.assertTrue(gpkg.table_exists('test1'))
+        with self.assertRaises(ValueError):
+            GeoPackage(target_path, profile='fastest')
+    # End test_pragma_profiles method
+
+    def test_insert_rows_generator(self):
+        """
+        Test inserting rows from a generator in chunks
+        """
+        target_path, gpkg, srs, fields = self._setup_basics(
+            'test_insert_generator.gpkg')
+        fc = gpkg.create_feature_class('test1', srs, fields=fields)
+        field_names = ['SHAPE'] + [f.name for f in fields]
+        rows = random_points_and_attrs(1000, srs.srs_id)
+        fc.insert_rows(field_names, (row for row in rows), chunk_size=64)
+        self.assertEqual(fc.count, 1000)
+        gpkg.insert_rows('test1', field_names, iter(rows[:10]), chunk_size=3)
+        self.assertEqual(fc.count, 1010)
+
+        def bad_rows():
+            for row in rows[:20]:
+                yield row
+            yield row[:2]
+        with self.assertRaises(ValueError):
+            fc.insert_rows(field_names, bad_rows(), chunk_size=10)
+        self.assertEqual(fc.count, 1010)
+    # End test_insert_rows_generator method
+
+    def test_insert_rows_bulk(self):
+        """
+        Test bulk insert suspends and reinstates the feature count triggers
+        """
+        target_path, gpkg, srs, fields = self._setup_basics(
+            'test_insert_bulk.gpkg')
+        fc = gpkg.create_feature_class('test1', srs, fields=fields)
+        field_names = ['SHAPE'] + [f.name for f in fields]
+        rows = random_points_and_attrs(500, srs.srs_id)
+        fc.insert_rows(field_names, rows[:100])
+        fc.insert_rows(field_names, rows[100:], bulk=True)
+        self.assertTrue(check_ogr_trigger_exists(target_path, 'test1'))
+        sql = ("SELECT feature_count FROM gpkg_ogr_contents "
+               "WHERE table_name = 'test1'")
+        self.assertEqual(gpkg.execute_query(sql)[0][0], 500)
+        gpkg.insert_rows('test1', field_names, rows[:10], bulk=True)
+        fc.insert_rows(field_names, rows[:10])
+        self.assertEqual(gpkg.execute_query(sql)[0][0], 520)
+
+        with self.assertRaises(ValueError):
+            fc.insert_rows(field_names, [rows[0][:2]], bulk=True)
+        self.assertTrue(check_ogr_trigger_exists(target_path, 'test1'))
+        self.assertEqual(gpkg.execute_query(sql)[0][0], 520)
+    # End test_insert_rows_bulk method
+
+    def test_spatial_index(self):
+        """
+        Test creating, maintaining and bulk loading a spatial index
+        """
+        target_path, gpkg, srs, fields = self._setup_basics(
+            'test_spatial_index.gpkg')
+        fc = gpkg.create_feature_class('test1', srs, fields=fields)
+        field_names = ['SHAPE'] + [f.name for f in fields]
+        rows = random_points_and_attrs(300, srs.srs_id)
+        fc.insert_rows(field_names, rows[:100])
+        fc.insert_rows(['int_fld'], [(1,)])
+        self.assertFalse(fc.has_spatial_index)
+        fc.create_spatial_index()
+        self.assertTrue(fc.has_spatial_index)
+        self.assertTrue(check_table_exists(target_path, 'rtree_test1_SHAPE'))
+        self.assertEqual(get_table_count(target_path, 'rtree_test1_SHAPE'), 100)
+        sql = ('SELECT minx, maxx, miny, maxy FROM rtree_test1_SHAPE '
+               'WHERE id = 1')
+        x, y = unpack('<2d', rows[0][0][-16:])
+        minx, maxx, miny, maxy = gpkg.execute_query(sql)[0]
+        self.assertAlmostEqual(minx, x, delta=0.1)
+        self.assertAlmostEqual(maxy, y, delta=0.1)
+        sql = ("SELECT extension_name, column_name FROM gpkg_extensions "
+               "WHERE table_name = 'test1'")
+        self.assertEqual(gpkg.execute_query(sql),
+                         [('gpkg_rtree_index', 'SHAPE')])
+
+        fc.insert_rows(field_names, rows[100:110])
+        self.assertEqual(get_table_count(target_path, 'rtree_test1_SHAPE'), 110)
+        fc.insert_rows(field_names, rows[110:], bulk=True)
+        self.assertEqual(get_table_count(target_path, 'rtree_test1_SHAPE'), 300)
+        gpkg.execute_query('DELETE FROM test1 WHERE fid <= 10')
+        self.assertEqual(get_table_count(target_path, 'rtree_test1_SHAPE'), 290)
+
+        fc = gpkg.create_feature_class(
+            'test2', srs, fields=fields, spatial_index=True)
+        with gpkg:
+            fc.insert_rows(field_names, rows, bulk=True)
+        self.assertEqual(get_table_count(target_path, 'rtree_test2_SHAPE'), 300)
+        gpkg.delete_feature_class('test2')
+        self.assertFalse(check_table_exists(target_path, 'rtree_test2_SHAPE'))
+        sql = "SELECT * FROM gpkg_extensions WHERE table_name = 'test2'"
+        self.assertEqual(gpkg.execute_query(sql), [])
+    # End test_spatial_index method
+
+    def test_query_bbox(self):
+        """
+        Test bounding box queries with and without a spatial index
+        """
+        target_path, gpkg, srs, fields = self._setup_basics(
+            'test_query_bbox.gpkg')
+        fc = gpkg.create_feature_class('test1', srs, fields=fields)
+        hdr = make_gpkg_geom_header(srs.srs_id)
+        rows = [(point_to_gpkg_point(hdr, 300000.0 + x, 4000000.0 + y), x, y)
+                for x in range(50) for y in range(50)]
+        fc.insert_rows(['SHAPE', 'int_fld', 'text_fld'], rows)
+        fc.insert_rows(['int_fld'], [(-1,)])
+        bbox = 300009.5, 4000019.5, 300020.5, 4000024.5
+        expected = sorted((x, str(y)) for x in range(10, 21)
+                          for y in range(20, 25))
+        for _ in range(2):
+            result = fc.query_bbox(*bbox, fields=['int_fld', 'text_fld'])
+            self.assertTrue(isgenerator(result))
+            self.assertEqual(sorted(result), expected)
+            self.assertEqual(
+                list(fc.query_bbox(0.0, 0.0, 1.0, 1.0, fields=fields[:1])),
+                [])
+            fc.create_spatial_index()
+        with gpkg:
+            rows = list(fc.query_bbox(*bbox, batch_size=7))
+        self.assertEqual(len(rows), len(expected))
+        self.assertEqual(len(rows[0]), len(fc.fields))
+    # End test_query_bbox method
+
+    def test_search(self):
+        """
+        Test searching tables and feature classes with a cursor
+        """
+        target_path, gpkg, srs, fields = self._setup_basics('test_search.gpkg')
+        fc = gpkg.create_feature_class('test1', srs, fields=fields)
+        hdr = make_gpkg_geom_header(srs.srs_id)
+        rows = [(point_to_gpkg_point(hdr, float(i), 2.0), i, 'a{0}'.format(i))
+                for i in range(100)]
+        fc.insert_rows(['SHAPE', 'int_fld', 'text_fld'], rows)
+        result = fc.search(['int_fld', 'text_fld'], batch_size=7)
+        self.assertTrue(isgenerator(result))
+        self.assertEqual(list(result), [row[1:] for row in rows])
+        result = fc.search(
+            [fields[0], 'SHAPE'], where='int_fld >= ? AND int_fld < ?',
+            params=(10, 12), named=True, decode=True)
+        first = next(result)
+        self.assertEqual(first.int_fld, 10)
+        self.assertEqual(first.SHAPE, (srs.srs_id, 1, (10.0, 2.0)))
+        self.assertEqual(len(list(result)), 1)
+        self.assertEqual(len(next(fc.search())), len(fc.fields))
+
+        table = gpkg.create_table('table1', fields)
+        table.insert_rows(['int_fld'], [(i,) for i in range(25)])
+        with gpkg:
+            result = table.search(
+                ['int_fld'], where='int_fld < :limit', params={'limit': 5})
+            self.assertEqual([r[0] for r in result], list(range(5)))
+    # End test_search method
+
+    @skipIf(np is None, 'numpy is not available')
+    def test_to_columns(self):
+        """
+        Test reading a feature class into columns
+        """
+        target_path, gpkg, srs, fields = self._setup_basics(
+            'test_to_columns.gpkg')
+        fields += (Field('test_double', SQLFieldTypes.double),
+                   Field('test_date', SQLFieldTypes.date))
+        fc = gpkg.create_feature_class(
+            'test1', srs, shape_type=GeometryType.polygon, fields=fields)
+        hdr = make_gpkg_geom_header(srs.srs_id)
+        ring = [(0.0, 0.0), (0.0, 1.0), (1.0, 1.0), (0.0, 0.0)]
+        rows = [(point_lists_to_gpkg_polygon(hdr, [ring, ring][:i % 2 + 1]),
+                 i, 'a{0}'.format(i), i % 2 == 0, i / 2.,
+                 '2020-01-{0:02d}'.format(i % 28 + 1),
+                 '2020-01-01T00:00:{0:02d}.000Z'.format(i % 60))
+                for i in range(50)]
+        fc.insert_rows(['SHAPE', 'int_fld', 'text_fld', 'test_bool',
+                        'test_double', 'test_date', 'test_datetime'], rows)
+        columns = fc.to_columns(chunk_size=7)
+        self.assertEqual(list(columns), fc.field_names)
+        self.assertEqual(columns['fid'].dtype, np.int64)
+        self.assertEqual(columns['int_fld'].tolist(), list(range(50)))
+        self.assertEqual(columns['test_bool'].dtype, np.bool_)
+        self.assertEqual(columns['test_bool'].sum(), 25)
+        self.assertEqual(columns['test_double'][3], 1.5)
+        self.assertEqual(columns['text_fld'][3], 'a3')
+        self.assertEqual(columns['test_date'][3], np.datetime64('2020-01-04'))
+        self.assertEqual(columns['test_datetime'].dtype.kind, 'M')
+        coords, geoms, rings = columns['SHAPE']
+        self.assertEqual(len(geoms), 51)
+        self.assertEqual(rings[-1], len(coords))
+        self.assertEqual(len(coords), 75 * 4)
+
+        fc.insert_rows(['int_fld'], [(None,)])
+        columns = fc.to_columns(
+            ['int_fld', fields[1]], where='fid > ?', params=(49,))
+        self.assertEqual(columns['int_fld'].dtype, np.float64)
+        self.assertEqual(columns['int_fld'][0], 49)
+        self.assertTrue(np.isnan(columns['int_fld'][1]))
+        self.assertEqual(len(fc.to_columns(where='fid < 0')['fid']), 0)
+        with self.assertRaises(ValueError):
+            fc.to_columns(['bad_fld'])
+    # End test_to_columns method
+
+    @skipIf(np is None, 'numpy is not available')
+    def test_insert_columns(self):
+        """
+        Test inserting columns and structured arrays
+        """
+        target_path, gpkg, srs, fields = self._setup_basics(
+            'test_insert_columns.gpkg')
+        fields += (Field('test_double', SQLFieldTypes.double),
+                   Field('test_date', SQLFieldTypes.date))
+        fc = gpkg.create_feature_class(
+            'test1', srs, shape_type=GeometryType.polygon, fields=fields)
+        count = 25
+        coords = np.tile([(0.0, 0.0), (0.0, 1.0), (1.0, 1.0), (0.0, 0.0)],
+                         (count, 1))
+        geoms = np.arange(count + 1)
+        rings = np.arange(count + 1) * 4
+        dates = np.arange(count).astype('datetime64[D]')
+        dates[1] = np.datetime64('NaT')
+        columns = {
+            'INT_FLD': np.arange(count, dtype=np.int32),
+            'text_fld': ['a{0}'.format(i) for i in range(count)],
+            'test_bool': np.arange(count) % 2 == 0,
+            'test_double': np.linspace(0, 1, count),
+            'test_date': dates,
+            'test_datetime': np.arange(count).astype('datetime64[s]')}
+        fc.insert_columns(columns, geometry=(coords, geoms, rings),
+                          chunk_size=10)
+        self.assertEqual(fc.count, count)
+        rows = gpkg.execute_query(
+            'SELECT int_fld, text_fld, test_bool, test_date, test_datetime '
+            'FROM test1 WHERE fid = 3')
+        self.assertEqual(rows, [(2, 'a2', 1, '1970-01-03',
+                                 '1970-01-01T00:00:02.000Z')])
+        self.assertEqual(gpkg.execute_query(
+            'SELECT test_date FROM test1 WHERE fid = 2'), [(None,)])
+        read = fc.to_columns()
+        np.testing.assert_array_equal(read['SHAPE'][0], coords)
+        np.testing.assert_array_equal(read['test_bool'], columns['test_bool'])
+
+        del read['fid']
+        fc.insert_columns(read, bulk=True)
+        self.assertEqual(fc.count, 2 * count)
+
+        data = np.zeros(5, dtype=[('int_fld', 'i8'), ('test_double', 'f8')])
+        data['int_fld'] = np.arange(5)
+        table = gpkg.create_table('table1', fields[:1] + fields[-2:-1])
+        table.insert_columns(data)
+        self.assertEqual(table.count, 5)
+        with self.assertRaises(ValueError):
+            table.insert_columns({'bad_fld': [1, 2]})
+        with self.assertRaises(ValueError):
+            table.insert_columns({'int_fld': [1, 2], 'test_double': [1.]})
+        self.assertEqual(table.count, 5)
+    # End test_insert_columns method
+
+    @skipIf(np is None, 'numpy is not available')
+    def test_insert_columns_multi_point(self):
+        """
+        Test inserting multi points read as ragged columns
+        """
+        target_path, gpkg, srs, fields = self._setup_basics(
+            'test_insert_columns_multi_point.gpkg')
+        fc = gpkg.create_feature_class(
+            'test1', srs, fields=fields, shape_type=GeometryType.multi_point)
+        hdr = make_gpkg_geom_header(32623)
+        gpkg_mp = points_to_gpkg_multipoint(
+            hdr, [(300000, 1), (300000, 4000000)])
+        fc.insert_rows(['SHAPE', 'int_fld'], [(gpkg_mp, 1)])
+
+        fc2 = gpkg.create_feature_class(
+            'test2', srs, fields=fields, shape_type=GeometryType.multi_point)
+        fc2.insert_columns({'SHAPE': fc.to_columns()['SHAPE']})
+        self.assertEqual(
+            gpkg.execute_query('SELECT SHAPE FROM test2')[0][0], gpkg_mp)
+    # End test_insert_columns_multi_point method
+
+    @skipIf(np is None, 'numpy is not available')
+    def test_insert_vectorized_points(self):
+        """
+        Test inserting points encoded in bulk as memoryviews
+        """
+        target_path, gpkg, srs, fields = self._setup_basics(
+            'test_insert_vectorized.gpkg')
+        fc = gpkg.create_feature_class('test1', srs, fields=fields)
+        coords = np.random.uniform(300000, 700000, (1000, 2))
+        hdr = make_gpkg_geom_header(srs.srs_id)
+        blobs = points_to_gpkg_points(hdr, coords, as_memoryview=True)
+        fc.insert_rows(['SHAPE', 'int_fld'],
+                       ((blob, i) for i, blob in enumerate(blobs)))
+        self.assertEqual(fc.count, 1000)
+        shape, = fc.execute_query('SELECT SHAPE FROM test1 WHERE fid = 1')[0]
+        self.assertEqual(shape, bytes(blobs[0]))
+    # End test_insert_vectorized_points method
+
+    def test_extent(self):
+        """
+        Test the extent is maintained by inserts and can be recomputed
+        """
+        target_path, gpkg, srs, fields = self._setup_basics(
+            'test_extent.gpkg')
+        fc = gpkg.create_feature_class(
+            'test1', srs, fields=fields, envelope_type=EnvelopeType.xy)
+        self.assertEqual(fc.extent, (None, None, None, None))
+        hdr = fc.geometry_header
+        rows = [(point_to_gpkg_point(hdr, 300000.0 + x, 4000000.0 + y), x)
+                for x in range(10) for y in range(5)]
+        fc.insert_rows(['SHAPE', 'int_fld'], rows)
+        self.assertEqual(fc.extent, (300000.0, 4000000.0, 300009.0, 4000004.0))
+        fc.insert_rows(['int_fld'], [(1,)])
+        fc.insert_rows(['SHAPE', 'int_fld'], [(None, 2)], bulk=True)
+        self.assertEqual(fc.extent, (300000.0, 4000000.0, 300009.0, 4000004.0))
+        writer = fc.batch_writer(['SHAPE', 'int_fld'], rows_per_commit=2)
+        with writer:
+            writer.write((point_to_gpkg_point(hdr, 1.0, 2.0), 3))
+            writer.write((point_to_gpkg_point(hdr, 5.0, 4100000.0), 4))
+        self.assertEqual(fc.extent, (1.0, 2.0, 300009.0, 4100000.0))
+        # geometries without an envelope are left for recompute_extent
+        bare = make_gpkg_geom_header(srs.srs_id)
+        fc.insert_rows(['SHAPE', 'int_fld'],
+                       [(point_to_gpkg_point(bare, -9.0, -9.0), 5)])
+        self.assertEqual(fc.extent, (1.0, 2.0, 300009.0, 4100000.0))
+        self.assertEqual(fc.recompute_extent(),
+                         (-9.0, -9.0, 300009.0, 4100000.0))
+
+        gpkg.execute_query('DELETE FROM test1 WHERE int_fld IN (3, 4, 5)')
+        self.assertEqual(fc.recompute_extent(),
+                         (300000.0, 4000000.0, 300009.0, 4000004.0))
+        self.assertEqual(fc.extent, (300000.0, 4000000.0, 300009.0, 4000004.0))
+        fc.create_spatial_index()
+        min_x, min_y, max_x, max_y = fc.recompute_extent()
+        self.assertTrue(min_x <= 300000.0 and max_x >= 300009.0)
+        self.assertTrue(min_y <= 4000000.0 and max_y >= 4000004.0)
+        gpkg.execute_query('DELETE FROM test1')
+        self.assertIsNone(fc.recompute_extent())
+        self.assertEqual(fc.extent, (None, None, None, None))
+
+        if np is None:
+            return
+        fc = gpkg.create_feature_class(
+            'test2', srs, shape_type=GeometryType.linestring, fields=fields)
+        coords = np.array([(0.0, 1.0), (2.0, 3.0), (-4.0, 5.0), (6.0, 7.0)])
+        fc.insert_columns({'int_fld': [1, 2]},
+                          geometry=(coords, np.array([0, 2, 4])))
+        self.assertEqual(fc.extent, (-4.0, 1.0, 6.0, 7.0))
+    # End test_extent method
+
+    def test_counts(self):
+        """
+        Test counts read from gpkg_ogr_contents and verifying them
+        """
+        target_path, gpkg, srs, fields = self._setup_basics(
+            'test_counts.gpkg')
+        fc = gpkg.create_feature_class('test1', srs, fields=fields)
+        table = gpkg.create_table('table1', fields)
+        fc.insert_rows(['int_fld'], [(i,) for i in range(10)])
+        table.insert_rows(['int_fld'], [(i,) for i in range(5)])
+        self.assertEqual((fc.count, table.count), (10, 5))
+        self.assertEqual(gpkg.verify_counts(), {})
+
+        gpkg.execute_query(
+            'UPDATE gpkg_ogr_contents SET feature_count = 99 '
+            'WHERE table_name = ?', ('test1',))
+        gpkg.execute_query(
+            'DELETE FROM gpkg_ogr_contents WHERE table_name = ?', ('table1',))
+        self.assertEqual(fc.count, 99)
+        self.assertEqual(fc.get_count(exact=True), 10)
+        self.assertEqual(table.count, 5)
+        gpkg.execute_query('DROP TRIGGER trigger_delete_feature_count_test1')
+        self.assertEqual(fc.count, 10)
+        with gpkg.bulk_mode('table1'):
+            table.insert_rows(['int_fld'], [(5,)])
+            self.assertEqual(table.count, 6)
+
+        self.assertEqual(gpkg.verify_counts(), {'test1': 10, 'table1': 6})
+        self.assertEqual(gpkg.verify_counts(), {})
+        self.assertTrue(check_ogr_trigger_exists(target_path, 'test1'))
+        gpkg.execute_query('DELETE FROM test1 WHERE int_fld < 3')
+        self.assertEqual(fc.count, 7)
+        self.assertEqual(fc.get_count(exact=True), 7)
+    # End test_counts method
+
+    def test_metadata_cache(self):
+        """
+        Test catalog information is cached and invalidated
+        """
+        target_path, gpkg, srs, fields = self._setup_basics(
+            'test_metadata_cache.gpkg')
+        fc = gpkg.create_feature_class('test1', srs, fields=fields)
+        with gpkg:
+            statements = []
+            gpkg.database.set_trace_callback(statements.append)
+            for _ in range(10):
+                self.assertEqual(fc.shape_field_name, 'SHAPE')
+                self.assertEqual(fc.srs.srs_id, srs.srs_id)
+                self.assertTrue(gpkg.feature_class_exists('test1'))
+                self.assertEqual(fc.z_m_enabled, (False, False))
+            catalog = [sql for sql in statements if not sql.startswith(
+                ('PRAGMA schema_version', 'PRAGMA data_version'))]
+            self.assertEqual(len(catalog), 4)
+            gpkg.database.set_trace_callback(None)
+
+            fc.add_field(Field('new_fld', SQLFieldTypes.integer))
+            self.assertIn('new_fld', fc.field_names)
+            table = gpkg.create_table('table1', fields)
+            self.assertTrue(gpkg.table_exists('table1'))
+            self.assertFalse(gpkg.feature_class_exists('table1'))
+            gpkg.delete_feature_class('test1')
+            self.assertFalse(gpkg.feature_class_exists('test1'))
+            self.assertEqual(fc.field_names, [])
+
+            conn = connect(target_path)
+            conn.execute('ALTER TABLE table1 ADD COLUMN other_fld INTEGER')
+            conn.commit()
+            conn.close()
+            self.assertIn('other_fld', table.field_names)
+
+        with self.assertRaises(ValueError):
+            with gpkg.transaction():
+                gpkg.create_feature_class('test2', srs, fields=fields)
+                self.assertTrue(gpkg.feature_class_exists('test2'))
+                raise ValueError
+        self.assertFalse(gpkg.feature_class_exists('test2'))
+        self.assertFalse(gpkg.table_exists('test2'))
+    # End test_metadata_cache method
+
+    def test_metadata_cache_other_connection(self):
+        """
+        Test rows added by another connection invalidate the cache
+        """
+        target_path, gpkg, srs, fields = self._setup_basics(
+            'test_metadata_cache_other.gpkg')
+        for name in ('test1', 'test2'):
+            self.assertFalse(gpkg.check_srs_exists(srs.srs_id))
+            conn = connect(target_path)
+            conn.execute(INSERT_GPKG_SRS, srs.row)
+            conn.commit()
+            self.assertTrue(gpkg.check_srs_exists(srs.srs_id))
+            fc = gpkg.create_feature_class(name, srs, fields=fields)
+            self.assertEqual(fc.srs.srs_id, srs.srs_id)
+            gpkg.delete_feature_class(name)
+            conn.execute('DELETE FROM gpkg_spatial_ref_sys WHERE srs_id = ?',
+                         (srs.srs_id,))
+            conn.commit()
+            conn.close()
+            gpkg.connect()
+        gpkg.close()
+    # End test_metadata_cache_other_connection method
+
+    def test_create_many(self):
+        """
+        Test creating many feature classes and tables at once
+        """
+        target_path, gpkg, srs, fields = self._setup_basics(
+            'test_create_many.gpkg')
+        other = SRS('Custom', 'TEST', 990001, WGS_1984_UTM_Zone_23N)
+        specs = [dict(name='fc{0}'.format(i), srs=srs, fields=fields)
+                 for i in range(50)]
+        specs.append(dict(name='lines', srs=other, fields=fields[:1],
+                          shape_type=GeometryType.linestring, z_enabled=True,
+                          spatial_index=True))
+        fcs = gpkg.create_feature_classes(specs)
+        self.assertEqual([fc.name for fc in fcs],
+                         [spec['name'] for spec in specs])
+        self.assertEqual(len(gpkg.feature_classes), 51)
+        self.assertEqual(fcs[-1].srs.srs_id, 990001)
+        self.assertEqual(fcs[-1].z_m_enabled, (True, False))
+        self.assertTrue(fcs[-1].has_spatial_index)
+        self.assertFalse(fcs[0].has_spatial_index)
+        self.assertTrue(check_ogr_trigger_exists(target_path, 'fc49'))
+        self.assertEqual(gpkg.execute_query(
+            'SELECT COUNT(*) FROM gpkg_spatial_ref_sys WHERE srs_id = ?',
+            (990001,)), [(1,)])
+
+        with self.assertRaises(ValueError):
+            gpkg.create_feature_classes([
+                dict(name='new1', srs=srs), dict(name='FC3', srs=srs)])
+        with self.assertRaises(ValueError):
+            gpkg.create_tables([
+                dict(name='table1', fields=fields),
+                dict(name='table1', fields=fields)])
+        self.assertFalse(gpkg.table_exists('new1'))
+        self.assertFalse(gpkg.table_exists('table1'))
+
+        tables = gpkg.create_tables([
+            dict(name='table{0}'.format(i), fields=fields, description='t')
+            for i in range(3)])
+        tables[2].insert_rows(['int_fld'], [(1,), (2,)])
+        self.assertEqual(tables[2].count, 2)
+        self.assertEqual(gpkg.verify_counts(), {})
+        self.assertFalse(gpkg.feature_class_exists('table0'))
+    # End test_create_many method
+
+    def test_parallel_build(self):
+        """
+        Test building shards in worker processes and merging them
+        """
+        target_path, gpkg, srs, fields = self._setup_basics(
+            'test_parallel_build.gpkg')
+        fc = gpkg.create_feature_class(
+            'test1', srs, fields=fields, spatial_index=True,
+            envelope_type=EnvelopeType.xy)
+        table = gpkg.create_table('table1', fields=fields)
+        hdr = fc.geometry_header
+        fc.insert_rows(['SHAPE', 'int_fld'], [
+            (point_to_gpkg_point(hdr, 0.5, 0.5), -1)])
+        partitions = [(0, 10), (100, 5), (1000, 20)]
+        counts = gpkg.parallel_build(
+            partitions, _write_partition, processes=2)
+        self.assertEqual(counts, {'test1': 35, 'table1': 3})
+        self.assertEqual(fc.count, 36)
+        self.assertEqual(table.count, 3)
+        self.assertEqual(gpkg.verify_counts(), {})
+        self.assertEqual(gpkg.execute_query(
+            'SELECT fid, int_fld FROM test1 WHERE fid IN (1, 2, 12, 36)'),
+            [(1, -1), (2, 0), (12, 100), (36, 1019)])
+        self.assertEqual(
+            gpkg.execute_query('SELECT int_fld FROM table1 ORDER BY fid'),
+            [(0,), (100,), (1000,)])
+        self.assertEqual(fc.extent, (0.0, -1019.0, 1019.0, 0.5))
+        self.assertEqual(
+            len(list(fc.query_bbox(99.0, -105.0, 105.0, -99.0))), 5)
+        self.assertEqual(fc.shape_field.data_type, GeometryType.point)
+
+        with self.assertRaises(ValueError):
+            gpkg.parallel_build(
+                [(0, 1), None], _write_partition, processes=2)
+        self.assertEqual(fc.count, 36)
+        self.assertEqual(
+            gpkg.parallel_build([(5, 1)], _write_partition,
+                                table_names=['test1']), {'test1': 1})
+        self.assertEqual(table.count, 3)
+        self.assertEqual([name for name in os.listdir(dirname(target_path))
+                          if name.startswith('pygeopkg_shards_')], [])
+    # End test_parallel_build method
+
+    def test_shared_geopackage(self):
+        """
+        Test the thread safe handle with pooled read connections
+        """
+        target_path, gpkg, srs, fields = self._setup_basics(
+            'test_shared.gpkg')
+        gpkg.create_table('table1', fields=fields)
+        handle = SharedGeoPackage(target_path, pool_size=2)
+        self.assertEqual(gpkg.execute_query('PRAGMA journal_mode'),
+                         [('wal',)])
+        in_use, peak, errors = [], [], []
+
+        def _work(index):
+            try:
+                with handle.writer() as writer:
+                    writer.insert_rows('table1', ['int_fld'], [(index,)])
+                with handle.reader() as reader:
+                    in_use.append(reader)
+                    peak.append(len(set(map(id, in_use))))
+                    with handle.reader() as nested:
+                        self.assertIs(nested, reader)
+                    reader.get_feature_class('table1')
+                    reader.execute_query('SELECT COUNT(*) FROM table1')
+                    in_use.remove(reader)
+            except Exception as err:
+                errors.append(err)
+
+        threads = [Thread(target=_work, args=(i,)) for i in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertTrue(max(peak) <= 2)
+        self.assertEqual(handle.execute_query(
+            'SELECT COUNT(*), SUM(int_fld) FROM table1'), [(10, 45)])
+        self.assertTrue(1 <= handle.idle_count <= 2)
+        with self.assertRaises(OperationalError):
+            handle.execute_query('DELETE FROM table1')
+        with self.assertRaises(ValueError):
+            with handle.writer() as writer:
+                writer.insert_rows('table1', ['int_fld'], [(100,)])
+                raise ValueError('rolled back')
+        self.assertEqual(get_table_count(target_path, 'table1'), 10)
+
+        if hasattr(os, 'fork'):
+            # the idle read connections and the writer are abandoned
+            abandoned = handle.idle_count + 1
+            context = get_context('fork')
+            queue = context.Queue()
+            process = context.Process(
+                target=_read_in_child, args=(handle, queue))
+            process.start()
+            self.assertEqual(queue.get(timeout=30), (10, abandoned, 1))
+            process.join()
+            self.assertEqual(handle.execute_query(
+                'SELECT COUNT(*) FROM table1'), [(10,)])
+
+        handle.idle_timeout = 0
+        with handle.reader():
+            pass
+        with handle.reader():
+            self.assertEqual(handle.idle_count, 0)
+        handle.close()
+        self.assertEqual(handle.idle_count, 0)
+        with self.assertRaises(ValueError):
+            handle.execute_query('SELECT 1')
+    # End test_shared_geopackage method
+
+    def test_queued_writer(self):
+        """
+        Test many threads writing through the queued writer
+        """
+        target_path, gpkg, srs, fields = self._setup_basics(
+            'test_queued_writer.gpkg')
+        fc = gpkg.create_feature_class(
+            'test1', srs, fields=fields, envelope_type=EnvelopeType.xy)
+        table = gpkg.create_table('table1', fields=fields)
+        field_names = ['SHAPE'] + [f.name for f in fields]
+        hdr = fc.geometry_header
+
+        def _produce(writer, index):
+            for _ in range(5):
+                writer.write_rows(
+                    'test1', field_names, random_points_and_attrs(
+                        40, srs.srs_id))
+                writer.write_rows('table1', ['int_fld'], [(index,)] * 10)
+            writer.write_rows('test1', ['SHAPE', 'int_fld'], [
+                (point_to_gpkg_point(hdr, -index, index), index)])
+
+        with gpkg.writer(rows_per_commit=500, queue_size=2) as writer:
+            threads = [Thread(target=_produce, args=(writer, i))
+                       for i in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            writer.flush()
+            self.assertEqual(writer.row_count, 8 * 5 * 50 + 8)
+            self.assertEqual(fc.count, 8 * 5 * 40 + 8)
+        self.assertEqual(table.count, 400)
+        self.assertEqual(gpkg.verify_counts(), {})
+        # the random points have no envelope in their headers
+        self.assertEqual(fc.extent, (-7.0, 0.0, 0.0, 7.0))
+        with self.assertRaises(ValueError):
+            writer.write_rows('table1', ['int_fld'], [(1,)])
+
+        writer = gpkg.writer()
+        with self.assertRaises(ValueError):
+            writer.write_rows('missing', ['int_fld'], [(1,)])
+        with self.assertRaises(ValueError):
+            writer.write_rows('table1', ['int_fld'], [(1, 2)])
+        writer.write_rows('table1', ['no_such_field'], [(1,)])
+        with self.assertRaises(OperationalError):
+            writer.flush()
+        with self.assertRaises(OperationalError):
+            writer.write_rows('table1', ['int_fld'], [(1,)])
+        with self.assertRaises(OperationalError):
+            writer.close()
+        self.assertEqual(table.count, 400)
+
+        if np is None:
+            return
+        with gpkg.writer() as writer:
+            coords = np.array([(1.0, 2.0), (3.0, 4.0)])
+            writer.write_columns('test1', {'int_fld': [1, 2]},
+                                 geometry=(coords,))
+            with self.assertRaises(ValueError):
+                writer.write_columns('table1', {}, geometry=(coords,))
+        self.assertEqual(fc.count, 8 * 5 * 40 + 10)
+    # End test_queued_writer method
 # End TestGeoPackage class
 
 
@@ -0,0 +1,328 @@
+"""
+Test vectorized conversion
+"""
+from unittest import TestCase, skipIf
+from pygeopkg.conversion.to_geopkg_geom import (
+    make_gpkg_geom_header, point_to_gpkg_point, point_z_to_gpkg_point_z,
+    point_m_to_gpkg_point_m, point_zm_to_gpkg_point_zm,
+    points_to_gpkg_line_string, points_zm_to_gpkg_line_string_zm,
+    point_lists_to_gpkg_polygon, point_lists_to_gpkg_multi_polygon,
+    point_lists_to_gpkg_multi_line_string, points_to_gpkg_multipoint)
+from pygeopkg.conversion.to_wkb import (
+    points_to_wkb_line_string, point_lists_to_wkb_polygon,
+    point_lists_to_wkb_multipolygon)
+from pygeopkg.conversion.vectorized import (
+    np, points_to_gpkg_points, points_z_to_gpkg_points_z,
+    points_m_to_gpkg_points_m, points_zm_to_gpkg_points_zm, BlobSequence,
+    multipoints_to_gpkg_multipoints, multipoints_to_wkb,
+    linestrings_to_gpkg_line_strings, linestrings_to_wkb, polygons_to_wkb,
+    polygons_to_gpkg_polygons, multi_linestrings_to_gpkg_multi_line_strings,
+    multi_polygons_to_gpkg_multi_polygons, multi_polygons_to_wkb,
+    gpkg_geometries_to_ragged, gpkg_geometries_to_ragged_chunk,
+    concatenate_ragged_chunks)
+from pygeopkg.core.parallel import encode_parallel, iter_encode_parallel
+from pygeopkg.shared.enumeration import EnvelopeType, GeometryType
+
+
+def _ragged(nested, depth):
+    """
+    Flatten nested lists of points into coordinates and offsets, outermost
+    offsets first
+    """
+    offsets = [[0] for _ in range(depth)]
+    coords = []
+
+    def _walk(items, level):
+        for item in items:
+            if level == depth - 1:
+                coords.extend(item)
+                offsets[level].append(len(coords))
+            else:
+                _walk(item, level + 1)
+                offsets[level].append(len(offsets[level + 1]) - 1)
+    _walk(nested, 0)
+    return [np.array(coords, dtype=float)] + offsets
+# End _ragged function
+
+
+@skipIf(np is None, 'numpy is not available')
+class TestVectorized(TestCase):
+    """
+    Test the vectorized conversion utils
+    """
+    def test_gpkg_points(self):
+        """
+        Test vectorized points match the scalar encoders
+        """
+        hdr = make_gpkg_geom_header(32623)
+        coords = np.random.uniform(0, 1000, (100, 4))
+        cases = (
+            (points_to_gpkg_points, point_to_gpkg_point, 2),
+            (points_z_to_gpkg_points_z, point_z_to_gpkg_point_z, 3),
+            (points_m_to_gpkg_points_m, point_m_to_gpkg_point_m, 3),
+            (points_zm_to_gpkg_points_zm, point_zm_to_gpkg_point_zm, 4))
+        for vectorized, scalar, dims in cases:
+            xy = coords[:, :dims]
+            expected = [scalar(hdr, *row) for row in xy.tolist()]
+            self.assertEqual(vectorized(hdr, xy), expected)
+            views = vectorized(hdr, xy, as_memoryview=True)
+            self.assertIsInstance(views, BlobSequence)
+            self.assertEqual(len(views), 100)
+            self.assertEqual([bytes(v) for v in views], expected)
+            self.assertEqual(bytes(views[-1]), expected[-1])
+            self.assertEqual(views.tobytes(), b''.join(expected))
+            self.assertEqual(
+                [bytes(v) for v in views[10:20]], expected[10:20])
+    # End test_gpkg_points method
+
+    def test_gpkg_points_bad_shape(self):
+        """
+        Test the coordinate shape is validated
+        """
+        hdr = make_gpkg_geom_header(32623)
+        with self.assertRaises(ValueError):
+            points_to_gpkg_points(hdr, np.zeros((10, 3)))
+        with self.assertRaises(ValueError):
+            points_zm_to_gpkg_points_zm(hdr, np.zeros(10))
+        self.assertEqual(points_to_gpkg_points(hdr, np.zeros((0, 2))), [])
+    # End test_gpkg_points_bad_shape method
+
+    def test_ragged_linestrings(self):
+        """
+        Test ragged line strings match the scalar encoders
+        """
+        hdr = make_gpkg_geom_header(32623)
+        lines = [[(0.0, 0.0), (1.0, 1.0)],
+                 [(2.0, 2.0), (3.0, 3.0), (4.0, 5.0)],
+                 [(9.0, 9.0), (8.0, 8.0)]]
+        coords, offsets = _ragged(lines, 1)
+        expected = [points_to_gpkg_line_string(hdr, line) for line in lines]
+        self.assertEqual(
+            linestrings_to_gpkg_line_strings(hdr, coords, offsets), expected)
+        views = linestrings_to_gpkg_line_strings(
+            hdr, coords, offsets, as_memoryview=True)
+        self.assertEqual([bytes(v) for v in views], expected)
+        self.assertEqual(
+            linestrings_to_wkb(coords, offsets),
+            [points_to_wkb_line_string(line) for line in lines])
+
+        lines = [[(x, y, z, m) for x, y in line for z, m in ((1.0, 2.0),)]
+                 for line in lines]
+        coords, offsets = _ragged(lines, 1)
+        expected = [points_zm_to_gpkg_line_string_zm(hdr, line)
+                    for line in lines]
+        self.assertEqual(linestrings_to_gpkg_line_strings(
+            hdr, coords, offsets, z=True, m=True), expected)
+        with self.assertRaises(ValueError):
+            linestrings_to_gpkg_line_strings(hdr, coords, offsets)
+        with self.assertRaises(ValueError):
+            linestrings_to_gpkg_line_strings(
+                hdr, coords, [0, 3, 2, 7], z=True, m=True)
+    # End test_ragged_linestrings method
+
+    def test_ragged_multipoints(self):
+        """
+        Test ragged multi points match the scalar encoders
+        """
+        hdr = make_gpkg_geom_header(32623)
+        multipoints = [[(0.0, 0.0), (1.0, 1.0)], [], [(2.0, 3.0)]]
+        coords, offsets = _ragged(multipoints, 1)
+        expected = [points_to_gpkg_multipoint(hdr, points)
+                    for points in multipoints]
+        self.assertEqual(
+            multipoints_to_gpkg_multipoints(hdr, coords, offsets), expected)
+        wkb = multipoints_to_wkb(coords, offsets, as_memoryview=True)
+        self.assertEqual([bytes(v) for v in wkb],
+                         [blob[len(hdr):] for blob in expected])
+        self.assertEqual(gpkg_geometries_to_ragged(expected)[-1].tolist(),
+                         offsets)
+
+        hdr = make_gpkg_geom_header(32623, envelope_type=EnvelopeType.xy)
+        expected = [points_to_gpkg_multipoint(hdr, points)
+                    for points in multipoints]
+        self.assertEqual(
+            multipoints_to_gpkg_multipoints(hdr, coords, offsets), expected)
+    # End test_ragged_multipoints method
+
+    def test_ragged_polygons(self):
+        """
+        Test ragged polygons, multi polygons and multi line strings match the
+        scalar encoders
+        """
+        hdr = make_gpkg_geom_header(32623)
+        outer = [(0.0, 0.0), (0.0, 10.0), (10.0, 10.0), (10.0, 0.0),
+                 (0.0, 0.0)]
+        hole = [(2.0, 2.0), (4.0, 2.0), (4.0, 4.0), (2.0, 2.0)]
+        polys = [[outer], [outer, hole], [hole, hole, outer]]
+        coords, geoms, rings = _ragged(polys, 2)
+        self.assertEqual(
+            polygons_to_gpkg_polygons(hdr, coords, geoms, rings),
+            [point_lists_to_gpkg_polygon(hdr, poly) for poly in polys])
+        self.assertEqual(
+            polygons_to_wkb(coords, geoms, rings),
+            [point_lists_to_wkb_polygon(poly) for poly in polys])
+        self.assertEqual(
+            multi_linestrings_to_gpkg_multi_line_strings(
+                hdr, coords, geoms, rings),
+            [point_lists_to_gpkg_multi_line_string(hdr, poly)
+             for poly in polys])
+
+        multis = [polys, polys[:1], polys[1:]]
+        coords, geoms, parts, rings = _ragged(multis, 3)
+        expected = [point_lists_to_gpkg_multi_polygon(hdr, multi)
+                    for multi in multis]
+        self.assertEqual(multi_polygons_to_gpkg_multi_polygons(
+            hdr, coords, geoms, parts, rings), expected)
+        views = multi_polygons_to_gpkg_multi_polygons(
+            hdr, coords, geoms, parts, rings, as_memoryview=True)
+        self.assertEqual([bytes(v) for v in views[1:]], expected[1:])
+        self.assertEqual(
+            multi_polygons_to_wkb(coords, geoms, parts, rings),
+            [point_lists_to_wkb_multipolygon(multi) for multi in multis])
+    # End test_ragged_polygons method
+
+    def test_envelopes(self):
+        """
+        Test vectorized envelopes match the scalar encoders
+        """
+        hdr = make_gpkg_geom_header(32623)
+        points = [(1.0, 2.0, 3.0, 4.0), (5.0, 6.0, 7.0, 8.0)]
+        for func, vec_func, dims in (
+                (point_to_gpkg_point, points_to_gpkg_points, 2),
+                (point_zm_to_gpkg_point_zm, points_zm_to_gpkg_points_zm, 4)):
+            expected = [func(hdr, *pt[:dims], envelope_type=EnvelopeType.xy)
+                        for pt in points]
+            coords = np.array(points)[:, :dims]
+            self.assertEqual(vec_func(
+                hdr, coords, envelope_type=EnvelopeType.xy), expected)
+
+        lines = [[(x, y, x * 2, y * 3) for x, y in line] for line in
+                 [[(0.0, 0.0), (1.0, 1.0)], [(2.0, 2.0), (3.0, 9.0)]]]
+        coords, offsets = _ragged(lines, 1)
+        for envelope_type in (EnvelopeType.xy, EnvelopeType.xyz,
+                              EnvelopeType.xym, EnvelopeType.xyzm):
+            expected = [points_zm_to_gpkg_line_string_zm(
+                hdr, line, envelope_type) for line in lines]
+            self.assertEqual(linestrings_to_gpkg_line_strings(
+                hdr, coords, offsets, z=True, m=True,
+                envelope_type=envelope_type), expected)
+
+        outer = [(0.0, 0.0), (0.0, 10.0), (10.0, 10.0), (10.0, 0.0),
+                 (0.0, 0.0)]
+        hole = [(2.0, 2.0), (4.0, 2.0), (4.0, 4.0), (2.0, 2.0)]
+        multis = [[[outer], [hole]], [[hole, hole]]]
+        coords, geoms, parts, rings = _ragged(multis, 3)
+        expected = [point_lists_to_gpkg_multi_polygon(
+            hdr, multi, EnvelopeType.xy) for multi in multis]
+        self.assertEqual(multi_polygons_to_gpkg_multi_polygons(
+            hdr, coords, geoms, parts, rings,
+            envelope_type=EnvelopeType.xy), expected)
+    # End test_envelopes method
+
+    def _assert_ragged(self, result, expected):
+        """
+        Assert ragged arrays are equal
+        """
+        self.assertEqual(len(result), len(expected))
+        for array, values in zip(result, expected):
+            np.testing.assert_array_equal(array, values)
+    # End _assert_ragged method
+
+    def test_decode_ragged(self):
+        """
+        Test decoding geometries into ragged arrays
+        """
+        hdr = make_gpkg_geom_header(32623)
+        coords = np.arange(20, dtype=float).reshape(10, 2)
+        blobs = points_to_gpkg_points(hdr, coords)
+        result = gpkg_geometries_to_ragged(blobs)
+        self._assert_ragged(result, [coords])
+        result = gpkg_geometries_to_ragged(blobs[:2] + [None])
+        np.testing.assert_array_equal(result[0][:2], coords[:2])
+        self.assertTrue(np.isnan(result[0][2]).all())
+
+        outer = [(0.0, 0.0), (0.0, 10.0), (10.0, 10.0), (10.0, 0.0),
+                 (0.0, 0.0)]
+        hole = [(2.0, 2.0), (4.0, 2.0), (4.0, 4.0), (2.0, 2.0)]
+        multis = [[[outer], [outer, hole]], [[hole]], [[hole, outer]]]
+        expected = _ragged(multis, 3)
+        blobs = multi_polygons_to_gpkg_multi_polygons(
+            hdr, *expected, envelope_type=EnvelopeType.xy)
+        self._assert_ragged(gpkg_geometries_to_ragged(blobs), expected)
+        self._assert_ragged(
+            gpkg_geometries_to_ragged(iter(blobs)), expected)
+
+        # polygons are promoted and nulls are empty
+        blobs = ([point_lists_to_gpkg_polygon(hdr, multis[0][1]), None] +
+                 [point_lists_to_gpkg_multi_polygon(hdr, m) for m in multis])
+        coords, geoms, parts, rings = gpkg_geometries_to_ragged(blobs)
+        self.assertEqual(geoms.tolist(), [0, 1, 1, 3, 4, 5])
+        self.assertEqual(parts.tolist(), [0, 2, 3, 5, 6, 8])
+        self.assertEqual(len(coords), rings[-1])
+        chunks = [gpkg_geometries_to_ragged_chunk(blobs[i:i + 2])
+                  for i in range(0, len(blobs), 2)]
+        self._assert_ragged(concatenate_ragged_chunks(chunks),
+                            gpkg_geometries_to_ragged(blobs))
+        chunks = [gpkg_geometries_to_ragged_chunk(blobs[:1]),
+                  gpkg_geometries_to_ragged_chunk([None]),
+                  gpkg_geometries_to_ragged_chunk(blobs[2:])]
+        self._assert_ragged(concatenate_ragged_chunks(chunks),
+                            gpkg_geometries_to_ragged(blobs))
+
+        lines = [[(0.0, 0.0, 1.0), (1.0, 1.0, 2.0)],
+                 [(2.0, 2.0, 3.0), (3.0, 3.0, 4.0), (4.0, 5.0, 6.0)]]
+        expected = _ragged(lines, 1)
+        blobs = linestrings_to_gpkg_line_strings(
+            hdr, *expected, z=True, as_memoryview=True)
+        self._assert_ragged(gpkg_geometries_to_ragged(blobs), expected)
+        coords, offsets = gpkg_geometries_to_ragged(
+            [points_to_gpkg_multipoint(hdr, [(1.0, 2.0), (3.0, 4.0)]),
+             point_to_gpkg_point(hdr, 5.0, 6.0)])
+        self.assertEqual(offsets.tolist(), [0, 2, 3])
+        self.assertEqual(coords[:, 0].tolist(), [1.0, 3.0, 5.0])
+
+        with self.assertRaises(ValueError):
+            gpkg_geometries_to_ragged(
+                [point_to_gpkg_point(hdr, 1.0, 2.0), blobs[0]])
+        with self.assertRaises(ValueError):
+            gpkg_geometries_to_ragged(
+                [point_to_gpkg_point(hdr, 1.0, 2.0),
+                 point_z_to_gpkg_point_z(hdr, 1.0, 2.0, 3.0)])
+    # End test_decode_ragged method
+
+    def test_encode_parallel(self):
+        """
+        Test encoding in worker processes matches the serial encoders
+        """
+        hdr = make_gpkg_geom_header(4326)
+        polys = [[[[(i, 0.0), (i + 1.0, 0.0), (i + 1.0, 1.0), (i, 0.0)]],
+                  [[(0.0, 0.0), (2.0, i), (0.0, 0.0)]]] for i in range(25)]
+        expected = [bytes(point_lists_to_gpkg_multi_polygon(
+            hdr, poly, envelope_type=EnvelopeType.xy)) for poly in polys]
+        ragged = tuple(_ragged(polys, 3))
+        for geometries in ragged, polys:
+            blobs = encode_parallel(
+                geometries, GeometryType.multi_polygon, 4326,
+                envelope_type=EnvelopeType.xy, workers=2, chunk_size=7)
+            self.assertEqual([bytes(b) for b in blobs], expected)
+
+        coords = np.arange(40, dtype=float).reshape(-1, 2)
+        expected = [bytes(b) for b in points_to_gpkg_points(hdr, coords)]
+        shards = list(iter_encode_parallel(
+            (coords,), 'point', 4326, workers=2, chunk_size=8))
+        self.assertEqual([start for start, _ in shards], [0, 8, 16])
+        self.assertIsInstance(shards[0][1], BlobSequence)
+        self.assertEqual(
+            [bytes(b) for _, blobs in shards for b in blobs], expected)
+        blobs = encode_parallel(coords.tolist(), 'point', 4326, workers=1)
+        self.assertEqual([bytes(b) for b in blobs], expected)
+        self.assertEqual(encode_parallel([], 'point', 4326, workers=1), [])
+        with self.assertRaises(ValueError):
+            encode_parallel([[[(0.0, 0.0, 0.0)]]], GeometryType.polygon,
+                            4326, z=True, workers=1)
+    # End test_encode_parallel method
+# End TestVectorized class
+
+
+if __name__ == '__main__':
+    pass